@@ -0,0 +1,188 @@
+"""Batch scheduling of many depots.
+
+===== Module Description =====
+
+This module schedules the parcels of many independent depots, each with its
+own parcels and fleet, in one call.  The depots share one distance map.  When
+they are spread across worker processes, the map is copied once into shared
+memory, and each worker reads its distances from there, rather than being
+sent its own copy of the map with every depot.
+
+The statistics of each depot, and of all of the depots together, come back
+in a single BatchResult.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple, Union
+from distance_map import DistanceMap, attach_shared
+from domain import Fleet, Parcel, ParcelTable
+from experiment import SchedulingExperiment
+
+# The configuration and the distance map that depots are scheduled with in a
+# worker process, and the shared memory the map reads from, given to each
+# worker once, when it starts.
+_config: Dict[str, Union[str, bool]] = {}
+_dmap: Optional[DistanceMap] = None
+_block: Optional[SharedMemory] = None
+
+
+class BatchResult:
+    """The outcome of scheduling a batch of depots.
+
+    === Public Attributes ===
+    depots:
+      The depot of each problem in the batch, in the order given.
+    stats:
+      The statistics of each problem, as returned by SchedulingExperiment.run,
+      in the same order.
+    allocations:
+      The parcel allocations of each problem's fleet, as returned by
+      Fleet.parcel_allocations, in the same order.
+    combined:
+      The statistics of all of the problems together: 'depots', the number
+      of problems, the totals of 'fleet', 'unused_trucks', 'unused_space'
+      and 'unscheduled', and 'avg_distance' and 'avg_fullness' averaged over
+      every non-empty truck of every problem.
+
+    === Representation Invariants ===
+    - <depots>, <stats> and <allocations> have the same length.
+    """
+    depots: List[str]
+    stats: List[Dict[str, Union[int, float]]]
+    allocations: List[Dict[int, List[int]]]
+    combined: Dict[str, Union[int, float]]
+
+    def __init__(self, depots: List[str],
+                 stats: List[Dict[str, Union[int, float]]],
+                 allocations: List[Dict[int, List[int]]]) -> None:
+        """Initialize the result of a batch whose problems had the depots
+        <depots>, statistics <stats> and parcel allocations <allocations>.
+
+        >>> r = BatchResult(['A', 'B'], [
+        ...     {'fleet': 2, 'unused_trucks': 1, 'unused_space': 5,
+        ...      'unscheduled': 0, 'avg_distance': 10.0,
+        ...      'avg_fullness': 50.0},
+        ...     {'fleet': 3, 'unused_trucks': 0, 'unused_space': 0,
+        ...      'unscheduled': 2, 'avg_distance': 30.0,
+        ...      'avg_fullness': 100.0}], [{}, {}])
+        >>> r.combined['fleet'], r.combined['unscheduled']
+        (5, 2)
+        >>> r.combined['avg_distance'], r.combined['avg_fullness']
+        (25.0, 87.5)
+        """
+        self.depots = depots
+        self.stats = stats
+        self.allocations = allocations
+        self.combined = {'depots': len(depots)}
+        for stat in ['fleet', 'unused_trucks', 'unused_space', 'unscheduled']:
+            self.combined[stat] = sum(one[stat] for one in stats)
+        nonempty = self.combined['fleet'] - self.combined['unused_trucks']
+        for stat in ['avg_distance', 'avg_fullness']:
+            total = sum(one[stat] * (one['fleet'] - one['unused_trucks'])
+                        for one in stats)
+            self.combined[stat] = total / nonempty if nonempty else 0.0
+
+
+def schedule_depots(problems: List[Tuple[str, Union[List[Parcel],
+                                                    ParcelTable], Fleet]],
+                    dmap: DistanceMap, config: Dict[str, Union[str, bool]],
+                    workers: int = 1) -> BatchResult:
+    """Schedule the parcels of each problem in <problems>, a depot, its
+    parcels and its fleet, with the algorithm configured by <config>, and
+    return the statistics of every problem and of all of them together.
+
+    Every problem is scheduled on a copy of its fleet, so the fleets in
+    <problems> are left empty.  The problems are run across <workers>
+    processes, which read <dmap> from shared memory, or in this process if
+    <workers> is 1.  The results are in the order of <problems> either way.
+
+    Precondition: <config> contains the algorithm keys specified in
+    SchedulingExperiment.__init__, and <dmap> contains every distance needed
+    to compute the length of the routes of every problem.
+    """
+    tasks = [(depot, parcels, fleet) for depot, parcels, fleet in problems]
+    if workers > 1:
+        block, names = dmap.share()
+        try:
+            with ProcessPoolExecutor(workers, initializer=_set_shared,
+                                     initargs=(config, block.name,
+                                               names)) as executor:
+                chunksize = max(len(tasks) // (4 * workers), 1)
+                results = list(executor.map(_run_depot, tasks,
+                                            chunksize=chunksize))
+        finally:
+            block.close()
+            block.unlink()
+    else:
+        results = [_schedule_depot(config, dmap, depot, parcels,
+                                   deepcopy(fleet))
+                   for depot, parcels, fleet in tasks]
+    return BatchResult([depot for depot, _, _ in tasks],
+                       [stats for stats, _ in results],
+                       [allocations for _, allocations in results])
+
+
+def _depot_config(config: Dict[str, Union[str, bool]],
+                  depot: str) -> Dict[str, Union[str, bool]]:
+    """Return a copy of <config> that schedules the parcels of <depot>,
+    already read, in a single process.
+    """
+    config = dict(config)
+    config['depot_location'] = depot
+    config['verbose'] = False
+    # The parcels are given, so there is no parcel file to stream from, and
+    # the depots are already spread across processes.
+    config['parcel_file'] = ''
+    config['stream'] = False
+    config['route_workers'] = 1
+    config['random_workers'] = 1
+    return config
+
+
+def _schedule_depot(config: Dict[str, Union[str, bool]], dmap: DistanceMap,
+                    depot: str, parcels: Union[List[Parcel], ParcelTable],
+                    fleet: Fleet) -> Tuple[Dict[str, Union[int, float]],
+                                           Dict[int, List[int]]]:
+    """Schedule <parcels> onto <fleet> from <depot>, as configured by
+    <config>, and return the statistics and the parcel allocations.
+    """
+    expt = SchedulingExperiment(_depot_config(config, depot),
+                                (parcels, fleet, dmap))
+    stats = expt.run()
+    return stats, fleet.parcel_allocations()
+
+
+def _set_shared(config: Dict[str, Union[str, bool]], name: str,
+                names: List[str]) -> None:
+    """Make <config> the configuration that depots are scheduled with in
+    this process, and attach to the distance map in the shared memory
+    called <name>, whose cities are <names>.
+    """
+    global _config, _dmap, _block
+    _config = config
+    _block, _dmap = attach_shared(name, names)
+
+
+def _run_depot(task: Tuple[str, Any, Fleet]) \
+        -> Tuple[Dict[str, Union[int, float]], Dict[int, List[int]]]:
+    """Schedule the problem <task>, a depot, its parcels and its fleet, with
+    the configuration and distance map of this process.
+    """
+    depot, parcels, fleet = task
+    return _schedule_depot(_config, _dmap, depot, parcels, fleet)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'concurrent.futures', 'copy',
+                                   'multiprocessing.shared_memory',
+                                   'distance_map', 'domain', 'experiment'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
@@ -0,0 +1,100 @@
+import random
+import warnings
+import pytest
+from batch import schedule_depots
+from distance_map import DistanceMap, attach_shared
+from domain import Fleet, Parcel, Truck
+from experiment import SchedulingExperiment
+
+CITIES = ['Toronto', 'Hamilton', 'London', 'Guelph', 'Ottawa', 'Barrie']
+CONFIG = {'algorithm': 'greedy', 'parcel_priority': 'destination',
+          'parcel_order': 'non-decreasing', 'truck_order': 'non-increasing'}
+
+
+def _map() -> DistanceMap:
+    """Return a map with a distance between every pair of CITIES."""
+    rng = random.Random(148)
+    dmap = DistanceMap()
+    for i, city1 in enumerate(CITIES):
+        for city2 in CITIES[i + 1:]:
+            dmap.add_distance(city1, city2, rng.randint(5, 90))
+    return dmap
+
+
+def _problems(n: int) -> list:
+    """Return <n> random problems, one from each depot in turn."""
+    rng = random.Random(n)
+    problems = []
+    for i in range(n):
+        depot = CITIES[i % len(CITIES)]
+        parcels = [Parcel(j, rng.randint(1, 20), depot, rng.choice(CITIES))
+                   for j in range(rng.randint(0, 30))]
+        fleet = Fleet()
+        for j in range(rng.randint(1, 5)):
+            fleet.add_truck(Truck(j, rng.randint(10, 60), depot))
+        problems.append((depot, parcels, fleet))
+    return problems
+
+
+def test_batch_matches_single_experiments() -> None:
+    """Test that each depot of a batch gets the statistics of running its
+    experiment alone, and that the fleets given are left empty."""
+    dmap = _map()
+    problems = _problems(12)
+    result = schedule_depots(problems, dmap, CONFIG)
+    assert result.depots == [depot for depot, _, _ in problems]
+    for (depot, parcels, fleet), stats in zip(problems, result.stats):
+        assert fleet.num_nonempty_trucks() == 0
+        config = dict(CONFIG, depot_location=depot, parcel_file='',
+                      verbose=False)
+        copy = Fleet()
+        for truck in fleet.trucks:
+            copy.add_truck(Truck(truck.id, truck.capacity, depot))
+        assert SchedulingExperiment(config, (parcels, copy,
+                                             dmap)).run() == stats
+    combined = result.combined
+    assert combined['depots'] == 12
+    assert combined['fleet'] == sum(len(fleet.trucks)
+                                    for _, _, fleet in problems)
+    assert combined['unscheduled'] == sum(s['unscheduled']
+                                          for s in result.stats)
+
+
+def test_parallel_matches_sequential() -> None:
+    """Test that a batch spread across processes, sharing the map, gives
+    the same result as one run in this process."""
+    dmap = _map()
+    problems = _problems(20)
+    sequential = schedule_depots(problems, dmap, CONFIG)
+    parallel = schedule_depots(problems, dmap, CONFIG, workers=3)
+    assert parallel.stats == sequential.stats
+    assert parallel.allocations == sequential.allocations
+    assert parallel.combined == sequential.combined
+
+
+@pytest.mark.parametrize('dense', [False, True])
+def test_shared_map_matches(dense: bool) -> None:
+    """Test that a map attached from shared memory has the same distances
+    as the map it was shared from."""
+    dmap = _map()
+    if dense:
+        dmap.densify()
+    block, names = dmap.share()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        attached, shared = attach_shared(block.name, names)
+        for city1 in CITIES + ['Nowhere']:
+            for city2 in CITIES:
+                assert shared.distance(city1, city2) == \
+                    dmap.distance(city1, city2)
+        route = shared.city_ids(CITIES)
+        assert shared.route_length(route) == \
+            dmap.route_length(dmap.city_ids(CITIES))
+        del shared
+        attached.close()
+    block.close()
+    block.unlink()
+
+
+if __name__ == '__main__':
+    pytest.main(['batch_test.py'])
@@ -0,0 +1,479 @@
+"""Performance benchmarks.
+
+===== Module Description =====
+
+This module times the parts of the scheduling pipeline on randomly generated
+data, so that the effect of a change on running time can be measured.  Run it
+as a script to print a report.
+
+The benchmark suite times parsing, the priority queue, each scheduler and the
+computation of the statistics on data sets written by generator, at each of
+a range of sizes.  Its results are saved as JSON, so that a later run can be
+compared with them to find regressions.
+"""
+from copy import deepcopy
+from random import Random
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+import platform
+import tracemalloc
+from container import BucketPriorityQueue, PriorityQueue
+from distance_map import DistanceMap
+from domain import Parcel, ParcelTable, Truck
+from experiment import SchedulingExperiment, read_distance_map, \
+    read_parcel_table, read_parcels, read_trucks, _parse_distances, \
+    _parse_parcel_table, _parse_trucks
+from generator import generate_data
+from ingest import parse_distances, parse_parcel_table, parse_rate, \
+    parse_trucks
+from scheduler import BinPackingScheduler, GreedyScheduler, RandomScheduler
+
+_CITIES = ['Belleville', 'Guelph', 'Hamilton', 'Toronto', 'London', 'Ottawa']
+
+
+def _random_parcels(n: int, seed: int = 148) -> List[Parcel]:
+    """Return <n> parcels with random volumes and destinations, generated
+    from the random seed <seed>.
+    """
+    rng = Random(seed)
+    return [Parcel(i, rng.randint(5, 25), 'Toronto', rng.choice(_CITIES))
+            for i in range(n)]
+
+
+def _larger_volume(a: Parcel, b: Parcel) -> bool:
+    """Return True if <a> has a larger volume than <b>.
+    """
+    return a.volume > b.volume
+
+
+def _drain(queue: PriorityQueue) -> float:
+    """Remove every item from <queue> and return the time taken, in seconds.
+    """
+    start = perf_counter()
+    while not queue.is_empty():
+        queue.remove()
+    return perf_counter() - start
+
+
+def bench_priority_queue(sizes: List[int]) -> List[Dict[str, float]]:
+    """Time filling and draining a PriorityQueue of parcels in non-increasing
+    volume order, once with a <less_than> comparator and once with a
+    precomputed key, for each number of parcels in <sizes>.
+
+    Return one row of timings, in seconds, for each size.
+    """
+    rows = []
+    for n in sizes:
+        parcels = _random_parcels(n)
+
+        start = perf_counter()
+        queue = PriorityQueue(_larger_volume)
+        for parcel in parcels:
+            queue.add(parcel)
+        callable_time = perf_counter() - start + _drain(queue)
+
+        start = perf_counter()
+        queue = PriorityQueue(key=lambda parcel: -parcel.volume)
+        for parcel in parcels:
+            queue.add(parcel)
+        key_time = perf_counter() - start + _drain(queue)
+
+        rows.append({'parcels': n, 'less_than': callable_time,
+                     'key': key_time, 'speedup': callable_time / key_time})
+    return rows
+
+
+def bench_bucket_queue(sizes: List[int]) -> List[Dict[str, float]]:
+    """Time a PriorityQueue and a BucketPriorityQueue of parcels in
+    non-increasing volume order, for each number of parcels in <sizes>: once
+    filled one parcel at a time and drained, once built from all the parcels
+    at once and drained, and once with each add followed by a remove while
+    the queue holds a window of 1000 parcels, as a stream is scheduled.
+
+    Return one row of timings, in seconds, for each size.
+    """
+    def by_volume(parcel: Parcel) -> int:
+        """Return the sort key of <parcel>."""
+        return -parcel.volume
+
+    queues = [('heap', lambda items=None: PriorityQueue(key=by_volume,
+                                                        items=items)),
+              ('bucket', lambda items=None: BucketPriorityQueue(by_volume,
+                                                                items))]
+    rows = []
+    for n in sizes:
+        parcels = _random_parcels(n)
+        row = {'parcels': n}
+        for name, make in queues:
+            start = perf_counter()
+            queue = make()
+            for parcel in parcels:
+                queue.add(parcel)
+            row[f'{name}_fill'] = perf_counter() - start + _drain(queue)
+
+            start = perf_counter()
+            queue = make(parcels)
+            row[f'{name}_build'] = perf_counter() - start + _drain(queue)
+
+            start = perf_counter()
+            queue = make(parcels[:1000])
+            for parcel in parcels[1000:]:
+                queue.add(parcel)
+                queue.remove()
+            row[f'{name}_window'] = perf_counter() - start + _drain(queue)
+        row['speedup'] = row['heap_fill'] / row['bucket_fill']
+        rows.append(row)
+    return rows
+
+
+class _DictParcel:
+    """A parcel stored the way Parcel was before it used __slots__, with
+    its attributes in a per-instance dictionary and uninterned city names.
+    """
+    id: int
+    volume: int
+    source: str
+    destination: str
+
+    def __init__(self, id_: int, volume: int, source: str,
+                 destination: str) -> None:
+        """Initialize a parcel with the given attributes.
+        """
+        self.id = id_
+        self.volume = volume
+        self.source = source
+        self.destination = destination
+
+
+def _traced_size(build: Callable[[], object]) -> int:
+    """Return the number of bytes still allocated by <build>() once it has
+    returned, keeping its result alive while measuring.
+    """
+    tracemalloc.start()
+    try:
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_parcel_memory(sizes: List[int]) -> List[Dict[str, float]]:
+    """Measure the memory used to hold parcels read from a manifest, as
+    dictionary-backed objects, as Parcel objects and as a ParcelTable, for
+    each number of parcels in <sizes>.
+
+    City names are rebuilt for every row, as they are when each line of a
+    manifest is split, so uninterned names are not shared.  Return one row
+    of sizes, in megabytes, for each number of parcels.
+    """
+    rows = []
+    for n in sizes:
+        rng = Random(148)
+        rows_data = [(i, rng.randint(5, 25), 'Toronto', rng.choice(_CITIES))
+                     for i in range(n)]
+
+        def rows_as(kind: type) -> object:
+            """Build the parcels as instances of <kind>."""
+            return [kind(pid, volume, ''.join(source), ''.join(destination))
+                    for pid, volume, source, destination in rows_data]
+
+        def table() -> ParcelTable:
+            """Build the parcels as a ParcelTable."""
+            result = ParcelTable()
+            for pid, volume, source, destination in rows_data:
+                result.append(pid, volume, ''.join(source),
+                              ''.join(destination))
+            return result
+
+        dict_size = _traced_size(lambda: rows_as(_DictParcel))
+        slots_size = _traced_size(lambda: rows_as(Parcel))
+        table_size = _traced_size(table)
+        rows.append({'parcels': n, 'dict_mb': dict_size / 2 ** 20,
+                     'slots_mb': slots_size / 2 ** 20,
+                     'table_mb': table_size / 2 ** 20})
+    return rows
+
+
+def _random_road_map(n: int, degree: int, seed: int = 148) -> DistanceMap:
+    """Return a sparse map of <n> cities in which each city has a road to
+    about <degree> others, generated from the random seed <seed>.  Every
+    city is connected to the next, so that every pair has a path.
+    """
+    rng = Random(seed)
+    dmap = DistanceMap()
+    for i in range(n):
+        dmap.add_distance(f'City{i}', f'City{(i + 1) % n}',
+                          rng.randint(1, 100))
+        for _ in range(degree - 1):
+            dmap.add_distance(f'City{i}', f'City{rng.randrange(n)}',
+                              rng.randint(1, 100))
+    return dmap
+
+
+def bench_shortest_paths(sizes: List[int],
+                         lookups: int = 10 ** 6) -> List[Dict[str, float]]:
+    """Time completing a sparse road map with shortest path distances, by
+    each method, for each number of cities in <sizes>.  Also time <lookups>
+    random lookups in the sparse map before completion, and in the dense map
+    after it by city name and by city id.
+
+    Return one row of timings, in seconds, for each number of cities.
+    """
+    rows = []
+    for n in sizes:
+        rng = Random(n)
+        pairs = [(f'City{rng.randrange(n)}', f'City{rng.randrange(n)}')
+                 for _ in range(lookups)]
+        times = {}
+        for method in ['dijkstra', 'floyd-warshall']:
+            dmap = _random_road_map(n, 3)
+            start = perf_counter()
+            dmap.complete_shortest_paths(method)
+            times[method] = perf_counter() - start
+        sparse = _random_road_map(n, 3)
+        start = perf_counter()
+        for city1, city2 in pairs:
+            sparse.distance(city1, city2)
+        sparse_time = perf_counter() - start
+        start = perf_counter()
+        for city1, city2 in pairs:
+            dmap.distance(city1, city2)
+        dense_time = perf_counter() - start
+        id_pairs = [(dmap.city_id(city1), dmap.city_id(city2))
+                    for city1, city2 in pairs]
+        start = perf_counter()
+        for id1, id2 in id_pairs:
+            dmap.distance_by_id(id1, id2)
+        id_time = perf_counter() - start
+        rows.append({'cities': n, 'dijkstra': times['dijkstra'],
+                     'floyd_warshall': times['floyd-warshall'],
+                     'sparse_lookups': sparse_time,
+                     'dense_lookups': dense_time, 'id_lookups': id_time})
+    return rows
+
+
+def bench_bin_packing(num_trucks: int, sizes: List[int],
+                      greedy_limit: int = 10 ** 8) -> List[Dict[str, float]]:
+    """Time packing parcels onto <num_trucks> trucks by the greedy scheduler
+    (by non-increasing volume, onto the fullest truck that fits) and by the
+    best-fit and first-fit schedulers, for each number of parcels in <sizes>.
+
+    The greedy scheduler scans every truck for every parcel, so it is only
+    timed when the number of parcels times <num_trucks> is at most
+    <greedy_limit>; otherwise its time is nan.  Return one row of timings, in
+    seconds, for each number of parcels.
+    """
+    config = {'algorithm': 'greedy', 'parcel_priority': 'volume',
+              'parcel_order': 'non-increasing',
+              'truck_order': 'non-decreasing'}
+    schedulers = {'greedy': GreedyScheduler(config),
+                  'best_fit': BinPackingScheduler({'algorithm': 'best-fit'}),
+                  'first_fit': BinPackingScheduler({'algorithm': 'first-fit'})}
+    rows = []
+    for n in sizes:
+        parcels = _random_parcels(n)
+        rng = Random(n)
+        capacities = [rng.randint(20, 200) for _ in range(num_trucks)]
+        row = {'trucks': num_trucks, 'parcels': n}
+        for name, scheduler in schedulers.items():
+            if name == 'greedy' and n * num_trucks > greedy_limit:
+                row[name] = float('nan')
+                continue
+            trucks = [Truck(i, capacity, 'Toronto')
+                      for i, capacity in enumerate(capacities)]
+            start = perf_counter()
+            scheduler.schedule(parcels, trucks)
+            row[name] = perf_counter() - start
+        rows.append(row)
+    return rows
+
+
+def _best_time(run: Callable[[], Any], setup: Callable[[], Any],
+               repeat: int) -> float:
+    """Return the shortest time, in seconds, that <run> takes over <repeat>
+    calls, each given a fresh result of <setup>(), which is not timed.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        state = setup()
+        start = perf_counter()
+        run(state)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def bench_suite(sizes: List[int], directory: str, repeat: int = 3,
+                trucks_per_parcel: float = 0.05, num_cities: int = 100,
+                density: float = 0.1,
+                greedy_limit: int = 10 ** 8) -> List[Dict[str, float]]:
+    """Time each part of the scheduling pipeline on a data set of each
+    number of parcels in <sizes>, written to a subdirectory of <directory>
+    by generator.generate_data, taking the best of <repeat> runs.
+
+    Each data set has <trucks_per_parcel> trucks for each parcel, at least
+    one, and a map of <num_cities> cities with the road density <density>.
+    The cases timed are parsing each file, filling and draining a
+    PriorityQueue with the parcels, scheduling with the random, greedy,
+    best-fit and first-fit schedulers, and computing the statistics of the
+    greedy schedule.  The greedy scheduler scans every truck for every
+    parcel, so it is only timed when the number of parcels times the number
+    of trucks is at most <greedy_limit>; otherwise its time is None.
+
+    Return one row of timings, in seconds, for each size.
+    """
+    rows = []
+    for n in sizes:
+        num_trucks = max(int(n * trucks_per_parcel), 1)
+        config = generate_data(os.path.join(directory, str(n)), n,
+                               num_trucks, num_cities, density)
+        row = {'parcels': n, 'trucks': num_trucks}
+        row['parse_parcels'] = _best_time(
+            lambda _: read_parcels(config['parcel_file']), list, repeat)
+        row['parse_parcel_table'] = _best_time(
+            lambda _: read_parcel_table(config['parcel_file']), list, repeat)
+        row['parse_trucks'] = _best_time(
+            lambda _: read_trucks(config['truck_file'],
+                                  config['depot_location']), list, repeat)
+        row['parse_map'] = _best_time(
+            lambda _: read_distance_map(config['map_file']), list, repeat)
+
+        parcels = read_parcels(config['parcel_file'])
+        fleet = read_trucks(config['truck_file'], config['depot_location'])
+        dmap = read_distance_map(config['map_file'])
+
+        def fill_and_drain(queue: PriorityQueue) -> None:
+            """Add every parcel to <queue>, then remove them all."""
+            for parcel in parcels:
+                queue.add(parcel)
+            _drain(queue)
+
+        row['priority_queue'] = _best_time(
+            fill_and_drain,
+            lambda: PriorityQueue(key=lambda parcel: -parcel.volume), repeat)
+        schedulers = {
+            'random': RandomScheduler(148),
+            'greedy': GreedyScheduler(config),
+            'best_fit': BinPackingScheduler({'algorithm': 'best-fit'}),
+            'first_fit': BinPackingScheduler({'algorithm': 'first-fit'})}
+        for name, scheduler in schedulers.items():
+            if name == 'greedy' and n * num_trucks > greedy_limit:
+                row[name] = None
+                continue
+            row[name] = _best_time(
+                lambda trucks, s=scheduler: s.schedule(parcels, trucks),
+                lambda: deepcopy(fleet).trucks, repeat)
+
+        def scheduled() -> SchedulingExperiment:
+            """Return an experiment whose parcels have been scheduled."""
+            expt = SchedulingExperiment(config, (parcels, deepcopy(fleet),
+                                                 dmap))
+            expt.run()
+            return expt
+
+        row['compute_stats'] = _best_time(
+            lambda expt: expt._compute_stats(), scheduled, repeat)
+        rows.append(row)
+    return rows
+
+
+def bench_parsing(sizes: List[int],
+                  directory: str) -> List[Dict[str, float]]:
+    """Measure the rows parsed per second from the parcel, truck and map
+    files of a data set of each number of parcels in <sizes>, written to a
+    subdirectory of <directory> by generator.generate_data, line by line and
+    in bulk.
+
+    Each data set has a truck for every 20 parcels, and a map with the road
+    density 0.1 and a road for about every 10 parcels.  Return one row of
+    rates for each size.
+    """
+    parsers = [('parcels', 'parcel_file', _parse_parcel_table,
+                parse_parcel_table),
+               ('trucks', 'truck_file', _parse_trucks, parse_trucks),
+               ('map', 'map_file', _parse_distances, parse_distances)]
+    rows = []
+    for n in sizes:
+        config = generate_data(os.path.join(directory, str(n)), n,
+                               max(n // 20, 1), max(int((2 * n) ** 0.5), 2),
+                               0.1)
+        row = {'parcels': n}
+        for name, key, by_line, in_bulk in parsers:
+            line_rate = parse_rate(config[key], by_line)
+            bulk_rate = parse_rate(config[key], in_bulk)
+            row[f'{name}_lines'] = float(line_rate['rows'])
+            row[f'{name}_line_rps'] = line_rate['rows_per_second']
+            row[f'{name}_bulk_rps'] = bulk_rate['rows_per_second']
+        rows.append(row)
+    return rows
+
+
+def save_results(rows: List[Dict[str, Optional[float]]],
+                 filename: str) -> None:
+    """Save the benchmark results <rows> to the JSON file <filename>,
+    together with the Python version and platform they were measured on.
+    """
+    with open(filename, 'w') as file:
+        json.dump({'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'results': rows}, file, indent=2)
+
+
+def compare_results(filename: str, rows: List[Dict[str, Optional[float]]],
+                    tolerance: float = 0.2) -> List[str]:
+    """Return a description of each timing in <rows> that is more than
+    <tolerance> slower, as a fraction, than the timing for the same case and
+    number of parcels in the results saved in <filename>.
+    """
+    with open(filename, 'r') as file:
+        baseline = {row['parcels']: row for row in json.load(file)['results']}
+    regressions = []
+    for row in rows:
+        old_row = baseline.get(row['parcels'], {})
+        for case, new in row.items():
+            old = old_row.get(case)
+            if case in ('parcels', 'trucks') or old is None or new is None:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(f'{case} at {row["parcels"]} parcels: '
+                                   f'{old:.4g}s -> {new:.4g}s')
+    return regressions
+
+
+def _print_rows(title: str, rows: List[Dict[str, float]]) -> None:
+    """Print <rows> as a table headed by <title>.
+    """
+    print(title)
+    if not rows:
+        return
+    print('  '.join(f'{column:>12}' for column in rows[0]))
+    for row in rows:
+        print('  '.join(f'{value:>12.4g}' if isinstance(value, float)
+                        else f'{value!s:>12}' for value in row.values()))
+
+
+if __name__ == '__main__':
+    _print_rows('PriorityQueue: less_than vs key (seconds)',
+                bench_priority_queue([10 ** 5, 10 ** 6]))
+    _print_rows('PriorityQueue vs BucketPriorityQueue (seconds)',
+                bench_bucket_queue([10 ** 5, 10 ** 6]))
+    _print_rows('Parcel memory (megabytes)',
+                bench_parcel_memory([10 ** 5, 10 ** 6]))
+    _print_rows('Shortest path completion and lookups (seconds)',
+                bench_shortest_paths([100, 400]))
+    _print_rows('Greedy vs bin packing at 10^5 trucks (seconds)',
+                bench_bin_packing(10 ** 5, [10 ** 3, 10 ** 5]))
+
+    _print_rows('Parsing, line by line vs bulk (rows per second)',
+                bench_parsing([10 ** 5, 10 ** 6], 'data/benchmark'))
+
+    suite = bench_suite([10 ** 3, 10 ** 4, 10 ** 5], 'data/benchmark')
+    _print_rows('Benchmark suite (seconds)', suite)
+    if os.path.exists('data/benchmark-baseline.json'):
+        for regression in compare_results('data/benchmark-baseline.json',
+                                          suite):
+            print(f'Slower than the baseline: {regression}')
+    save_results(suite, 'data/benchmark.json')
@@ -0,0 +1,37 @@
+import pytest
+
+PARCELS = """1, Toronto, Hamilton, 10
+2, Toronto, London, 15
+3, Toronto, Guelph, 5
+4, Toronto, Hamilton, 20
+5, Toronto, London, 25
+6, Toronto, Guelph, 30
+"""
+TRUCKS = """1, 40
+2, 30
+3, 25
+"""
+MAP = """Toronto, Hamilton, 9
+Toronto, London, 20, 22
+Toronto, Guelph, 10
+Hamilton, London, 12
+Hamilton, Guelph, 7
+London, Guelph, 9
+"""
+
+
+@pytest.fixture
+def config(tmp_path) -> dict:
+    """Return a greedy configuration whose data files are in <tmp_path>."""
+    for name, text in [('parcels.txt', PARCELS), ('trucks.txt', TRUCKS),
+                       ('map.txt', MAP)]:
+        (tmp_path / name).write_text(text)
+    return {'depot_location': 'Toronto',
+            'parcel_file': str(tmp_path / 'parcels.txt'),
+            'truck_file': str(tmp_path / 'trucks.txt'),
+            'map_file': str(tmp_path / 'map.txt'),
+            'algorithm': 'greedy',
+            'parcel_priority': 'volume',
+            'parcel_order': 'non-increasing',
+            'truck_order': 'non-decreasing',
+            'verbose': False}
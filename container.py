@@ -0,0 +1,1299 @@
+"""Containers used by the scheduling algorithms.
+
+===== Module Description =====
+
+This module contains the abstract Container class, as well as PriorityQueue,
+a binary-heap priority queue that removes items in priority order and resolves
+ties in first-in-first-out order, and AddressablePriorityQueue, a priority
+queue whose items can be reprioritised or removed in place, and
+BucketPriorityQueue, a priority queue of items with small integer priorities
+that takes constant amortised time for each operation, and
+MeldablePriorityQueue, a pairing heap that can be merged with another in
+constant time.
+
+It also contains CapacityIndex and FirstFitIndex, which find a slot, such as
+a truck, with enough space for an amount in logarithmic time.
+"""
+from __future__ import annotations
+from collections import deque
+from heapq import heapify, heappop, heappush
+from itertools import count
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, \
+    Optional, Set, Tuple
+
+
+class Container:
+    """A container that holds objects.
+
+    This is an abstract class.  Only child classes should be instantiated.
+    """
+
+    def add(self, item: Any) -> None:
+        """Add <item> to this Container.
+        """
+        raise NotImplementedError
+
+    def remove(self) -> Any:
+        """Remove and return a single item from this Container.
+        """
+        raise NotImplementedError
+
+    def is_empty(self) -> bool:
+        """Return True iff this Container is empty.
+        """
+        raise NotImplementedError
+
+
+# Used in the doctest examples for PriorityQueue
+def _shorter(a: str, b: str) -> bool:
+    """
+    Return True if <a> is shorter than <b>.
+    """
+    return len(a) < len(b)
+
+
+class PriorityQueue(Container):
+    """A queue of items that operates in FIFO-priority order.
+
+    Items are removed from the queue according to priority; the item with the
+    highest priority is removed first.  Ties are resolved in first-in-first-out
+    (FIFO) order, meaning the item which was inserted *earlier* is the first one
+    to be removed.
+
+    Priority is defined either by the <less_than> function or by the <key>
+    function that is provided at time of initialization.  If <less_than>(x, y)
+    is true, then x has higher priority than y and is removed from the queue
+    before y.  If a <key> function is given instead, x has higher priority
+    than y iff <key>(x) < <key>(y).  A key is computed once per item, and keys
+    are compared natively, so this is much faster than calling <less_than>.
+
+    All objects in the container must be of the same type.
+
+    === Private Attributes ===
+    _heap:
+      A binary min-heap of (sort key, sequence number, item) entries.  The
+      entry at index 0 is the *front* of the queue, that is, the next item to
+      be removed.  The sort key is None when <_key> is None.
+    _less_than:
+      A function that compares two items by their priority, or None if the
+      queue is ordered by <_key>.
+    _key:
+      A function that maps an item to its sort key, or None if the queue is
+      ordered by <_less_than>.
+    _count:
+      The sequence number that will be given to the next item added.  Items
+      with equal priority are removed in order of their sequence numbers.
+
+    === Representation Invariants ===
+    - exactly one of <_less_than> and <_key> is None.
+    - all items in <_heap> are of the same type.
+    - the items in <_heap> are appropriate arguments for the function
+      <_less_than> or <_key>, whichever is not None.
+    - for every index i > 0, the entry at index (i - 1) // 2 of <_heap> is
+      not removed after the entry at index i.
+    - the sequence numbers in <_heap> are distinct and less than <_count>.
+    """
+    _heap: List[Tuple[Any, int, Any]]
+    _less_than: Optional[Callable[[Any, Any], bool]]
+    _key: Optional[Callable[[Any], Any]]
+    _count: int
+
+    def __init__(self, less_than: Optional[Callable[[Any, Any], bool]] = None,
+                 items: Optional[Iterable[Any]] = None,
+                 key: Optional[Callable[[Any], Any]] = None) -> None:
+        """Initialize this to a PriorityQueue that orders its items using
+        <less_than> or <key>.  For any two elements x and y of the queue, if
+        <less_than>(x, y) is true, or <key>(x) < <key>(y), then x has higher
+        priority than y.
+
+        If <items> is given, the queue starts out holding those items, added
+        in iteration order.  This takes linear time, rather than the
+        O(n log n) time needed to add the items one by one.
+
+        Precondition: exactly one of <less_than> and <key> is given.
+
+        >>> pq = PriorityQueue(str.__lt__)
+        >>> pq.is_empty()
+        True
+        >>> pq = PriorityQueue(_shorter, ['fred', 'arju', 'monalisa', 'hat'])
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['hat', 'fred', 'arju', 'monalisa']
+        >>> pq = PriorityQueue(key=len, items=['fred', 'arju', 'hat'])
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['hat', 'fred', 'arju']
+        """
+        self._less_than = less_than
+        self._key = key
+        self._heap = []
+        self._count = 0
+        if items is None:
+            return
+        if key is not None:
+            self._heap = [(key(item), seq, item)
+                          for seq, item in enumerate(items)]
+            self._count = len(self._heap)
+            heapify(self._heap)
+        else:
+            self._heap = [(None, seq, item)
+                          for seq, item in enumerate(items)]
+            self._count = len(self._heap)
+            for i in range(len(self._heap) // 2 - 1, -1, -1):
+                self._sift_down(i)
+
+    def __len__(self) -> int:
+        """Return the number of items in this PriorityQueue.
+
+        >>> pq = PriorityQueue(str.__lt__)
+        >>> len(pq)
+        0
+        >>> pq.add('fred')
+        >>> len(pq)
+        1
+        """
+        return len(self._heap)
+
+    def add(self, item: Any) -> None:
+        """Add <item> to this PriorityQueue.
+
+        This takes O(log n) time, where n is the number of items in the queue.
+
+        >>> # Define a PriorityQueue with priority on shorter strings.
+        >>> # I.e., when we remove, we get the shortest remaining string.
+        >>> pq = PriorityQueue(_shorter)
+        >>> pq.add('fred')
+        >>> pq.add('arju')
+        >>> pq.add('monalisa')
+        >>> pq.add('hat')
+        >>> # 'arju' and 'fred' have the same priority, but 'arju' is removed
+        >>> # after 'fred' because it was added later.
+        >>> pq.remove()
+        'hat'
+        >>> pq.remove()
+        'fred'
+        >>> pq.remove()
+        'arju'
+        >>> pq.remove()
+        'monalisa'
+        """
+        if self._key is not None:
+            heappush(self._heap, (self._key(item), self._count, item))
+            self._count += 1
+            return
+        self._heap.append((None, self._count, item))
+        self._count += 1
+        self._sift_up(len(self._heap) - 1)
+
+    def peek(self) -> Any:
+        """Return the item that would be removed next from this
+        PriorityQueue, without removing it.
+
+        Precondition: not self.is_empty()
+
+        >>> pq = PriorityQueue(_shorter)
+        >>> pq.add('fred')
+        >>> pq.add('hat')
+        >>> pq.peek()
+        'hat'
+        >>> len(pq)
+        2
+        """
+        return self._heap[0][2]
+
+    def remove(self) -> Any:
+        """Remove and return the next item from this PriorityQueue.
+
+        This takes O(log n) time, where n is the number of items in the queue.
+
+        Precondition: not self.is_empty()
+
+        >>> pq = PriorityQueue(_shorter)
+        >>> pq.add('fred')
+        >>> pq.add('arju')
+        >>> pq.add('monalisa')
+        >>> pq.add('hat')
+        >>> pq.remove()
+        'hat'
+        >>> pq.remove()
+        'fred'
+        """
+        if self._key is not None:
+            return heappop(self._heap)[2]
+        last = self._heap.pop()
+        if not self._heap:
+            return last[2]
+        front = self._heap[0]
+        self._heap[0] = last
+        self._sift_down(0)
+        return front[2]
+
+    def is_empty(self) -> bool:
+        """Return True iff this PriorityQueue is empty.
+
+        >>> pq = PriorityQueue(str.__lt__)
+        >>> pq.is_empty()
+        True
+        >>> pq.add('fred')
+        >>> pq.is_empty()
+        False
+        """
+        return not self._heap
+
+    def _before(self, a: Tuple[Any, int, Any],
+                b: Tuple[Any, int, Any]) -> bool:
+        """Return True iff the entry <a> is removed before the entry <b>.
+        """
+        if self._key is not None:
+            return a < b
+        if self._less_than(a[2], b[2]):
+            return True
+        if self._less_than(b[2], a[2]):
+            return False
+        return a[1] < b[1]
+
+    def _sift_up(self, i: int) -> None:
+        """Move the entry at index <i> of <_heap> towards the root until the
+        heap order is restored.
+        """
+        heap = self._heap
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._before(entry, heap[parent]):
+                break
+            heap[i] = heap[parent]
+            i = parent
+        heap[i] = entry
+
+    def _sift_down(self, i: int) -> None:
+        """Move the entry at index <i> of <_heap> towards the leaves until the
+        heap order is restored.
+        """
+        heap = self._heap
+        n = len(heap)
+        entry = heap[i]
+        child = 2 * i + 1
+        while child < n:
+            if child + 1 < n and self._before(heap[child + 1], heap[child]):
+                child += 1
+            if not self._before(heap[child], entry):
+                break
+            heap[i] = heap[child]
+            i = child
+            child = 2 * i + 1
+        heap[i] = entry
+
+
+class AddressablePriorityQueue(PriorityQueue):
+    """A PriorityQueue whose items can be found, reprioritised and removed in
+    place.
+
+    Adding an item returns a handle for it.  The handle can later be used to
+    replace the item, for example with one of higher or lower priority, or to
+    discard it without removing the items in front of it.  Handles are never
+    reused, so the handle of an item that has left the queue stays invalid.
+
+    Items given to the initializer get the handles 0, 1, 2, ... in iteration
+    order.
+
+    === Private Attributes ===
+    _positions:
+      Maps the handle of each item in the queue to the index of its entry in
+      <_heap>.  The handle of an item is its sequence number.
+
+    === Representation Invariants ===
+    - len(_positions) == len(_heap)
+    - for every handle h in <_positions>, _heap[_positions[h]][1] == h
+    """
+    _positions: Dict[int, int]
+
+    def __init__(self, less_than: Optional[Callable[[Any, Any], bool]] = None,
+                 items: Optional[Iterable[Any]] = None,
+                 key: Optional[Callable[[Any], Any]] = None) -> None:
+        """Initialize this to an AddressablePriorityQueue that orders its
+        items using <less_than> or <key>.
+
+        See PriorityQueue.__init__ for the full specification.
+
+        Precondition: exactly one of <less_than> and <key> is given.
+
+        >>> pq = AddressablePriorityQueue(_shorter, ['fred', 'hat'])
+        >>> pq.contains(1)
+        True
+        """
+        self._positions = {}
+        super().__init__(less_than, items, key)
+        self._positions = {entry[1]: i for i, entry in enumerate(self._heap)}
+
+    def add(self, item: Any) -> int:
+        """Add <item> to this queue and return its handle.
+
+        This takes O(log n) time, where n is the number of items in the queue.
+
+        >>> pq = AddressablePriorityQueue(_shorter)
+        >>> pq.add('fred')
+        0
+        >>> pq.add('hat')
+        1
+        """
+        handle = self._count
+        self._count += 1
+        self._heap.append((self._sort_key(item), handle, item))
+        self._positions[handle] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+        return handle
+
+    def remove(self) -> Any:
+        """Remove and return the next item from this queue.
+
+        This takes O(log n) time, where n is the number of items in the queue.
+
+        Precondition: not self.is_empty()
+
+        >>> pq = AddressablePriorityQueue(_shorter, ['fred', 'hat'])
+        >>> pq.remove()
+        'hat'
+        >>> pq.contains(1)
+        False
+        """
+        item = self._heap[0][2]
+        self._delete_at(0)
+        return item
+
+    def contains(self, handle: int) -> bool:
+        """Return True iff the item with handle <handle> is in this queue.
+
+        >>> pq = AddressablePriorityQueue(_shorter)
+        >>> handle = pq.add('fred')
+        >>> pq.contains(handle)
+        True
+        >>> pq.discard(handle)
+        >>> pq.contains(handle)
+        False
+        """
+        return handle in self._positions
+
+    def __contains__(self, handle: int) -> bool:
+        """Return True iff the item with handle <handle> is in this queue.
+
+        >>> pq = AddressablePriorityQueue(_shorter)
+        >>> pq.add('fred') in pq
+        True
+        """
+        return handle in self._positions
+
+    def get(self, handle: int) -> Any:
+        """Return the item with handle <handle>, leaving it in this queue.
+
+        Precondition: self.contains(handle)
+
+        >>> pq = AddressablePriorityQueue(_shorter)
+        >>> handle = pq.add('fred')
+        >>> pq.get(handle)
+        'fred'
+        """
+        return self._heap[self._positions[handle]][2]
+
+    def update(self, handle: int, item: Any) -> None:
+        """Replace the item with handle <handle> by <item>, and move it to the
+        place in the queue that its new priority calls for.  The handle stays
+        the same, and so does its position among items of equal priority.
+
+        This takes O(log n) time, where n is the number of items in the queue.
+
+        Precondition: self.contains(handle)
+
+        >>> pq = AddressablePriorityQueue(_shorter)
+        >>> handle = pq.add('monalisa')
+        >>> _ = pq.add('fred')
+        >>> pq.update(handle, 'hat')
+        >>> pq.remove()
+        'hat'
+        """
+        i = self._positions[handle]
+        self._heap[i] = (self._sort_key(item), handle, item)
+        self._sift_up(i)
+        self._sift_down(self._positions[handle])
+
+    def discard(self, handle: int) -> None:
+        """Remove the item with handle <handle> from this queue, if it is
+        still in the queue.
+
+        This takes O(log n) time, where n is the number of items in the queue.
+
+        >>> pq = AddressablePriorityQueue(_shorter)
+        >>> handle = pq.add('hat')
+        >>> _ = pq.add('fred')
+        >>> pq.discard(handle)
+        >>> pq.discard(handle)
+        >>> pq.remove()
+        'fred'
+        """
+        if handle in self._positions:
+            self._delete_at(self._positions[handle])
+
+    def _sort_key(self, item: Any) -> Any:
+        """Return the sort key to store with <item> in its heap entry.
+        """
+        if self._key is None:
+            return None
+        return self._key(item)
+
+    def _delete_at(self, i: int) -> None:
+        """Remove the entry at index <i> of <_heap> and restore the heap order.
+        """
+        heap = self._heap
+        del self._positions[heap[i][1]]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            self._positions[last[1]] = i
+            self._sift_up(i)
+            self._sift_down(self._positions[last[1]])
+
+    def _sift_up(self, i: int) -> None:
+        """Move the entry at index <i> of <_heap> towards the root until the
+        heap order is restored, keeping <_positions> up to date.
+        """
+        heap = self._heap
+        positions = self._positions
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._before(entry, heap[parent]):
+                break
+            heap[i] = heap[parent]
+            positions[heap[i][1]] = i
+            i = parent
+        heap[i] = entry
+        positions[entry[1]] = i
+
+    def _sift_down(self, i: int) -> None:
+        """Move the entry at index <i> of <_heap> towards the leaves until the
+        heap order is restored, keeping <_positions> up to date.
+        """
+        heap = self._heap
+        positions = self._positions
+        n = len(heap)
+        entry = heap[i]
+        child = 2 * i + 1
+        while child < n:
+            if child + 1 < n and self._before(heap[child + 1], heap[child]):
+                child += 1
+            if not self._before(heap[child], entry):
+                break
+            heap[i] = heap[child]
+            positions[heap[i][1]] = i
+            i = child
+            child = 2 * i + 1
+        heap[i] = entry
+        positions[entry[1]] = i
+
+
+class BucketPriorityQueue(Container):
+    """A queue of items with integer priorities that operates in
+    FIFO-priority order.
+
+    Items are removed in the order of their <key>, smallest first, and items
+    with the same key in first-in-first-out order, just as from a
+    PriorityQueue with the same <key>.  When every key is an integer in a
+    range of at most <max_buckets> values, such as parcel volumes or truck
+    capacities, each item is kept in a bucket for its key, and adding or
+    removing an item takes constant amortised time, rather than the
+    O(log n) time of a heap.  Removing also skips over the empty buckets in
+    front of the next item, which takes at most O(C) time in total between
+    adds of an item ahead of the front, where C is the range of keys.
+
+    As soon as a key is not an integer, or the range of keys would be wider
+    than <max_buckets>, the queue moves its items into a PriorityQueue and
+    uses that from then on.  The order items are removed in is the same
+    either way.
+
+    === Private Attributes ===
+    _key:
+      A function that maps an item to its priority.
+    _max_buckets:
+      The largest number of buckets kept before falling back to a heap.
+    _low:
+      The key of the item in the first bucket.
+    _buckets:
+      The items in the queue, in the order they were added, in the bucket
+      for their key.  The bucket at index i holds the items with key
+      <_low> + i, or is None if no item with that key has been added.
+    _front:
+      The index in <_buckets> before which every bucket is empty.
+    _size:
+      The number of items in <_buckets>.
+    _heap:
+      The queue that holds every item instead of <_buckets> once the keys
+      no longer fit in buckets, or None until then.
+
+    === Representation Invariants ===
+    - len(_buckets) <= _max_buckets
+    - 0 <= _front <= len(_buckets)
+    - _size is the total number of items in <_buckets>
+    - if <_heap> is not None, <_buckets> is empty
+    """
+    _key: Callable[[Any], Any]
+    _max_buckets: int
+    _low: int
+    _buckets: List[Optional[Deque[Any]]]
+    _front: int
+    _size: int
+    _heap: Optional[PriorityQueue]
+
+    def __init__(self, key: Callable[[Any], Any],
+                 items: Optional[Iterable[Any]] = None,
+                 bounds: Optional[Tuple[int, int]] = None,
+                 max_buckets: int = 1 << 16) -> None:
+        """Initialize this to a BucketPriorityQueue that orders its items by
+        <key>, keeping at most <max_buckets> buckets.
+
+        If <bounds> is given, buckets for the keys from bounds[0] to
+        bounds[1], inclusive, are made at once; otherwise buckets are made
+        for the keys as they are seen.  If <items> is given, the queue
+        starts out holding those items, added in iteration order.
+
+        >>> pq = BucketPriorityQueue(len, ['fred', 'arju', 'monalisa', 'hat'])
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['hat', 'fred', 'arju', 'monalisa']
+        >>> pq = BucketPriorityQueue(str.lower, ['b', 'A', 'a'])
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['A', 'a', 'b']
+        """
+        self._key = key
+        self._max_buckets = max_buckets
+        self._low = 0
+        self._buckets = []
+        self._front = 0
+        self._size = 0
+        self._heap = None
+        if bounds is not None:
+            self._reserve(*bounds)
+        if items is None:
+            return
+        items = list(items)
+        keys = list(map(key, items))
+        if keys and not (all(isinstance(k, int) for k in keys)
+                         and self._reserve(min(keys), max(keys))):
+            self._heap = PriorityQueue(key=key, items=items)
+            return
+        buckets = self._buckets
+        low = self._low
+        for item, k in zip(items, keys):
+            bucket = buckets[k - low]
+            if bucket is None:
+                bucket = buckets[k - low] = deque()
+            bucket.append(item)
+        self._size = len(items)
+        self._front = min(keys, default=low + len(buckets)) - low
+
+    def __len__(self) -> int:
+        """Return the number of items in this BucketPriorityQueue.
+
+        >>> pq = BucketPriorityQueue(len)
+        >>> pq.add('fred')
+        >>> len(pq)
+        1
+        """
+        if self._heap is not None:
+            return len(self._heap)
+        return self._size
+
+    def add(self, item: Any) -> None:
+        """Add <item> to this BucketPriorityQueue.
+
+        This takes constant amortised time while the keys fit in buckets.
+
+        >>> pq = BucketPriorityQueue(len)
+        >>> pq.add('fred')
+        >>> pq.add('hat')
+        >>> len(pq)
+        2
+        """
+        if self._heap is not None:
+            self._heap.add(item)
+            return
+        k = self._key(item)
+        if not isinstance(k, int):
+            self._fall_back()
+            self._heap.add(item)
+            return
+        i = k - self._low
+        if not 0 <= i < len(self._buckets):
+            if not self._reserve(k, k):
+                self._fall_back()
+                self._heap.add(item)
+                return
+            i = k - self._low
+        bucket = self._buckets[i]
+        if bucket is None:
+            bucket = self._buckets[i] = deque()
+        bucket.append(item)
+        self._size += 1
+        if i < self._front:
+            self._front = i
+
+    def peek(self) -> Any:
+        """Return the item that would be removed next from this
+        BucketPriorityQueue, without removing it.
+
+        Precondition: not self.is_empty()
+
+        >>> pq = BucketPriorityQueue(len, ['fred', 'hat'])
+        >>> pq.peek()
+        'hat'
+        """
+        if self._heap is not None:
+            return self._heap.peek()
+        return self._buckets[self._advance()][0]
+
+    def remove(self) -> Any:
+        """Remove and return the next item from this BucketPriorityQueue.
+
+        This takes constant amortised time while the keys fit in buckets.
+
+        Precondition: not self.is_empty()
+
+        >>> pq = BucketPriorityQueue(len, bounds=(0, 10))
+        >>> pq.add('fred')
+        >>> pq.add('hat')
+        >>> pq.remove()
+        'hat'
+        """
+        if self._heap is not None:
+            return self._heap.remove()
+        i = self._advance()
+        self._size -= 1
+        return self._buckets[i].popleft()
+
+    def is_empty(self) -> bool:
+        """Return True iff this BucketPriorityQueue is empty.
+
+        >>> pq = BucketPriorityQueue(len)
+        >>> pq.is_empty()
+        True
+        """
+        if self._heap is not None:
+            return self._heap.is_empty()
+        return not self._size
+
+    def _advance(self) -> int:
+        """Move <_front> to the first bucket that is not empty, and return
+        its index.
+
+        Raise IndexError if this queue is empty.
+        """
+        if not self._size:
+            raise IndexError('remove from an empty BucketPriorityQueue')
+        buckets = self._buckets
+        i = self._front
+        while not buckets[i]:
+            i += 1
+        self._front = i
+        return i
+
+    def _reserve(self, low: int, high: int) -> bool:
+        """Make sure there are buckets for every key from <low> to <high>,
+        inclusive, and return True, or return False if that would take more
+        than <_max_buckets> buckets.
+
+        The buckets grow by at least their number each time they grow, so
+        that a range that keeps widening takes amortised constant time per
+        key.
+        """
+        if self._buckets:
+            old_low, old_high = self._low, self._low + len(self._buckets) - 1
+            if old_low <= low and high <= old_high:
+                return True
+            low, high = min(low, old_low), max(high, old_high)
+        else:
+            old_low, old_high = low, high
+        if high - low + 1 > self._max_buckets:
+            return False
+        spare = self._max_buckets - (high - low + 1)
+        growth = min(len(self._buckets), spare // 2)
+        if low < old_low:
+            low -= growth
+        if high > old_high:
+            high += growth
+        if not self._buckets:
+            self._buckets = [None] * (high - low + 1)
+            self._front = len(self._buckets)
+        else:
+            self._buckets = ([None] * (old_low - low) + self._buckets
+                             + [None] * (high - old_high))
+            self._front += old_low - low
+        self._low = low
+        return True
+
+    def _fall_back(self) -> None:
+        """Move every item into a PriorityQueue, which holds them from now
+        on.
+        """
+        self._heap = PriorityQueue(key=self._key, items=self._in_order())
+        self._buckets = []
+        self._front = 0
+        self._size = 0
+
+    def _in_order(self) -> Iterator[Any]:
+        """Yield the items in <_buckets> in the order they would be removed.
+        """
+        for bucket in self._buckets[self._front:]:
+            if bucket:
+                yield from bucket
+
+
+# The sequence numbers given to the items added to every
+# MeldablePriorityQueue, so that ties stay in FIFO order across merges.
+_sequence = count()
+
+
+class _PairingNode:
+    """A node of a pairing heap, holding one item of a MeldablePriorityQueue.
+
+    === Public Attributes ===
+    key:
+      The sort key of <item>, or None if its queue has no key function.
+    seq:
+      The sequence number of <item>.  Items of equal priority are removed in
+      order of their sequence numbers.
+    item:
+      The item held.
+    child:
+      The first of the children of this node, or None if it has none.
+    sibling:
+      The next child of the parent of this node, or None if this is the
+      last.
+    """
+    __slots__ = ('key', 'seq', 'item', 'child', 'sibling')
+    key: Any
+    seq: int
+    item: Any
+    child: Optional[_PairingNode]
+    sibling: Optional[_PairingNode]
+
+    def __init__(self, key: Any, seq: int, item: Any) -> None:
+        """Initialize a node holding <item>, with no children or siblings.
+        """
+        self.key = key
+        self.seq = seq
+        self.item = item
+        self.child = None
+        self.sibling = None
+
+
+class MeldablePriorityQueue(Container):
+    """A queue of items that operates in FIFO-priority order, and can be
+    merged with another in constant time.
+
+    Items are ordered by <less_than> or <key> just as in a PriorityQueue,
+    and ties are resolved in first-in-first-out order.  The sequence numbers
+    that resolve ties are shared by every MeldablePriorityQueue, so after
+    two queues are merged, items that tie are still removed in the order
+    they were added, whichever queue they were added to.
+
+    The queue is a pairing heap.  Adding an item and merging two queues take
+    constant time, and removing an item takes O(log n) amortised time.
+    Splitting off the items that satisfy a condition takes linear time, with
+    no comparisons between items.
+
+    === Private Attributes ===
+    _root:
+      The root of the pairing heap, which holds the next item to be
+      removed, or None if the queue is empty.
+    _size:
+      The number of items in the queue.
+    _less_than:
+      A function that compares two items by their priority, or None if the
+      queue is ordered by <_key>.
+    _key:
+      A function that maps an item to its sort key, or None if the queue is
+      ordered by <_less_than>.
+
+    === Representation Invariants ===
+    - exactly one of <_less_than> and <_key> is None.
+    - <_root> has no sibling.
+    - no node is removed after any of its children.
+    - the sequence numbers of the nodes are distinct.
+    """
+    _root: Optional[_PairingNode]
+    _size: int
+    _less_than: Optional[Callable[[Any, Any], bool]]
+    _key: Optional[Callable[[Any], Any]]
+
+    def __init__(self, less_than: Optional[Callable[[Any, Any], bool]] = None,
+                 items: Optional[Iterable[Any]] = None,
+                 key: Optional[Callable[[Any], Any]] = None) -> None:
+        """Initialize this to a MeldablePriorityQueue that orders its items
+        using <less_than> or <key>, holding <items>, if given, added in
+        iteration order.
+
+        See PriorityQueue.__init__ for the full specification.
+
+        Precondition: exactly one of <less_than> and <key> is given.
+
+        >>> pq = MeldablePriorityQueue(_shorter, ['fred', 'arju', 'hat'])
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['hat', 'fred', 'arju']
+        """
+        self._less_than = less_than
+        self._key = key
+        self._root = None
+        self._size = 0
+        for item in items or []:
+            self.add(item)
+
+    def __len__(self) -> int:
+        """Return the number of items in this MeldablePriorityQueue.
+
+        >>> pq = MeldablePriorityQueue(str.__lt__, ['fred'])
+        >>> len(pq)
+        1
+        """
+        return self._size
+
+    def add(self, item: Any) -> None:
+        """Add <item> to this MeldablePriorityQueue.
+
+        This takes constant time.
+
+        >>> pq = MeldablePriorityQueue(_shorter)
+        >>> pq.add('fred')
+        >>> pq.add('arju')
+        >>> pq.add('hat')
+        >>> pq.remove()
+        'hat'
+        >>> pq.remove()
+        'fred'
+        """
+        key = None if self._key is None else self._key(item)
+        self._root = self._link(self._root,
+                                _PairingNode(key, next(_sequence), item))
+        self._size += 1
+
+    def peek(self) -> Any:
+        """Return the item that would be removed next from this
+        MeldablePriorityQueue, without removing it.
+
+        Precondition: not self.is_empty()
+
+        >>> MeldablePriorityQueue(_shorter, ['fred', 'hat']).peek()
+        'hat'
+        """
+        if self._root is None:
+            raise IndexError('peek at an empty MeldablePriorityQueue')
+        return self._root.item
+
+    def remove(self) -> Any:
+        """Remove and return the next item from this MeldablePriorityQueue.
+
+        This takes O(log n) amortised time, where n is the number of items in
+        the queue.
+
+        Precondition: not self.is_empty()
+
+        >>> pq = MeldablePriorityQueue(key=len, items=['fred', 'hat'])
+        >>> pq.remove()
+        'hat'
+        """
+        root = self._root
+        if root is None:
+            raise IndexError('remove from an empty MeldablePriorityQueue')
+        self._root = self._pair(root.child)
+        self._size -= 1
+        return root.item
+
+    def is_empty(self) -> bool:
+        """Return True iff this MeldablePriorityQueue is empty.
+
+        >>> MeldablePriorityQueue(str.__lt__).is_empty()
+        True
+        """
+        return self._root is None
+
+    def merge(self, other: MeldablePriorityQueue) -> None:
+        """Move every item of <other> into this queue, leaving <other>
+        empty.
+
+        This takes constant time.  Items that tie are removed in the order
+        they were added to either queue.
+
+        Precondition: <other> orders its items in the same way as this
+        queue.
+
+        >>> a = MeldablePriorityQueue(_shorter, ['fred', 'monalisa'])
+        >>> b = MeldablePriorityQueue(_shorter, ['hat', 'arju'])
+        >>> a.merge(b)
+        >>> [a.remove() for _ in range(len(a))], len(b)
+        (['hat', 'fred', 'arju', 'monalisa'], 0)
+        """
+        if other is self:
+            return
+        self._root = self._link(self._root, other._root)
+        self._size += other._size
+        other._root = None
+        other._size = 0
+
+    def split(self, condition: Callable[[Any], bool]) \
+            -> MeldablePriorityQueue:
+        """Remove the items that satisfy <condition> from this queue, and
+        return a new queue, ordered in the same way, holding them.
+
+        This takes linear time.  Each item is linked into the queue that
+        holds it with one comparison, so fewer than len(self) comparisons
+        are made.  A comparison compares the keys cached when the items were
+        added, without calling key again, or calls less_than at most twice.
+        Every item keeps its place among items that tie.
+
+        >>> pq = MeldablePriorityQueue(_shorter, ['fred', 'hat', 'arju', 'a'])
+        >>> r = pq.split(lambda word: 'r' in word)
+        >>> [r.remove() for _ in range(len(r))], pq.remove()
+        (['fred', 'arju'], 'a')
+        """
+        taken = MeldablePriorityQueue(self._less_than, key=self._key)
+        kept = []
+        stack = [] if self._root is None else [self._root]
+        while stack:
+            node = stack.pop()
+            if node.sibling is not None:
+                stack.append(node.sibling)
+            if node.child is not None:
+                stack.append(node.child)
+            node.child = node.sibling = None
+            if condition(node.item):
+                taken._root = taken._link(taken._root, node)
+                taken._size += 1
+            else:
+                kept.append(node)
+        self._root = None
+        self._size = len(kept)
+        for node in kept:
+            self._root = self._link(self._root, node)
+        return taken
+
+    def _before(self, a: _PairingNode, b: _PairingNode) -> bool:
+        """Return True iff the item of <a> is removed before that of <b>.
+        """
+        if self._key is not None:
+            return (a.key, a.seq) < (b.key, b.seq)
+        if self._less_than(a.item, b.item):
+            return True
+        if self._less_than(b.item, a.item):
+            return False
+        return a.seq < b.seq
+
+    def _link(self, a: Optional[_PairingNode],
+              b: Optional[_PairingNode]) -> Optional[_PairingNode]:
+        """Return the root of the pairing heap made by joining the heaps
+        rooted at <a> and <b>, the one removed later becoming the first
+        child of the other.
+
+        Precondition: neither <a> nor <b> has a sibling.
+        """
+        if a is None:
+            return b
+        if b is None:
+            return a
+        if self._before(b, a):
+            a, b = b, a
+        b.sibling = a.child
+        a.child = b
+        return a
+
+    def _pair(self, first: Optional[_PairingNode]) -> Optional[_PairingNode]:
+        """Return the root of the pairing heap made by joining the node
+        <first> and its siblings: each pair of them, from the first, is
+        linked, and then the pairs are linked from the last to the first.
+        """
+        pairs = []
+        while first is not None:
+            second = first.sibling
+            if second is None:
+                first.sibling = None
+                pairs.append(first)
+                break
+            rest = second.sibling
+            first.sibling = second.sibling = None
+            pairs.append(self._link(first, second))
+            first = rest
+        root = None
+        for node in reversed(pairs):
+            root = self._link(node, root)
+        return root
+
+
+class CapacityIndex:
+    """An index of slots, each with an amount of space, that finds the slot
+    with the least space that is at least a given amount.
+
+    Slots are small non-negative integers, such as the positions of trucks
+    in a list.  Among slots with the same space, the lowest slot is found
+    first.
+
+    The index is a segment tree over the amounts of space 0 to C, in which
+    each node counts the slots whose space falls in its range.  Only nodes
+    with a non-zero count are stored, so an index over a few slots is small
+    whatever C is.  The slots with each amount of space are kept in a heap,
+    from which discarded slots are removed lazily, when they reach the top
+    or once they make up half of the heap.  Adding, discarding and finding
+    a slot each take O(log C + log n) amortised time, where C is the largest
+    amount of space a slot may have and n is the number of slots, however
+    many slots have the same space.
+
+    === Private Attributes ===
+    _size:
+      The number of leaves of the segment tree, a power of two larger than
+      the largest amount of space a slot may have.
+    _counts:
+      Maps the number of each node of the segment tree to the number of
+      slots whose space falls in the node's range.  The root is node 1, the
+      children of node i are nodes 2i and 2i + 1, and the leaf for space s is
+      node <_size> + s.
+    _live:
+      Maps each amount of space to the set of slots in this index with that
+      space.
+    _buckets:
+      Maps each amount of space in <_live> to a min-heap of slots that holds
+      every slot with that space, and may also hold slots that have since
+      been discarded, or more than one entry for a slot.
+
+    === Representation Invariants ===
+    - every count in <_counts> is positive.
+    - <_counts>[_size + s] == len(<_live>[s]) for every s in <_live>.
+    - every set in <_live> is non-empty.
+    - <_buckets> and <_live> have the same keys, and every slot in
+      <_live>[s] is in <_buckets>[s].
+    - len(<_buckets>[s]) <= 2 * len(<_live>[s]) + 1 for every s in <_live>.
+    """
+    _size: int
+    _counts: Dict[int, int]
+    _live: Dict[int, Set[int]]
+    _buckets: Dict[int, List[int]]
+
+    def __init__(self, limit: int) -> None:
+        """Initialize an empty index for slots with at most <limit> space.
+
+        Precondition: limit >= 0
+        """
+        self._size = 1
+        while self._size <= limit:
+            self._size *= 2
+        self._counts = {}
+        self._live = {}
+        self._buckets = {}
+
+    def __len__(self) -> int:
+        """Return the number of slots in this index.
+
+        >>> index = CapacityIndex(10)
+        >>> index.add(0, 4)
+        >>> len(index)
+        1
+        """
+        return self._counts.get(1, 0)
+
+    def add(self, slot: int, space: int) -> None:
+        """Add <slot> to this index with <space> space.
+
+        Precondition: 0 <= space <= the limit given when the index was made,
+        and <slot> is not in this index.
+        """
+        live = self._live.get(space)
+        if live is None:
+            self._live[space] = {slot}
+            self._buckets[space] = [slot]
+        else:
+            live.add(slot)
+            heappush(self._buckets[space], slot)
+            self._compact(space)
+        counts = self._counts
+        i = self._size + space
+        while i:
+            counts[i] = counts.get(i, 0) + 1
+            i >>= 1
+
+    def discard(self, slot: int, space: int) -> None:
+        """Remove <slot>, which has <space> space, from this index.
+
+        Its entry in the heap for <space> is left in place, to be removed
+        when it reaches the top or when the heap is compacted.
+
+        Precondition: <slot> is in this index with <space> space.
+        """
+        live = self._live[space]
+        live.remove(slot)
+        if live:
+            self._compact(space)
+        else:
+            del self._live[space]
+            del self._buckets[space]
+        counts = self._counts
+        i = self._size + space
+        while i:
+            if counts[i] == 1:
+                del counts[i]
+            else:
+                counts[i] -= 1
+            i >>= 1
+
+    def smallest_fitting(self, space: int) -> Optional[int]:
+        """Return the slot with the least space that is at least <space>,
+        or None if every slot has less space than that.
+
+        >>> index = CapacityIndex(100)
+        >>> for slot, room in enumerate([30, 10, 50, 10]):
+        ...     index.add(slot, room)
+        >>> index.smallest_fitting(5)
+        1
+        >>> index.smallest_fitting(31)
+        2
+        >>> index.smallest_fitting(51) is None
+        True
+        """
+        counts = self._counts
+        size = self._size
+        if space >= size:
+            return None
+        i = size + max(space, 0)
+        if i not in counts:
+            # Climb until there is a right sibling with slots in it, which
+            # holds the nearest larger amounts of space.
+            while i > 1 and (i & 1 or i + 1 not in counts):
+                i >>= 1
+            if i == 1:
+                return None
+            i += 1
+            while i < size:
+                i *= 2
+                if i not in counts:
+                    i += 1
+        return self._lowest(i - size)
+
+    def largest(self) -> Optional[int]:
+        """Return the slot with the most space, or None if this index is
+        empty.
+
+        >>> index = CapacityIndex(100)
+        >>> for slot, room in enumerate([30, 50, 10, 50]):
+        ...     index.add(slot, room)
+        >>> index.largest()
+        1
+        """
+        counts = self._counts
+        if 1 not in counts:
+            return None
+        i = 1
+        while i < self._size:
+            i = 2 * i + 1
+            if i not in counts:
+                i -= 1
+        return self._lowest(i - self._size)
+
+    def _lowest(self, space: int) -> int:
+        """Return the lowest slot with <space> space, first removing the
+        entries of discarded slots from the top of its heap.
+
+        Precondition: some slot in this index has <space> space.
+        """
+        bucket = self._buckets[space]
+        live = self._live[space]
+        while bucket[0] not in live:
+            heappop(bucket)
+        return bucket[0]
+
+    def _compact(self, space: int) -> None:
+        """Rebuild the heap for <space> from the slots with that space if
+        more than half of its entries are stale, so that stale entries take
+        O(1) amortised time each to remove.
+        """
+        bucket = self._buckets[space]
+        live = self._live[space]
+        if len(bucket) > 2 * len(live) + 1:
+            bucket[:] = live
+            heapify(bucket)
+
+
+class FirstFitIndex:
+    """An index of slots 0 to n - 1, each with an amount of space, that finds
+    the lowest slot with at least a given amount of space in O(log n) time.
+
+    === Private Attributes ===
+    _size:
+      The number of leaves of the segment tree, a power of two at least n.
+    _tree:
+      A segment tree in which each node holds the most space of any slot in
+      its range.  The root is at index 1, the children of index i are at 2i
+      and 2i + 1, and the leaf for slot s is at <_size> + s.  Leaves past the
+      last slot hold -1.
+
+    === Representation Invariants ===
+    - _tree[i] == max(_tree[2 * i], _tree[2 * i + 1]) for 1 <= i < _size.
+    """
+    _size: int
+    _tree: List[int]
+
+    def __init__(self, spaces: Iterable[int]) -> None:
+        """Initialize an index of slots whose spaces are <spaces>, in order.
+
+        This takes O(n) time.
+
+        Precondition: every amount of space in <spaces> is at least 0.
+        """
+        spaces = list(spaces)
+        size = 1
+        while size < len(spaces):
+            size *= 2
+        tree = [-1] * size + spaces + [-1] * (size - len(spaces))
+        for i in range(size - 1, 0, -1):
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+        self._size = size
+        self._tree = tree
+
+    def update(self, slot: int, space: int) -> None:
+        """Set the space of <slot> to <space>.
+
+        Precondition: 0 <= slot < n and space >= 0
+        """
+        tree = self._tree
+        i = self._size + slot
+        tree[i] = space
+        i >>= 1
+        while i:
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+            i >>= 1
+
+    def first_fitting(self, space: int) -> Optional[int]:
+        """Return the lowest slot with at least <space> space, or None if
+        there is none.
+
+        >>> index = FirstFitIndex([10, 30, 50, 30])
+        >>> index.first_fitting(20)
+        1
+        >>> index.first_fitting(40)
+        2
+        >>> index.first_fitting(60) is None
+        True
+        """
+        tree = self._tree
+        if len(tree) < 2 or tree[1] < space:
+            return None
+        i = 1
+        while i < self._size:
+            i *= 2
+            if tree[i] < space:
+                i += 1
+        return i - self._size
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'heapq', 'collections', 'itertools',
+                                   '__future__'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
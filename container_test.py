@@ -0,0 +1,323 @@
+import random
+import pytest
+from container import AddressablePriorityQueue, BucketPriorityQueue, \
+    CapacityIndex, FirstFitIndex, MeldablePriorityQueue, PriorityQueue, \
+    _shorter
+
+
+def test_peek_does_not_remove() -> None:
+    """Test that peek returns the front item and leaves it in the queue."""
+    pq = PriorityQueue(_shorter)
+    pq.add('abc')
+    pq.add('de')
+    assert pq.peek() == 'de'
+    assert len(pq) == 2
+    assert pq.remove() == 'de'
+    assert pq.peek() == 'abc'
+
+
+def test_len_tracks_add_and_remove() -> None:
+    """Test that len counts the items currently in the queue."""
+    pq = PriorityQueue(str.__lt__)
+    assert len(pq) == 0
+    for word in ['b', 'a', 'c']:
+        pq.add(word)
+    assert len(pq) == 3
+    pq.remove()
+    assert len(pq) == 2
+
+
+def test_remove_from_empty() -> None:
+    """Test that removing from an empty queue raises IndexError."""
+    pq = PriorityQueue(str.__lt__)
+    with pytest.raises(IndexError):
+        pq.remove()
+
+
+def test_bulk_construction_is_fifo() -> None:
+    """Test that items given to the constructor keep FIFO order on ties."""
+    words = ['abc', 'de', 'fgh', 'i', 'jk', 'lmn']
+    pq = PriorityQueue(_shorter, words)
+    assert [pq.remove() for _ in words] == ['i', 'de', 'jk', 'abc', 'fgh',
+                                            'lmn']
+
+
+def test_matches_stable_sort() -> None:
+    """Test that the queue removes items in stable-sorted order, with adds
+    and removes interleaved."""
+    rng = random.Random(148)
+    pq = PriorityQueue(lambda a, b: a[0] < b[0])
+    expected = []
+    removed = []
+    for i in range(500):
+        item = (rng.randint(0, 20), i)
+        pq.add(item)
+        expected.append(item)
+        if i % 3 == 0:
+            expected.sort(key=lambda x: x[0])
+            assert pq.remove() == expected.pop(0)
+    expected.sort(key=lambda x: x[0])
+    while not pq.is_empty():
+        removed.append(pq.remove())
+    assert removed == expected
+
+
+def test_key_orders_by_key() -> None:
+    """Test that a queue built with a key removes the smallest key first."""
+    pq = PriorityQueue(key=len)
+    for word in ['abc', 'de', 'f']:
+        pq.add(word)
+    assert [pq.remove() for _ in range(3)] == ['f', 'de', 'abc']
+
+
+def test_key_ties_are_fifo() -> None:
+    """Test that items with equal keys are removed in FIFO order, even when
+    the items themselves are not comparable."""
+    items = [{'id': i, 'volume': i % 3} for i in range(9)]
+    pq = PriorityQueue(key=lambda item: -item['volume'], items=items[:4])
+    for item in items[4:]:
+        pq.add(item)
+    assert [pq.remove()['id'] for _ in items] == [2, 5, 8, 1, 4, 7, 0, 3, 6]
+
+
+def test_key_matches_less_than() -> None:
+    """Test that the key and less_than queues agree on the same items."""
+    rng = random.Random(148)
+    words = [''.join('x' * rng.randint(1, 8)) + str(i) for i in range(200)]
+    by_key = PriorityQueue(key=len, items=words)
+    by_less_than = PriorityQueue(_shorter, words)
+    assert ([by_key.remove() for _ in words]
+            == [by_less_than.remove() for _ in words])
+
+
+@pytest.mark.parametrize('by_key', [False, True])
+def test_addressable_update_and_discard(by_key: bool) -> None:
+    """Test that updates and discards keep the queue in stable-sorted order,
+    whether it is ordered by less_than or by key."""
+    rng = random.Random(148)
+    if by_key:
+        pq = AddressablePriorityQueue(key=lambda item: item[0])
+    else:
+        pq = AddressablePriorityQueue(lambda a, b: a[0] < b[0])
+    live = {}
+    for i in range(300):
+        live[pq.add((rng.randint(0, 30), i))] = i
+    for handle in rng.sample(sorted(live), 100):
+        pq.discard(handle)
+        del live[handle]
+    for handle in rng.sample(sorted(live), 100):
+        item = (rng.randint(0, 30), live[handle])
+        pq.update(handle, item)
+        assert pq.get(handle) == item
+    assert len(pq) == len(live)
+    removed = [pq.remove() for _ in range(len(live))]
+    # Equal priorities are removed in the order their handles were issued.
+    handle_of = {item_id: handle for handle, item_id in live.items()}
+    assert removed == sorted(removed,
+                             key=lambda item: (item[0], handle_of[item[1]]))
+    assert not any(pq.contains(handle) for handle in live)
+
+
+def test_addressable_bulk_handles() -> None:
+    """Test that items given to the initializer get handles in order."""
+    pq = AddressablePriorityQueue(_shorter, ['monalisa', 'fred', 'hat'])
+    assert pq.get(0) == 'monalisa'
+    pq.update(0, 'a')
+    pq.discard(2)
+    assert [pq.remove() for _ in range(len(pq))] == ['a', 'fred']
+
+
+def test_capacity_index_matches_scan() -> None:
+    """Test that CapacityIndex finds the slot a scan of every slot finds, as
+    slots are repeatedly filled up."""
+    rng = random.Random(148)
+    spaces = [rng.randint(0, 200) for _ in range(50)]
+    index = CapacityIndex(200)
+    for slot, space in enumerate(spaces):
+        index.add(slot, space)
+    for _ in range(300):
+        wanted = rng.randint(0, 60)
+        fits = [(space, slot) for slot, space in enumerate(spaces)
+                if space >= wanted]
+        slot = index.smallest_fitting(wanted)
+        assert slot == (min(fits)[1] if fits else None)
+        most = max(spaces)
+        assert index.largest() == spaces.index(most)
+        if slot is not None:
+            index.discard(slot, spaces[slot])
+            spaces[slot] -= wanted
+            index.add(slot, spaces[slot])
+    assert len(index) == 50
+
+
+def test_capacity_index_with_equal_spaces() -> None:
+    """Test that CapacityIndex finds the right slots when most slots have the
+    same space and are discarded and added back out of order, and that the
+    heaps of discarded slots stay bounded."""
+    rng = random.Random(148)
+    spaces = [7] * 300 + [rng.randint(0, 10) for _ in range(20)]
+    index = CapacityIndex(10)
+    for slot, space in enumerate(spaces):
+        index.add(slot, space)
+    for _ in range(3000):
+        slot = rng.randrange(len(spaces))
+        index.discard(slot, spaces[slot])
+        spaces[slot] = rng.choice([7, 7, 7, rng.randint(0, 10)])
+        index.add(slot, spaces[slot])
+        wanted = rng.randint(0, 11)
+        fits = [(space, i) for i, space in enumerate(spaces)
+                if space >= wanted]
+        assert index.smallest_fitting(wanted) == \
+            (min(fits)[1] if fits else None)
+        assert index.largest() == spaces.index(max(spaces))
+    for space, bucket in index._buckets.items():
+        assert len(bucket) <= 2 * spaces.count(space) + 1
+
+
+def test_first_fit_index_matches_scan() -> None:
+    """Test that FirstFitIndex finds the lowest slot with enough space, as
+    slots are repeatedly filled up."""
+    rng = random.Random(148)
+    spaces = [rng.randint(0, 200) for _ in range(37)]
+    index = FirstFitIndex(spaces)
+    for _ in range(300):
+        wanted = rng.randint(0, 60)
+        slot = index.first_fitting(wanted)
+        fits = [i for i, space in enumerate(spaces) if space >= wanted]
+        assert slot == (fits[0] if fits else None)
+        if slot is not None:
+            spaces[slot] -= wanted
+            index.update(slot, spaces[slot])
+    assert FirstFitIndex([]).first_fitting(0) is None
+
+
+
+@pytest.mark.parametrize('low, high, max_buckets', [
+    (5, 25, 1 << 16), (-1000, 1000, 1 << 16), (0, 10 ** 6, 1000)])
+def test_bucket_queue_matches_heap(low: int, high: int,
+                                   max_buckets: int) -> None:
+    """Test that a BucketPriorityQueue removes items in the same order as a
+    PriorityQueue, with adds and removes interleaved, whether its buckets
+    grow or it falls back to a heap."""
+    rng = random.Random(148)
+    items = [(rng.randint(low, high), i) for i in range(2000)]
+    bucket = BucketPriorityQueue(lambda item: item[0], items[:100],
+                                 max_buckets=max_buckets)
+    heap = PriorityQueue(key=lambda item: item[0], items=items[:100])
+    for item in items[100:]:
+        bucket.add(item)
+        heap.add(item)
+        if rng.random() < 0.4:
+            assert bucket.peek() == heap.peek()
+            assert bucket.remove() == heap.remove()
+        assert len(bucket) == len(heap)
+    while not heap.is_empty():
+        assert bucket.remove() == heap.remove()
+    assert bucket.is_empty()
+    with pytest.raises(IndexError):
+        bucket.remove()
+
+
+def test_bucket_queue_falls_back_on_other_keys() -> None:
+    """Test that a BucketPriorityQueue keeps its FIFO order when a key that
+    is not an integer makes it fall back to a heap."""
+    pq = BucketPriorityQueue(lambda item: item[0], bounds=(0, 9))
+    for item in [(3, 'a'), (1, 'b'), (3, 'c'), (1, 'd')]:
+        pq.add(item)
+    assert pq.remove() == (1, 'b')
+    pq.add((2.5, 'e'))
+    pq.add((3, 'f'))
+    assert [pq.remove() for _ in range(len(pq))] == \
+        [(1, 'd'), (2.5, 'e'), (3, 'a'), (3, 'c'), (3, 'f')]
+
+
+
+@pytest.mark.parametrize('by_key', [False, True])
+def test_meldable_queue_matches_heap(by_key: bool) -> None:
+    """Test that a MeldablePriorityQueue removes items in the same order as a
+    PriorityQueue, with adds and removes interleaved."""
+    rng = random.Random(148)
+    if by_key:
+        meldable = MeldablePriorityQueue(key=lambda item: item[0])
+        heap = PriorityQueue(key=lambda item: item[0])
+    else:
+        meldable = MeldablePriorityQueue(lambda a, b: a[0] < b[0])
+        heap = PriorityQueue(lambda a, b: a[0] < b[0])
+    for i in range(2000):
+        item = (rng.randint(0, 30), i)
+        meldable.add(item)
+        heap.add(item)
+        if rng.random() < 0.4:
+            assert meldable.peek() == heap.peek()
+            assert meldable.remove() == heap.remove()
+    assert [meldable.remove() for _ in range(len(meldable))] == \
+        [heap.remove() for _ in range(len(heap))]
+    with pytest.raises(IndexError):
+        meldable.remove()
+
+
+def test_merge_keeps_fifo_across_queues() -> None:
+    """Test that merged queues remove items that tie in the order they were
+    added to either queue, and that queues split and merged back give the
+    same order."""
+    rng = random.Random(148)
+    queues = [MeldablePriorityQueue(_shorter) for _ in range(4)]
+    added = []
+    for i in range(400):
+        word = 'x' * rng.randint(1, 8) + str(i)
+        rng.choice(queues).add(word)
+        added.append(word)
+    for other in queues[1:]:
+        queues[0].merge(other)
+        assert other.is_empty()
+    pool = queues[0]
+    odd = pool.split(lambda word: int(word.lstrip('x')) % 2 == 1)
+    assert len(pool) + len(odd) == 400
+    pool.merge(odd)
+    expected = sorted(added, key=len)
+    assert [pool.remove() for _ in added] == expected
+
+
+@pytest.mark.parametrize('by_key', [False, True])
+def test_split_comparisons(by_key: bool) -> None:
+    """Test that splitting a queue makes fewer comparisons than it has items,
+    and never calls the key function again."""
+    calls = []
+
+    def key(item: int) -> int:
+        """Return <item>, counting the call."""
+        calls.append(item)
+        return item
+
+    def less_than(a: int, b: int) -> bool:
+        """Return True iff <a> is less than <b>, counting the call."""
+        calls.append(a)
+        return a < b
+
+    items = [(i * 37) % 101 for i in range(1000)]
+    if by_key:
+        pq = MeldablePriorityQueue(key=key, items=items)
+    else:
+        pq = MeldablePriorityQueue(less_than, items)
+    calls.clear()
+    even = pq.split(lambda item: item % 2 == 0)
+    if by_key:
+        assert calls == []
+    else:
+        assert len(calls) < 2 * len(items)
+    assert [even.remove() for _ in range(len(even))] == \
+        sorted(item for item in items if item % 2 == 0)
+    assert [pq.remove() for _ in range(len(pq))] == \
+        sorted(item for item in items if item % 2 == 1)
+
+
+def test_merge_with_itself() -> None:
+    """Test that merging a queue with itself leaves it unchanged."""
+    pq = MeldablePriorityQueue(_shorter, ['ab', 'c'])
+    pq.merge(pq)
+    assert len(pq) == 2
+    assert [pq.remove(), pq.remove()] == ['c', 'ab']
+
+
+if __name__ == '__main__':
+    pytest.main(['container_test.py'])
@@ -0,0 +1,784 @@
+"""Distances between cities.
+
+===== Module Description =====
+
+This module contains the class DistanceMap, which records the distance from
+one city to another.  Distances need not be symmetric: the distance from
+city A to city B may differ from the distance from city B to city A.
+
+Every city in a DistanceMap is given an integer id when it is first added.
+A dense DistanceMap stores its distances in a flat row-major matrix indexed
+by these ids, so that a lookup is an array index rather than a hash of a
+pair of strings, and a whole route can be summed in one call.
+
+A map that only lists direct road segments can be completed with shortest
+path distances for every other pair of cities, after which every lookup
+between connected cities succeeds.
+
+A map can also be copied into a block of shared memory, which other
+processes attach to as a read-only dense map without copying the distances.
+
+For maps too large for either a dictionary of every pair or a dense matrix,
+LazyDistanceMap stores only the roads, as a compressed sparse graph, and
+finds the shortest path distances from a city when they are first needed,
+keeping the most recently used in a cache of bounded size.
+"""
+from array import array
+from collections import OrderedDict
+from heapq import heappop, heappush
+from itertools import islice, repeat
+from math import log2
+from multiprocessing.shared_memory import SharedMemory
+from operator import add, mul
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+
+class DistanceMap:
+    """A map of the road distances between cities.
+
+    === Private Attributes ===
+    _ids:
+      Maps the name of each city in this map to its integer id.
+    _names:
+      The name of each city in this map, indexed by id.
+    _distances:
+      Maps each (source, destination) pair of city names to the distance
+      from the source to the destination.  Empty if this map is dense.
+    _matrix:
+      If this map is dense, the distance from the city with id i to the city
+      with id j is at index i * <_stride> + j, or -1 if it is not known.
+      None if this map is not dense.  A memoryview of shared memory if this
+      map was attached by attach_shared.
+    _stride:
+      The number of cities that <_matrix> has room for in each row.
+    _version:
+      The number of times a distance in this map has been changed, so that
+      values computed from the map can tell when they are out of date.
+
+    === Representation Invariants ===
+    - _ids[_names[i]] == i for every index i of <_names>.
+    - every recorded distance is >= 0.
+    - if <_matrix> is not None, len(_matrix) == _stride * _stride and
+      len(_names) <= _stride.
+    """
+    _ids: Dict[str, int]
+    _names: List[str]
+    _distances: Dict[Tuple[str, str], int]
+    _matrix: Optional[Union[array, memoryview]]
+    _stride: int
+    _version: int
+
+    def __init__(self, dense: bool = False) -> None:
+        """Initialize an empty DistanceMap.  If <dense> is True, store the
+        distances in a dense matrix indexed by city id.
+
+        >>> m = DistanceMap()
+        >>> m.distance('Montreal', 'Toronto')
+        -1
+        >>> m = DistanceMap(dense=True)
+        >>> m.distance('Montreal', 'Toronto')
+        -1
+        """
+        self._ids = {}
+        self._names = []
+        self._distances = {}
+        self._matrix = array('q') if dense else None
+        self._stride = 0
+        self._version = 0
+
+    def version(self) -> int:
+        """Return a number that changes whenever a distance in this map is
+        recorded or filled in.
+
+        >>> m = DistanceMap()
+        >>> before = m.version()
+        >>> m.add_distance('Montreal', 'Toronto', 4)
+        >>> m.version() == before
+        False
+        """
+        return self._version
+
+    def is_dense(self) -> bool:
+        """Return True iff this map stores its distances in a dense matrix.
+
+        >>> DistanceMap(dense=True).is_dense()
+        True
+        """
+        return self._matrix is not None
+
+    def densify(self) -> None:
+        """Move the distances in this map into a dense matrix, if they are
+        not already stored in one.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4, 5)
+        >>> m.densify()
+        >>> m.is_dense(), m.distance('Toronto', 'Montreal')
+        (True, 5)
+        """
+        if self._matrix is not None:
+            return
+        self._matrix = array('q')
+        self._stride = 0
+        self._grow(len(self._names))
+        ids = self._ids
+        for (city1, city2), distance in self._distances.items():
+            self._matrix[ids[city1] * self._stride + ids[city2]] = distance
+        self._distances = {}
+
+    def complete_shortest_paths(self, method: str = 'auto') -> str:
+        """Fill in every distance missing from this map with the length of
+        the shortest path between the two cities along the recorded
+        distances, and return the name of the method used.  Distances that
+        were recorded are kept as they are, and the distance from each city
+        to itself becomes 0.  Pairs with no path between them stay missing.
+
+        The map becomes dense, so that later lookups stay O(1).  <method> is
+        'dijkstra', which runs Dijkstra's algorithm from every city and suits
+        sparse maps, 'floyd-warshall', which suits dense maps, or 'auto',
+        which picks whichever should be faster for this map.  Raise
+        ValueError if <method> is anything else.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> m.add_distance('Hamilton', 'London', 12, 14)
+        >>> m.complete_shortest_paths()
+        'dijkstra'
+        >>> m.distance('Toronto', 'London'), m.distance('London', 'Toronto')
+        (21, 23)
+        """
+        if method not in ('auto', 'dijkstra', 'floyd-warshall'):
+            raise ValueError(f'unknown method {method!r}')
+        self.densify()
+        n = len(self._names)
+        rows = self._rows()
+        if method == 'auto':
+            # Dijkstra from every source costs about n * m * log(n) steps,
+            # Floyd-Warshall about n ** 3.
+            edges = sum(len(row) - row.count(-1) for row in rows)
+            if edges * log2(n + 1) >= n * n:
+                method = 'floyd-warshall'
+            else:
+                method = 'dijkstra'
+        if method == 'floyd-warshall':
+            shortest = _floyd_warshall(rows)
+        else:
+            shortest = _dijkstra_all(rows)
+        stride = self._stride
+        matrix = self._matrix
+        for i in range(n):
+            row = matrix[i * stride:i * stride + n]
+            for j in range(n):
+                if row[j] == -1:
+                    row[j] = shortest[i][j]
+            row[i] = 0
+            matrix[i * stride:i * stride + n] = row
+        self._version += 1
+        return method
+
+    def city_id(self, city: str) -> int:
+        """Return the id of <city>, or -1 if <city> is not in this map.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4)
+        >>> m.city_id('Toronto'), m.city_id('Hamilton')
+        (1, -1)
+        """
+        return self._ids.get(city, -1)
+
+    def city_ids(self, cities: Iterable[str]) -> List[int]:
+        """Return the ids of <cities>, in order.
+
+        Precondition: every city in <cities> is in this map.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4)
+        >>> m.city_ids(['Toronto', 'Montreal', 'Toronto'])
+        [1, 0, 1]
+        """
+        return list(map(self._ids.__getitem__, cities))
+
+    def city_name(self, city_id: int) -> str:
+        """Return the name of the city with id <city_id>.
+
+        Precondition: <city_id> is the id of a city in this map.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4)
+        >>> m.city_name(1)
+        'Toronto'
+        """
+        return self._names[city_id]
+
+    def num_cities(self) -> int:
+        """Return the number of cities in this map.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4)
+        >>> m.num_cities()
+        2
+        """
+        return len(self._names)
+
+    def add_distance(self, city1: str, city2: str, distance: int,
+                     distance_back: Optional[int] = None) -> None:
+        """Record that the distance from <city1> to <city2> is <distance>, and
+        that the distance from <city2> to <city1> is <distance_back>.
+
+        If <distance_back> is not given, the distance is the same in both
+        directions.  Negative distances are recorded as their absolute value.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4, 5)
+        >>> m.distance('Montreal', 'Toronto')
+        4
+        >>> m.distance('Toronto', 'Montreal')
+        5
+        """
+        if distance_back is None:
+            distance_back = distance
+        self._version += 1
+        id1 = self._add_city(city1)
+        id2 = self._add_city(city2)
+        if self._matrix is None:
+            self._distances[(city1, city2)] = abs(distance)
+            self._distances[(city2, city1)] = abs(distance_back)
+        else:
+            self._matrix[id1 * self._stride + id2] = abs(distance)
+            self._matrix[id2 * self._stride + id1] = abs(distance_back)
+
+    def distance(self, city1: str, city2: str) -> int:
+        """Return the distance from <city1> to <city2>, or -1 if that distance
+        is not recorded in this map.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4)
+        >>> m.distance('Toronto', 'Montreal')
+        4
+        >>> m.distance('Toronto', 'Hamilton')
+        -1
+        """
+        if self._matrix is None:
+            return self._distances.get((city1, city2), -1)
+        id1 = self._ids.get(city1)
+        id2 = self._ids.get(city2)
+        if id1 is None or id2 is None:
+            return -1
+        return self._matrix[id1 * self._stride + id2]
+
+    def distance_by_id(self, id1: int, id2: int) -> int:
+        """Return the distance from the city with id <id1> to the city with
+        id <id2>, or -1 if that distance is not recorded in this map.
+
+        Precondition: <id1> and <id2> are ids of cities in this map.
+
+        >>> m = DistanceMap(dense=True)
+        >>> m.add_distance('Montreal', 'Toronto', 4, 5)
+        >>> m.distance_by_id(1, 0)
+        5
+        """
+        if self._matrix is None:
+            return self._distances.get((self._names[id1], self._names[id2]),
+                                       -1)
+        return self._matrix[id1 * self._stride + id2]
+
+    def route_length(self, city_ids: Sequence[int]) -> int:
+        """Return the total length of the route that visits the cities with
+        ids <city_ids>, in order.  The route does not return to its start
+        unless the start id is repeated at the end.
+
+        In a dense map, every leg is looked up and summed in a single pass
+        over the matrix, without a Python-level loop.
+
+        Precondition: this map records the distance of every leg of the
+        route.
+
+        >>> m = DistanceMap(dense=True)
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> m.add_distance('Hamilton', 'London', 12, 14)
+        >>> m.route_length(m.city_ids(['Toronto', 'Hamilton', 'London']))
+        21
+        >>> m.route_length([0])
+        0
+        """
+        starts = islice(city_ids, 0, max(len(city_ids) - 1, 0))
+        ends = islice(city_ids, 1, None)
+        if self._matrix is None:
+            return sum(map(self.distance_by_id, starts, ends))
+        return sum(map(self._matrix.__getitem__,
+                       map(add, map(mul, starts, repeat(self._stride)),
+                           ends)))
+
+    def share(self) -> Tuple[SharedMemory, List[str]]:
+        """Copy the distances in this map into a new block of shared memory,
+        as a dense matrix, and return the block and the name of each city,
+        indexed by id.  Other processes can pass these to attach_shared.
+
+        The caller must close and unlink the block once it is no longer
+        needed.
+
+        >>> m = DistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4, 5)
+        >>> block, names = m.share()
+        >>> names
+        ['Montreal', 'Toronto']
+        >>> block.close()
+        >>> block.unlink()
+        """
+        n = len(self._names)
+        block = SharedMemory(create=True, size=max(n * n, 1) * 8)
+        matrix = block.buf.cast('q')
+        if self._matrix is None:
+            matrix[:n * n] = array('q', [-1]) * (n * n)
+            ids = self._ids
+            for (city1, city2), distance in self._distances.items():
+                matrix[ids[city1] * n + ids[city2]] = distance
+        else:
+            stride = self._stride
+            for i in range(n):
+                matrix[i * n:(i + 1) * n] = \
+                    self._matrix[i * stride:i * stride + n]
+        matrix.release()
+        return block, list(self._names)
+
+    def _add_city(self, city: str) -> int:
+        """Return the id of <city>, adding it to this map first if it is not
+        already in it.
+        """
+        city_id = self._ids.get(city)
+        if city_id is None:
+            city_id = len(self._names)
+            self._ids[city] = city_id
+            self._names.append(city)
+            if self._matrix is not None and city_id >= self._stride:
+                self._grow(max(2 * self._stride, 8))
+        return city_id
+
+    def _rows(self) -> List[array]:
+        """Return a copy of each row of <_matrix>, cut to the number of
+        cities in this map.
+
+        Precondition: this map is dense.
+        """
+        n = len(self._names)
+        stride = self._stride
+        return [self._matrix[i * stride:i * stride + n] for i in range(n)]
+
+    def _grow(self, stride: int) -> None:
+        """Make room in <_matrix> for <stride> cities, keeping the distances
+        already recorded.
+        """
+        old, old_stride = self._matrix, self._stride
+        matrix = array('q', [-1]) * (stride * stride)
+        for i in range(old_stride):
+            matrix[i * stride:i * stride + old_stride] = \
+                old[i * old_stride:(i + 1) * old_stride]
+        self._matrix = matrix
+        self._stride = stride
+
+
+class LazyDistanceMap(DistanceMap):
+    """A map of the road distances between cities that finds shortest path
+    distances on demand.
+
+    A LazyDistanceMap answers every lookup as a DistanceMap does after
+    complete_shortest_paths: the distance between two cities is the one
+    recorded for them if there is one, 0 from a city to itself, and
+    otherwise the length of the shortest path between them, or -1 if there
+    is none.
+
+    Only the recorded roads are stored, in compressed sparse row (CSR) form:
+    the roads from each city are a contiguous run of three flat arrays.  The
+    first lookup from a city runs Dijkstra's algorithm from it, and its row
+    of distances to every city is kept in a least recently used cache, which
+    drops the oldest rows once they take more than <max_bytes> bytes.  The
+    most recent row is always kept.  The number of lookups answered from the
+    cache, and of rows computed, are counted.
+
+    Recording a distance discards every cached row, and the graph is rebuilt
+    with the new distances when next needed, so a map should be read in full
+    before it is used.  Once the graph is built, each road is stored only in
+    it.
+
+    === Private Attributes ===
+    _max_bytes:
+      The number of bytes of rows that <_cache> may hold.
+    _firsts:
+      The id of the city each distance recorded since the graph was last
+      built is from, in the order they were recorded.
+    _seconds:
+      The id of the city each distance in <_firsts> is to.
+    _lengths:
+      Each distance in <_firsts>.
+    _offsets:
+      The roads from the city with id i are at the indices from _offsets[i]
+      up to _offsets[i + 1] of <_targets> and <_weights>, for each city in
+      this map when the graph was last built.  None if it has never been
+      built.
+    _targets:
+      The id of the city each road goes to, in increasing order for the
+      roads from each city.
+    _weights:
+      The length of each road.
+    _cache:
+      Maps the id of each city whose row is cached to its row, the distance
+      from it to the city with each id, from least to most recently used.
+    _row_bytes:
+      The number of bytes taken by the rows in <_cache>.
+    _hits:
+      The number of rows found in <_cache>.
+    _misses:
+      The number of rows computed because they were not in <_cache>.
+    _evictions:
+      The number of rows dropped from <_cache> to keep within <_max_bytes>.
+
+    === Representation Invariants ===
+    - len(_firsts) == len(_seconds) == len(_lengths)
+    - _row_bytes <= _max_bytes, unless <_cache> holds a single row.
+    - every row in <_cache> has an entry for every city in this map.
+    """
+    _max_bytes: int
+    _firsts: array
+    _seconds: array
+    _lengths: array
+    _offsets: Optional[array]
+    _targets: array
+    _weights: array
+    _cache: OrderedDict
+    _row_bytes: int
+    _hits: int
+    _misses: int
+    _evictions: int
+
+    def __init__(self, max_bytes: int = 1 << 28) -> None:
+        """Initialize an empty LazyDistanceMap that caches at most
+        <max_bytes> bytes of rows.
+
+        >>> m = LazyDistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> m.add_distance('Hamilton', 'London', 12, 14)
+        >>> m.distance('Toronto', 'London'), m.distance('London', 'Toronto')
+        (21, 23)
+        >>> m.distance('Toronto', 'Montreal')
+        -1
+        """
+        super().__init__()
+        self._max_bytes = max_bytes
+        self._firsts = array('q')
+        self._seconds = array('q')
+        self._lengths = array('q')
+        self._offsets = None
+        self._targets = array('q')
+        self._weights = array('q')
+        self._cache = OrderedDict()
+        self._row_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def cache_info(self) -> Dict[str, int]:
+        """Return the number of row 'hits' and 'misses' so far, the number
+        of rows dropped from the cache, or 'evictions', the number of 'rows'
+        cached and the 'bytes' they take, and the 'max_bytes' they may take.
+
+        >>> m = LazyDistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> m.distance('Toronto', 'Hamilton'), m.distance('Toronto', 'Toronto')
+        (9, 0)
+        >>> info = m.cache_info()
+        >>> info['hits'], info['misses'], info['rows']
+        (1, 1, 1)
+        """
+        return {'hits': self._hits, 'misses': self._misses,
+                'evictions': self._evictions, 'rows': len(self._cache),
+                'bytes': self._row_bytes, 'max_bytes': self._max_bytes}
+
+    def densify(self) -> None:
+        """Do nothing: a LazyDistanceMap never stores every distance.
+        """
+
+    def complete_shortest_paths(self, method: str = 'auto') -> str:
+        """Return 'lazy', since every distance missing from this map is
+        already found, when it is looked up, as the length of the shortest
+        path.  <method> is ignored.
+
+        >>> LazyDistanceMap().complete_shortest_paths()
+        'lazy'
+        """
+        return 'lazy'
+
+    def add_distance(self, city1: str, city2: str, distance: int,
+                     distance_back: Optional[int] = None) -> None:
+        """Record that the distance from <city1> to <city2> is <distance>, and
+        that the distance from <city2> to <city1> is <distance_back>.
+
+        See DistanceMap.add_distance for the full specification.
+
+        >>> m = LazyDistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4, 5)
+        >>> m.distance('Toronto', 'Montreal')
+        5
+        """
+        if distance_back is None:
+            distance_back = distance
+        self._version += 1
+        id1 = self._add_city(city1)
+        id2 = self._add_city(city2)
+        self._firsts.extend((id1, id2))
+        self._seconds.extend((id2, id1))
+        self._lengths.extend((abs(distance), abs(distance_back)))
+        self._cache.clear()
+        self._row_bytes = 0
+
+    def distance(self, city1: str, city2: str) -> int:
+        """Return the distance from <city1> to <city2>, or -1 if there is no
+        path from <city1> to <city2> in this map.
+
+        >>> m = LazyDistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4)
+        >>> m.distance('Toronto', 'Hamilton')
+        -1
+        """
+        id1 = self._ids.get(city1)
+        id2 = self._ids.get(city2)
+        if id1 is None or id2 is None:
+            return -1
+        return self._row(id1)[id2]
+
+    def distance_by_id(self, id1: int, id2: int) -> int:
+        """Return the distance from the city with id <id1> to the city with
+        id <id2>, or -1 if there is no path between them.
+
+        Precondition: <id1> and <id2> are ids of cities in this map.
+
+        >>> m = LazyDistanceMap()
+        >>> m.add_distance('Montreal', 'Toronto', 4, 5)
+        >>> m.distance_by_id(1, 0)
+        5
+        """
+        return self._row(id1)[id2]
+
+    def route_length(self, city_ids: Sequence[int]) -> int:
+        """Return the total length of the route that visits the cities with
+        ids <city_ids>, in order.
+
+        See DistanceMap.route_length for the full specification.
+
+        >>> m = LazyDistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> m.add_distance('Hamilton', 'London', 12, 14)
+        >>> m.route_length(m.city_ids(['Toronto', 'London', 'Toronto']))
+        44
+        """
+        row = self._row
+        return sum(row(start)[end]
+                   for start, end in zip(city_ids, islice(city_ids, 1, None)))
+
+    def share(self) -> Tuple[SharedMemory, List[str]]:
+        """Copy every distance in this map into a new block of shared
+        memory, as a dense matrix, and return the block and the name of each
+        city, indexed by id.
+
+        This computes the row of every city, so it only suits maps whose
+        dense matrix fits in memory.  See DistanceMap.share for the full
+        specification.
+        """
+        n = len(self._names)
+        block = SharedMemory(create=True, size=max(n * n, 1) * 8)
+        matrix = block.buf.cast('q')
+        for i in range(n):
+            matrix[i * n:(i + 1) * n] = self._row(i)
+        matrix.release()
+        return block, list(self._names)
+
+    def _row(self, source: int) -> array:
+        """Return the distance from the city with id <source> to the city
+        with each id, from the cache if it is there, and otherwise computing
+        it and adding it to the cache.
+        """
+        row = self._cache.get(source)
+        if row is not None:
+            self._hits += 1
+            self._cache.move_to_end(source)
+            return row
+        self._misses += 1
+        if self._offsets is None or self._firsts:
+            self._build()
+        row = self._dijkstra(source)
+        self._cache[source] = row
+        self._row_bytes += len(row) * row.itemsize
+        while self._row_bytes > self._max_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self._row_bytes -= len(old) * old.itemsize
+            self._evictions += 1
+        return row
+
+    def _build(self) -> None:
+        """Build the compressed sparse graph of the recorded distances, from
+        the graph built before and the distances recorded since, which are
+        then forgotten.  The distance recorded last for a pair of cities
+        replaces those before it, and distances from a city to itself are
+        left out.
+        """
+        n = len(self._names)
+        firsts, seconds, lengths = self._firsts, self._seconds, self._lengths
+        old = self._offsets
+        if old is not None:
+            # The roads in the graph were recorded before the distances in
+            # <_firsts>, so they go first.
+            built = array('q')
+            for i in range(len(old) - 1):
+                built.extend(repeat(i, old[i + 1] - old[i]))
+            firsts = built + firsts
+            seconds = self._targets + seconds
+            lengths = self._weights + lengths
+        pairs = [first * n + second for first, second in zip(firsts, seconds)]
+        # The sort is stable, so the last distance recorded for each pair
+        # comes last among the distances for that pair.
+        order = sorted(range(len(pairs)), key=pairs.__getitem__)
+        counts = [0] * (n + 1)
+        targets = array('q')
+        weights = array('q')
+        for k, i in enumerate(order):
+            if k + 1 < len(order) and pairs[order[k + 1]] == pairs[i]:
+                continue
+            if firsts[i] != seconds[i]:
+                counts[firsts[i] + 1] += 1
+                targets.append(seconds[i])
+                weights.append(lengths[i])
+        offsets = array('q', counts)
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        self._offsets, self._targets, self._weights = offsets, targets, weights
+        self._firsts = array('q')
+        self._seconds = array('q')
+        self._lengths = array('q')
+
+    def _dijkstra(self, source: int) -> array:
+        """Return the distance from the city with id <source> to the city
+        with each id: 0 to itself, the recorded distance if there is one,
+        and otherwise the length of the shortest path, or -1 if there is no
+        path.
+
+        Precondition: the compressed sparse graph is built.
+        """
+        offsets, targets, weights = self._offsets, self._targets, self._weights
+        best = [-1] * len(self._names)
+        best[source] = 0
+        done = bytearray(len(best))
+        frontier = [(0, source)]
+        while frontier:
+            dist, city = heappop(frontier)
+            if done[city]:
+                continue
+            done[city] = 1
+            for k in range(offsets[city], offsets[city + 1]):
+                other = targets[k]
+                new = dist + weights[k]
+                old = best[other]
+                if old == -1 or new < old:
+                    best[other] = new
+                    heappush(frontier, (new, other))
+        # Recorded distances are kept as they are, even where a path is
+        # shorter, as DistanceMap.complete_shortest_paths keeps them.
+        for k in range(offsets[source], offsets[source + 1]):
+            best[targets[k]] = weights[k]
+        best[source] = 0
+        return array('q', best)
+
+
+def _dijkstra_all(rows: List[array]) -> List[List[int]]:
+    """Return the matrix of shortest path lengths between the cities whose
+    direct distances are in <rows>, found by running Dijkstra's algorithm
+    from every city.  Missing distances are -1, in <rows> and in the result.
+    """
+    n = len(rows)
+    neighbours = [[(j, d) for j, d in enumerate(row) if d >= 0 and j != i]
+                  for i, row in enumerate(rows)]
+    result = []
+    for source in range(n):
+        best = [-1] * n
+        best[source] = 0
+        done = [False] * n
+        frontier = [(0, source)]
+        while frontier:
+            dist, city = heappop(frontier)
+            if done[city]:
+                continue
+            done[city] = True
+            for other, d in neighbours[city]:
+                new = dist + d
+                if best[other] == -1 or new < best[other]:
+                    best[other] = new
+                    heappush(frontier, (new, other))
+        result.append(best)
+    return result
+
+
+def _floyd_warshall(rows: List[array]) -> List[List[int]]:
+    """Return the matrix of shortest path lengths between the cities whose
+    direct distances are in <rows>, found by the Floyd-Warshall algorithm.
+    Missing distances are -1, in <rows> and in the result.
+    """
+    n = len(rows)
+    unreachable = float('inf')
+    dist = [[unreachable if d == -1 else d for d in row] for row in rows]
+    for i in range(n):
+        dist[i][i] = 0
+    for k in range(n):
+        through = dist[k]
+        for i in range(n):
+            to_k = dist[i][k]
+            if to_k == unreachable:
+                continue
+            # Relax the whole row at once rather than element by element.
+            dist[i] = list(map(min, dist[i], map(add, repeat(to_k),
+                                                 through)))
+    return [[-1 if d == unreachable else int(d) for d in row]
+            for row in dist]
+
+
+def attach_shared(name: str,
+                  names: List[str]) -> Tuple[SharedMemory, DistanceMap]:
+    """Return the block of shared memory called <name>, made by
+    DistanceMap.share, and a dense map that reads its distances from the
+    block without copying them.  <names> is the name of each city, indexed
+    by id, as returned by DistanceMap.share.
+
+    The map must only be read, and must be dropped before the block is
+    closed.
+
+    >>> m = DistanceMap()
+    >>> m.add_distance('Montreal', 'Toronto', 4, 5)
+    >>> block, names = m.share()
+    >>> attached, shared = attach_shared(block.name, names)
+    >>> shared.distance('Toronto', 'Montreal')
+    5
+    >>> del shared
+    >>> attached.close()
+    >>> block.close()
+    >>> block.unlink()
+    """
+    block = SharedMemory(name)
+    dmap = DistanceMap(dense=True)
+    dmap._names = list(names)
+    dmap._ids = {city: i for i, city in enumerate(names)}
+    dmap._stride = len(names)
+    dmap._matrix = block.buf.cast('q')
+    return block, dmap
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing', 'array',
+                                   'collections', 'heapq',
+                                   'itertools', 'math',
+                                   'multiprocessing.shared_memory',
+                                   'operator'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
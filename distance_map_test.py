@@ -1,6 +1,8 @@
+import random
 import pytest
 from typing import Dict
-from distance_map import DistanceMap
+from distance_map import DistanceMap, LazyDistanceMap
+from experiment import SchedulingExperiment
 
 
 def test_neg_distance() -> None:
@@ -33,5 +35,177 @@ def test_city_not_str() -> None:
     """"Test it boi"""
 
 
+@pytest.mark.parametrize('dense', [False, True])
+def test_asymmetric_distances(dense: bool) -> None:
+    """Test that each direction keeps its own distance."""
+    m = DistanceMap(dense)
+    m.add_distance('Toronto', 'Hamilton', 9, 11)
+    assert m.distance('Toronto', 'Hamilton') == 9
+    assert m.distance('Hamilton', 'Toronto') == 11
+    assert m.distance('Toronto', 'London') == -1
+
+
+def test_dense_matches_sparse() -> None:
+    """Test that a dense map and a sparse map agree on every lookup and
+    route, across several growths of the dense matrix."""
+    rng = random.Random(148)
+    cities = [f'City{i}' for i in range(40)]
+    sparse = DistanceMap()
+    dense = DistanceMap(dense=True)
+    for _ in range(300):
+        c1, c2 = rng.sample(cities, 2)
+        d1, d2 = rng.randint(1, 99), rng.randint(1, 99)
+        sparse.add_distance(c1, c2, d1, d2)
+        dense.add_distance(c1, c2, d1, d2)
+    for c1 in cities:
+        for c2 in cities:
+            assert dense.distance(c1, c2) == sparse.distance(c1, c2)
+    known = [c for c in cities if sparse.city_id(c) != -1]
+    route = [known[0]]
+    for _ in range(10):
+        options = [c for c in known if sparse.distance(route[-1], c) != -1]
+        route.append(rng.choice(options))
+    expected = sum(sparse.distance(a, b) for a, b in zip(route, route[1:]))
+    assert sparse.route_length(sparse.city_ids(route)) == expected
+    assert dense.route_length(dense.city_ids(route)) == expected
+
+
+def test_densify_keeps_distances() -> None:
+    """Test that densifying a map keeps its distances and lets it grow."""
+    m = DistanceMap()
+    m.add_distance('Toronto', 'Hamilton', 9, 11)
+    m.densify()
+    m.add_distance('Hamilton', 'London', 12)
+    assert m.is_dense()
+    assert m.distance('Hamilton', 'Toronto') == 11
+    assert m.distance('London', 'Hamilton') == 12
+
+
+def test_shortest_path_methods_agree() -> None:
+    """Test that Dijkstra and Floyd-Warshall complete a random sparse map
+    with the same distances, keeping the recorded ones."""
+    rng = random.Random(148)
+    maps = [DistanceMap(), DistanceMap()]
+    recorded = {}
+    for _ in range(60):
+        c1, c2 = rng.sample(range(25), 2)
+        d1, d2 = rng.randint(1, 50), rng.randint(1, 50)
+        recorded[(c1, c2)] = d1
+        recorded[(c2, c1)] = d2
+        for m in maps:
+            m.add_distance(f'C{c1}', f'C{c2}', d1, d2)
+    assert maps[0].complete_shortest_paths('dijkstra') == 'dijkstra'
+    assert maps[1].complete_shortest_paths('floyd-warshall') == \
+        'floyd-warshall'
+    cities = [f'C{i}' for i in range(25) if maps[0].city_id(f'C{i}') != -1]
+    for c1 in cities:
+        assert maps[0].distance(c1, c1) == 0
+        for c2 in cities:
+            assert maps[0].distance(c1, c2) == maps[1].distance(c1, c2)
+    for (c1, c2), d in recorded.items():
+        assert maps[0].distance(f'C{c1}', f'C{c2}') == d
+
+
+def test_shortest_paths_leave_unreachable_missing() -> None:
+    """Test that cities with no path between them stay missing."""
+    m = DistanceMap()
+    m.add_distance('Toronto', 'Hamilton', 9)
+    m.add_distance('Montreal', 'Quebec', 25)
+    m.complete_shortest_paths()
+    assert m.distance('Toronto', 'Quebec') == -1
+    assert m.distance('Quebec', 'Montreal') == 25
+
+
+
+def test_unknown_shortest_path_method() -> None:
+    """Test that an unknown method is rejected, leaving the map as it was."""
+    m = DistanceMap()
+    m.add_distance('Toronto', 'Hamilton', 9)
+    with pytest.raises(ValueError):
+        m.complete_shortest_paths('bellman-ford')
+    assert not m.is_dense()
+
+
+def test_lazy_map_matches_completed_map() -> None:
+    """Test that a LazyDistanceMap gives the distances of a completed
+    DistanceMap, including pairs recorded twice, roads longer than a path
+    between their cities, and cities with no path between them."""
+    rng = random.Random(148)
+    complete = DistanceMap()
+    lazy = LazyDistanceMap()
+    for _ in range(120):
+        c1, c2 = rng.sample(range(40), 2)
+        d1, d2 = rng.randint(1, 50), rng.randint(1, 50)
+        for m in (complete, lazy):
+            m.add_distance(f'C{c1}', f'C{c2}', d1, d2)
+    for m in (complete, lazy):
+        m.add_distance('Island', 'Islet', 3)
+    complete.complete_shortest_paths()
+    assert lazy.complete_shortest_paths() == 'lazy'
+    cities = [complete.city_name(i) for i in range(complete.num_cities())]
+    for c1 in cities:
+        for c2 in cities:
+            assert lazy.distance(c1, c2) == complete.distance(c1, c2)
+    ids = lazy.city_ids(cities)
+    assert lazy.route_length(ids[:10]) == complete.route_length(ids[:10])
+
+
+def test_lazy_map_cache() -> None:
+    """Test that a LazyDistanceMap keeps the most recently used rows within
+    its memory cap, counts its hits and misses, and drops its rows when a
+    distance is recorded."""
+    m = LazyDistanceMap(max_bytes=2 * 4 * 8)
+    for i in range(3):
+        m.add_distance(f'C{i}', f'C{i + 1}', 10)
+    m.distance('C0', 'C3')
+    m.distance('C1', 'C3')
+    m.distance('C0', 'C2')
+    m.distance('C2', 'C3')
+    info = m.cache_info()
+    assert (info['hits'], info['misses'], info['evictions']) == (1, 3, 1)
+    assert (info['rows'], info['bytes']) == (2, 64)
+    m.distance('C1', 'C0')
+    assert m.cache_info()['misses'] == 4
+    version = m.version()
+    m.add_distance('C0', 'C3', 5)
+    assert m.version() != version
+    assert m.cache_info()['rows'] == 0
+    assert m.distance('C1', 'C3') == 15
+
+
+def test_lazy_map_stores_roads_once() -> None:
+    """Test that a LazyDistanceMap forgets the distances it recorded once
+    they are in its graph, and still gives the right distances when more
+    are recorded after the graph is built."""
+    rng = random.Random(148)
+    complete = DistanceMap()
+    lazy = LazyDistanceMap()
+    for step in range(3):
+        for _ in range(40):
+            c1, c2 = rng.sample(range(15 + 10 * step), 2)
+            d1, d2 = rng.randint(1, 50), rng.randint(1, 50)
+            for m in (complete, lazy):
+                m.add_distance(f'C{c1}', f'C{c2}', d1, d2)
+        assert lazy.distance('C0', 'C1') >= -1
+        assert len(lazy._firsts) == len(lazy._seconds) == 0
+        assert len(lazy._lengths) == 0
+    complete.complete_shortest_paths()
+    cities = [complete.city_name(i) for i in range(complete.num_cities())]
+    for c1 in cities:
+        for c2 in cities:
+            assert lazy.distance(c1, c2) == complete.distance(c1, c2)
+
+
+def test_lazy_map_experiment(config: dict) -> None:
+    """Test that an experiment on a LazyDistanceMap gives the same
+    statistics as one on a completed map."""
+    config['complete_map'] = True
+    expected = SchedulingExperiment(config).run()
+    config['lazy_map'] = True
+    expt = SchedulingExperiment(config)
+    assert isinstance(expt.dmap, LazyDistanceMap)
+    assert expt.run() == expected
+
+
 if __name__ == '__main__':
     pytest.main(['distance_map_test.py'])
@@ -0,0 +1,791 @@
+"""Parcels, trucks and fleets.
+
+===== Module Description =====
+
+This module contains the classes Parcel, Truck and Fleet, which model the
+objects that the scheduling algorithms work with, and ParcelTable, a compact
+column-oriented collection of parcels for very large manifests.
+
+Parcel and Truck use __slots__, and city names are interned, so that a
+million parcels bound for a handful of cities share a handful of strings.
+"""
+from array import array
+from math import fsum
+from sys import intern
+from typing import Dict, Iterable, Iterator, List, Optional
+from distance_map import DistanceMap
+
+
+class Parcel:
+    """A parcel to be delivered.
+
+    === Public Attributes ===
+    id:
+      The unique id of this parcel.
+    volume:
+      The volume of this parcel.
+    source:
+      The city this parcel is shipped from.
+    destination:
+      The city this parcel is shipped to.
+
+    === Representation Invariants ===
+    - volume > 0
+    - <source> and <destination> are interned strings
+    """
+    __slots__ = ('id', 'volume', 'source', 'destination')
+    id: int
+    volume: int
+    source: str
+    destination: str
+
+    def __init__(self, id_: int, volume: int, source: str,
+                 destination: str) -> None:
+        """Initialize a parcel with id <id_> and volume <volume>, travelling
+        from <source> to <destination>.
+
+        >>> p = Parcel(1, 5, 'Buffalo', 'Hamilton')
+        >>> p.volume
+        5
+        """
+        self.id = id_
+        self.volume = volume
+        self.source = intern(source)
+        self.destination = intern(destination)
+
+    def __repr__(self) -> str:
+        """Return a string representation of this parcel.
+
+        >>> Parcel(1, 5, 'Buffalo', 'Hamilton')
+        Parcel(1, 5, 'Buffalo', 'Hamilton')
+        """
+        return (f'Parcel({self.id}, {self.volume}, {self.source!r}, '
+                f'{self.destination!r})')
+
+
+class ParcelTable:
+    """A compact, column-oriented collection of parcels.
+
+    The parcels are stored as parallel arrays of machine integers, with each
+    city name replaced by an integer code, rather than as Parcel objects.
+    Parcel objects are only created when a parcel is read out of the table,
+    for example when a scheduler packs it onto a truck.
+
+    === Public Attributes ===
+    ids:
+      The id of each parcel, in the order the parcels were added.
+    volumes:
+      The volume of each parcel.
+    sources:
+      The city code of each parcel's source.
+    destinations:
+      The city code of each parcel's destination.
+    cities:
+      The name of each city, indexed by city code.
+
+    === Private Attributes ===
+    _codes:
+      Maps each city name in <cities> to its city code.
+
+    === Representation Invariants ===
+    - <ids>, <volumes>, <sources> and <destinations> have the same length.
+    - every element of <sources> and <destinations> is a valid index into
+      <cities>.
+    - _codes[cities[i]] == i for every index i of <cities>.
+    """
+    ids: array
+    volumes: array
+    sources: array
+    destinations: array
+    cities: List[str]
+    _codes: Dict[str, int]
+
+    def __init__(self, parcels: Optional[Iterable[Parcel]] = None) -> None:
+        """Initialize a table holding <parcels>, or an empty table if
+        <parcels> is not given.
+
+        >>> table = ParcelTable([Parcel(1, 5, 'Buffalo', 'Hamilton'),
+        ...                      Parcel(2, 4, 'Toronto', 'Hamilton')])
+        >>> len(table)
+        2
+        >>> table.cities
+        ['Buffalo', 'Hamilton', 'Toronto']
+        """
+        self.ids = array('q')
+        self.volumes = array('q')
+        self.sources = array('i')
+        self.destinations = array('i')
+        self.cities = []
+        self._codes = {}
+        if parcels is not None:
+            for parcel in parcels:
+                self.append(parcel.id, parcel.volume, parcel.source,
+                            parcel.destination)
+
+    def __len__(self) -> int:
+        """Return the number of parcels in this table.
+        """
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> Parcel:
+        """Return the parcel at index <i> of this table, as a new Parcel.
+
+        >>> table = ParcelTable([Parcel(1, 5, 'Buffalo', 'Hamilton')])
+        >>> table[0]
+        Parcel(1, 5, 'Buffalo', 'Hamilton')
+        """
+        cities = self.cities
+        return Parcel(self.ids[i], self.volumes[i], cities[self.sources[i]],
+                      cities[self.destinations[i]])
+
+    def __iter__(self) -> Iterator[Parcel]:
+        """Return an iterator over the parcels in this table, as new Parcels.
+        """
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    def city_code(self, city: str) -> int:
+        """Return the code of the city named <city>, giving it a new code if
+        it does not have one yet.
+
+        >>> table = ParcelTable()
+        >>> table.city_code('Toronto'), table.city_code('Guelph')
+        (0, 1)
+        >>> table.city_code('Toronto')
+        0
+        """
+        code = self._codes.get(city)
+        if code is None:
+            code = len(self.cities)
+            self._codes[city] = code
+            self.cities.append(intern(city))
+        return code
+
+    def append(self, id_: int, volume: int, source: str,
+               destination: str) -> None:
+        """Add a parcel with id <id_> and volume <volume>, travelling from
+        <source> to <destination>, to the end of this table.
+
+        >>> table = ParcelTable()
+        >>> table.append(1, 5, 'Buffalo', 'Hamilton')
+        >>> table.destinations.tolist()
+        [1]
+        """
+        self.ids.append(id_)
+        self.volumes.append(volume)
+        self.sources.append(self.city_code(source))
+        self.destinations.append(self.city_code(destination))
+
+
+class Truck:
+    """A delivery truck.
+
+    A truck starts at its depot, visits the destination of each parcel it
+    carries, in the order the parcels were packed unless its route has been
+    set since, and returns to its depot.
+
+    === Public Attributes ===
+    id:
+      The unique id of this truck.
+    capacity:
+      The total volume of parcels this truck can hold.
+    volume:
+      The total volume of the parcels currently packed on this truck.
+    parcels:
+      The parcels packed on this truck, in the order they were packed.
+    route:
+      The cities this truck visits, in order.  The first city is the depot.
+      The return trip to the depot is not included.
+
+    === Private Attributes ===
+    _fleet:
+      The fleet this truck was most recently added to, or None if it has not
+      been added to a fleet.  The fleet is told about every parcel packed.
+    _slot:
+      The index of this truck in <_fleet>.trucks, or -1 if <_fleet> is None.
+    _length:
+      The length of <route>, including the return trip, according to
+      <_length_map>, if <_length_map> is not None.
+    _length_map:
+      The distance map <_length> was computed from, or None if no length is
+      known.  <_length> is only up to date while the map's version is
+      <_length_version>.
+    _length_version:
+      The version of <_length_map> that <_length> was computed from.
+
+    === Representation Invariants ===
+    - 0 <= volume <= capacity
+    - volume is the sum of the volumes of <parcels>
+    - no two consecutive cities in <route> are the same
+    - capacity does not change once this truck is added to a fleet
+    """
+    __slots__ = ('id', 'capacity', 'volume', 'parcels', 'route', '_fleet',
+                 '_slot', '_length', '_length_map', '_length_version')
+    id: int
+    capacity: int
+    volume: int
+    parcels: List[Parcel]
+    route: List[str]
+    _fleet: Optional['Fleet']
+    _slot: int
+    _length: int
+    _length_map: Optional[DistanceMap]
+    _length_version: int
+
+    def __init__(self, id_: int, capacity: int, depot: str) -> None:
+        """Initialize an empty truck with id <id_> and capacity <capacity>,
+        whose route starts at <depot>.
+
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> t.route
+        ['Toronto']
+        """
+        self.id = id_
+        self.capacity = capacity
+        self.volume = 0
+        self.parcels = []
+        self.route = [intern(depot)]
+        self._fleet = None
+        self._slot = -1
+        self._length = 0
+        self._length_map = None
+        self._length_version = -1
+
+    def available_space(self) -> int:
+        """Return the volume of parcels that can still be packed on this truck.
+
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> t.pack(Parcel(1, 4, 'Toronto', 'Hamilton'))
+        True
+        >>> t.available_space()
+        6
+        """
+        return self.capacity - self.volume
+
+    def pack(self, parcel: Parcel) -> bool:
+        """Pack <parcel> onto this truck and return True, if it fits.  If its
+        destination is not already the last stop on the route, add it to the
+        end of the route.
+
+        If <parcel> does not fit, leave this truck unchanged and return False.
+
+        If the length of the route is cached, it is updated by the change in
+        length from the new stop, rather than computed again.
+
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> t.pack(Parcel(1, 5, 'Toronto', 'Hamilton'))
+        True
+        >>> t.pack(Parcel(2, 4, 'Toronto', 'Hamilton'))
+        True
+        >>> t.pack(Parcel(3, 2, 'Toronto', 'London'))
+        False
+        >>> t.route
+        ['Toronto', 'Hamilton']
+        """
+        if parcel.volume > self.capacity - self.volume:
+            return False
+        self.parcels.append(parcel)
+        self.volume += parcel.volume
+        change = 0
+        last = self.route[-1]
+        if last != parcel.destination:
+            self.route.append(parcel.destination)
+            change = self._stop_change(last, parcel.destination)
+        if self._fleet is not None:
+            self._fleet.record_pack(self._slot, parcel.volume, change,
+                                    self._length_map)
+        return True
+
+    def _stop_change(self, last: str, city: str) -> Optional[int]:
+        """Update the cached length of this truck's route for the stop at
+        <city> just added after <last>, and return the change in length, or
+        None if no length is cached.
+        """
+        dmap = self._length_map
+        if dmap is None or dmap.version() != self._length_version:
+            self._length_map = None
+            return None
+        depot = self.route[0]
+        if len(self.route) == 2:
+            change = dmap.distance(depot, city) + dmap.distance(city, depot)
+        else:
+            change = (dmap.distance(last, city) + dmap.distance(city, depot)
+                      - dmap.distance(last, depot))
+        self._length += change
+        return change
+
+    def unload(self) -> None:
+        """Remove every parcel from this truck, and reset its route to start
+        and end at its depot.
+
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> t.pack(Parcel(1, 5, 'Toronto', 'Hamilton'))
+        True
+        >>> t.unload()
+        >>> t.available_space(), t.route
+        (10, ['Toronto'])
+        """
+        change = -self._length
+        if self._length_map is None \
+                or self._length_map.version() != self._length_version:
+            self._length_map = None
+            change = None
+        self.parcels = []
+        self.volume = 0
+        del self.route[1:]
+        self._length = 0
+        if self._fleet is not None:
+            self._fleet.record_unload(self._slot, change, self._length_map)
+
+    def set_route(self, route: List[str]) -> None:
+        """Replace this truck's route with <route>, such as a shorter order in
+        which to visit the same stops.
+
+        Precondition: <route> starts at this truck's depot, includes the
+        destination of every parcel on this truck, and has no two
+        consecutive cities that are the same.
+
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> t.pack(Parcel(1, 5, 'Toronto', 'Hamilton'))
+        True
+        >>> t.pack(Parcel(2, 4, 'Toronto', 'London'))
+        True
+        >>> t.set_route(['Toronto', 'London', 'Hamilton'])
+        >>> t.route
+        ['Toronto', 'London', 'Hamilton']
+        """
+        self.route = list(route)
+        self._length_map = None
+        if self._fleet is not None:
+            self._fleet.record_route(self._slot)
+
+    def fullness(self) -> float:
+        """Return the percentage of this truck's capacity that is used.
+
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> t.pack(Parcel(1, 9, 'Toronto', 'Hamilton'))
+        True
+        >>> t.fullness()
+        90.0
+        """
+        if self.capacity == 0:
+            return 0.0
+        return self.volume / self.capacity * 100
+
+    def route_length(self, dmap: DistanceMap) -> int:
+        """Return the length of this truck's route, including the return
+        trip to its depot, according to <dmap>.
+
+        The length is cached, and only computed again if the route has been
+        replaced or <dmap> has changed since.
+
+        Precondition: <dmap> contains the distance of every leg of the route.
+
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> t.pack(Parcel(1, 5, 'Toronto', 'Hamilton'))
+        True
+        >>> m = DistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> t.route_length(m)
+        18
+        """
+        if dmap is self._length_map and dmap.version() == self._length_version:
+            return self._length
+        if len(self.route) == 1:
+            length = 0
+        else:
+            city_ids = dmap.city_ids(self.route)
+            city_ids.append(city_ids[0])
+            length = dmap.route_length(city_ids)
+        self._length = length
+        self._length_map = dmap
+        self._length_version = dmap.version()
+        return length
+
+
+class Fleet:
+    """A fleet of trucks for making deliveries.
+
+    The capacity, packed volume and number of parcels of every truck are also
+    kept in contiguous arrays, indexed like <trucks> and kept in sync by
+    Truck.pack and Truck.unload.  The totals over the fleet are kept up to
+    date in the same way, as is the total distance travelled against the
+    last distance map it was computed for, so that fleet statistics are
+    found without visiting every truck.
+
+    === Public Attributes ===
+    trucks:
+      List of all Truck objects in this fleet.
+
+    === Private Attributes ===
+    _capacities:
+      The capacity of each truck in <trucks>.
+    _volumes:
+      The volume of parcels packed on each truck in <trucks>.
+    _counts:
+      The number of parcels packed on each truck in <trucks>.
+    _total_capacity:
+      The sum of <_capacities>.
+    _total_volume:
+      The sum of <_volumes>.
+    _nonempty:
+      The number of non-zero elements of <_counts>.
+    _fullness:
+      Non-overlapping partial sums, as kept by math.fsum, whose exact sum is
+      the sum of truck.fullness() over the trucks.  Adjusting them as
+      parcels are packed and unloaded does not drift by rounding error, and
+      there are never more than about 40 of them, since each covers a
+      different range of exponents.
+    _distance:
+      The total distance travelled by the trucks according to
+      <_distance_map>, if <_distance_map> is not None.
+    _distance_map:
+      The distance map <_distance> was computed from, or None if no total is
+      known.  <_distance> is only up to date while the map's version is
+      <_distance_version>.
+    _distance_version:
+      The version of <_distance_map> that <_distance> was computed from.
+
+    === Representation Invariants ===
+    - <_capacities>, <_volumes> and <_counts> each have one element per truck
+      in <trucks>, in the same order.
+    - 0 <= _nonempty <= len(trucks)
+    - every truck in <trucks> belongs to no other fleet.
+    """
+    trucks: List[Truck]
+    _capacities: array
+    _volumes: array
+    _counts: array
+    _total_capacity: int
+    _total_volume: int
+    _nonempty: int
+    _fullness: List[float]
+    _distance: int
+    _distance_map: Optional[DistanceMap]
+    _distance_version: int
+
+    def __init__(self) -> None:
+        """Create a Fleet with no trucks.
+
+        >>> f = Fleet()
+        >>> f.num_trucks()
+        0
+        """
+        self.trucks = []
+        self._capacities = array('q')
+        self._volumes = array('q')
+        self._counts = array('q')
+        self._total_capacity = 0
+        self._total_volume = 0
+        self._nonempty = 0
+        self._fullness = []
+        self._distance = 0
+        self._distance_map = None
+        self._distance_version = -1
+
+    def add_truck(self, truck: Truck) -> None:
+        """Add <truck> to this fleet.
+
+        Precondition: No truck with the same ID as <truck> has already been
+        added to this Fleet, and <truck> has not been added to another Fleet.
+
+        >>> f = Fleet()
+        >>> t = Truck(1423, 1000, 'Toronto')
+        >>> f.add_truck(t)
+        >>> f.num_trucks()
+        1
+        """
+        truck._fleet = self
+        truck._slot = len(self.trucks)
+        self.trucks.append(truck)
+        self._capacities.append(truck.capacity)
+        self._volumes.append(truck.volume)
+        self._counts.append(len(truck.parcels))
+        self._total_capacity += truck.capacity
+        self._total_volume += truck.volume
+        if truck.parcels:
+            self._nonempty += 1
+        if truck.volume:
+            _add_exact(self._fullness, truck.fullness())
+        self._distance_map = None
+
+    def record_pack(self, slot: int, volume: int, change: Optional[int] = None,
+                    dmap: Optional[DistanceMap] = None) -> None:
+        """Record that a parcel of volume <volume> was packed on the truck at
+        index <slot> of this fleet's trucks, and that the length of its route
+        according to <dmap> changed by <change>, or by an unknown amount if
+        <change> is None.
+
+        This is called by Truck.pack; other code does not need to call it.
+
+        >>> f = Fleet()
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> f.add_truck(t)
+        >>> t.pack(Parcel(1, 4, 'Toronto', 'Hamilton'))
+        True
+        >>> f.total_unused_space()
+        6
+        """
+        old = self._volumes[slot]
+        self._volumes[slot] += volume
+        self._total_volume += volume
+        if self._counts[slot] == 0:
+            self._nonempty += 1
+        self._counts[slot] += 1
+        if volume:
+            capacity = self._capacities[slot]
+            if old:
+                _add_exact(self._fullness, -(old / capacity * 100))
+            _add_exact(self._fullness, (old + volume) / capacity * 100)
+        self._record_distance(change, dmap)
+
+    def record_unload(self, slot: int, change: Optional[int] = None,
+                      dmap: Optional[DistanceMap] = None) -> None:
+        """Record that every parcel was removed from the truck at index
+        <slot> of this fleet's trucks, and that the length of its route
+        according to <dmap> changed by <change>, or by an unknown amount if
+        <change> is None.
+
+        This is called by Truck.unload; other code does not need to call it.
+        """
+        self._total_volume -= self._volumes[slot]
+        if self._counts[slot] != 0:
+            self._nonempty -= 1
+        if self._volumes[slot]:
+            _add_exact(self._fullness, -(self._volumes[slot]
+                                         / self._capacities[slot] * 100))
+        self._volumes[slot] = 0
+        self._counts[slot] = 0
+        self._record_distance(change, dmap)
+
+    def record_route(self, slot: int) -> None:
+        """Record that the route of the truck at index <slot> of this fleet's
+        trucks was replaced.
+
+        This is called by Truck.set_route; other code does not need to call
+        it.
+        """
+        self._distance_map = None
+
+    def _record_distance(self, change: Optional[int],
+                         dmap: Optional[DistanceMap]) -> None:
+        """Add <change> to the total distance travelled, if that total was
+        computed from <dmap>, and forget the total otherwise.
+        """
+        if change is None or dmap is not self._distance_map:
+            self._distance_map = None
+        else:
+            self._distance += change
+
+    def num_trucks(self) -> int:
+        """Return the number of trucks in this fleet.
+
+        >>> f = Fleet()
+        >>> t1 = Truck(1423, 10, 'Toronto')
+        >>> f.add_truck(t1)
+        >>> f.num_trucks()
+        1
+        """
+        return len(self.trucks)
+
+    def num_nonempty_trucks(self) -> int:
+        """Return the number of non-empty trucks in this fleet.
+
+        >>> f = Fleet()
+        >>> t1 = Truck(1423, 10, 'Toronto')
+        >>> f.add_truck(t1)
+        >>> p1 = Parcel(1, 5, 'Buffalo', 'Hamilton')
+        >>> t1.pack(p1)
+        True
+        >>> t2 = Truck(5912, 20, 'Toronto')
+        >>> f.add_truck(t2)
+        >>> f.num_nonempty_trucks()
+        1
+        """
+        return self._nonempty
+
+    def parcel_allocations(self) -> Dict[int, List[int]]:
+        """Return a dictionary in which each key is the ID of a truck in this
+        fleet and its value is a list of the IDs of the parcels packed onto it,
+        in the order in which they were packed.
+
+        >>> f = Fleet()
+        >>> t1 = Truck(1423, 10, 'Toronto')
+        >>> p1 = Parcel(27, 5, 'Toronto', 'Hamilton')
+        >>> p2 = Parcel(12, 5, 'Toronto', 'Hamilton')
+        >>> t1.pack(p1)
+        True
+        >>> t1.pack(p2)
+        True
+        >>> t2 = Truck(1333, 10, 'Toronto')
+        >>> p3 = Parcel(28, 5, 'Toronto', 'Hamilton')
+        >>> t2.pack(p3)
+        True
+        >>> f.add_truck(t1)
+        >>> f.add_truck(t2)
+        >>> f.parcel_allocations() == {1423: [27, 12], 1333: [28]}
+        True
+        """
+        return {truck.id: [parcel.id for parcel in truck.parcels]
+                for truck in self.trucks}
+
+    def total_unused_space(self) -> int:
+        """Return the total unused space, summed over all trucks in the fleet.
+        If there are no trucks in the fleet, return 0.
+
+        >>> f = Fleet()
+        >>> f.total_unused_space()
+        0
+        >>> t = Truck(1423, 1000, 'Toronto')
+        >>> p = Parcel(1, 5, 'Buffalo', 'Hamilton')
+        >>> t.pack(p)
+        True
+        >>> f.add_truck(t)
+        >>> f.total_unused_space()
+        995
+        """
+        return self._total_capacity - self._total_volume
+
+    def _total_fullness(self) -> float:
+        """Return the sum of truck.fullness() for each non-empty truck in the
+        fleet. If there are no non-empty trucks, return 0.
+
+        >>> f = Fleet()
+        >>> f._total_fullness() == 0.0
+        True
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> f.add_truck(t)
+        >>> f._total_fullness() == 0.0
+        True
+        >>> p = Parcel(1, 5, 'Buffalo', 'Hamilton')
+        >>> t.pack(p)
+        True
+        >>> f._total_fullness()
+        50.0
+        """
+        return fsum(self._fullness)
+
+    def average_fullness(self) -> float:
+        """Return the average percent fullness of all non-empty trucks in the
+        fleet.
+
+        If there are no non-empty trucks, return 0.0.
+
+        >>> f = Fleet()
+        >>> t = Truck(1423, 10, 'Toronto')
+        >>> p = Parcel(1, 5, 'Buffalo', 'Hamilton')
+        >>> t.pack(p)
+        True
+        >>> f.add_truck(t)
+        >>> f.average_fullness()
+        50.0
+        """
+        nonempty = self.num_nonempty_trucks()
+        if nonempty == 0:
+            return 0.0
+        return self._total_fullness() / nonempty
+
+    def total_distance_travelled(self, dmap: DistanceMap) -> int:
+        """Return the total distance travelled by the trucks in this fleet,
+        according to the distances in <dmap>.
+
+        The total is kept up to date as parcels are packed, so it is only
+        summed over the trucks again if <dmap> has changed, a different map
+        is given, or a route has been replaced.
+
+        Precondition: <dmap> contains all distances required to compute the
+                      average distance travelled.
+
+        >>> f = Fleet()
+        >>> t1 = Truck(1423, 10, 'Toronto')
+        >>> p1 = Parcel(1, 5, 'Toronto', 'Hamilton')
+        >>> t1.pack(p1)
+        True
+        >>> t2 = Truck(1333, 10, 'Toronto')
+        >>> p2 = Parcel(2, 5, 'Toronto', 'Hamilton')
+        >>> t2.pack(p2)
+        True
+        >>> from distance_map import DistanceMap
+        >>> m = DistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> f.add_truck(t1)
+        >>> f.add_truck(t2)
+        >>> f.total_distance_travelled(m)
+        36
+        """
+        if dmap is not self._distance_map \
+                or dmap.version() != self._distance_version:
+            self._distance = sum(truck.route_length(dmap)
+                                 for truck in self.trucks)
+            self._distance_map = dmap
+            self._distance_version = dmap.version()
+        return self._distance
+
+    def average_distance_travelled(self, dmap: DistanceMap) -> float:
+        """Return the average distance travelled by the trucks in this fleet
+        that are not empty, according to the distances in <dmap>.
+
+        If there are no non-empty trucks, return 0.0.
+
+        Precondition: <dmap> contains all distances required to compute the
+                      average distance travelled.
+
+        >>> f = Fleet()
+        >>> t1 = Truck(1423, 10, 'Toronto')
+        >>> p1 = Parcel(1, 5, 'Toronto', 'Hamilton')
+        >>> t1.pack(p1)
+        True
+        >>> t2 = Truck(1333, 10, 'Toronto')
+        >>> p2 = Parcel(2, 5, 'Toronto', 'Hamilton')
+        >>> t2.pack(p2)
+        True
+        >>> from distance_map import DistanceMap
+        >>> m = DistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> f.add_truck(t1)
+        >>> f.add_truck(t2)
+        >>> f.average_distance_travelled(m)
+        18.0
+        """
+        nonempty = self.num_nonempty_trucks()
+        if nonempty == 0:
+            return 0.0
+        return self.total_distance_travelled(dmap) / nonempty
+
+
+def _add_exact(partials: List[float], x: float) -> None:
+    """Add <x> to the exact sum of <partials>, keeping them non-overlapping
+    and in increasing order of magnitude, as math.fsum does.  No rounding
+    error is made, and fsum(<partials>) is the exact sum correctly rounded.
+
+    >>> partials = []
+    >>> for x in [0.1, 1e100, 0.1, -1e100]:
+    ...     _add_exact(partials, x)
+    >>> fsum(partials)
+    0.2
+    """
+    i = 0
+    for y in partials:
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            partials[i] = lo
+            i += 1
+        x = hi
+    partials[i:] = [x]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'array', 'math', 'sys',
+                                   'distance_map'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
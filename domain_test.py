@@ -0,0 +1,139 @@
+import math
+import random
+import pytest
+from distance_map import DistanceMap
+from domain import Parcel, ParcelTable, Truck, Fleet
+
+
+def test_fleet_stats_match_trucks() -> None:
+    """Test that the fleet statistics agree with the trucks' own state when
+    parcels are packed both before and after the trucks join the fleet."""
+    rng = random.Random(148)
+    f = Fleet()
+    trucks = [Truck(i, rng.randint(0, 60), 'Toronto') for i in range(40)]
+    for i, truck in enumerate(trucks):
+        truck.pack(Parcel(1000 + i, rng.randint(1, 20), 'Toronto', 'Guelph'))
+        f.add_truck(truck)
+    for i in range(200):
+        rng.choice(trucks).pack(Parcel(i, rng.randint(1, 20), 'Toronto',
+                                       rng.choice(['Guelph', 'London'])))
+
+    nonempty = [t for t in trucks if t.parcels]
+    assert f.num_nonempty_trucks() == len(nonempty)
+    assert f.total_unused_space() == sum(t.capacity - t.volume
+                                         for t in trucks)
+    assert f.average_fullness() == pytest.approx(
+        sum(t.fullness() for t in nonempty) / len(nonempty))
+
+
+def test_fleet_zero_capacity_truck() -> None:
+    """Test that an empty truck with no capacity does not break the
+    statistics."""
+    f = Fleet()
+    f.add_truck(Truck(1, 0, 'Toronto'))
+    t = Truck(2, 10, 'Toronto')
+    f.add_truck(t)
+    assert t.pack(Parcel(1, 5, 'Toronto', 'Guelph')) is True
+    assert f.average_fullness() == 50.0
+    assert f.num_nonempty_trucks() == 1
+
+
+def test_fleet_fullness_does_not_drift() -> None:
+    """Test that the average fullness is exact after many parcels have been
+    packed and unloaded."""
+    f = Fleet()
+    t1 = Truck(1, 3, 'Toronto')
+    t2 = Truck(2, 7, 'Toronto')
+    f.add_truck(t1)
+    f.add_truck(t2)
+    assert t1.pack(Parcel(1, 1, 'Toronto', 'Guelph')) is True
+    for i in range(1000):
+        assert t2.pack(Parcel(i + 2, 1 + i % 7, 'Toronto', 'Guelph')) is True
+        t2.unload()
+    assert f.average_fullness() == t1.fullness()
+    t1.unload()
+    assert f.average_fullness() == 0.0
+
+
+def test_fleet_fullness_with_many_capacities() -> None:
+    """Test that the total fullness stays small and exact when the trucks
+    all have different capacities, so that packing a parcel stays cheap."""
+    rng = random.Random(148)
+    f = Fleet()
+    trucks = [Truck(i, rng.randint(1000, 10 ** 6), 'Toronto')
+              for i in range(20000)]
+    for truck in trucks:
+        f.add_truck(truck)
+    for i, truck in enumerate(trucks):
+        truck.pack(Parcel(i, rng.randint(1, 1000), 'Toronto', 'Guelph'))
+        assert len(f._fullness) <= 40
+    assert f.average_fullness() == \
+        math.fsum(t.fullness() for t in trucks) / len(trucks)
+
+
+def test_parcel_city_names_are_shared() -> None:
+    """Test that parcels bound for the same city share one name string and
+    carry no per-instance dictionary."""
+    p1 = Parcel(1, 5, 'Toronto', ''.join(['Gue', 'lph']))
+    p2 = Parcel(2, 5, 'Toronto', ''.join(['Guel', 'ph']))
+    assert p1.destination is p2.destination
+    assert not hasattr(p1, '__dict__')
+
+
+def test_parcel_table_round_trip() -> None:
+    """Test that parcels read back from a ParcelTable match those added."""
+    parcels = [Parcel(7, 5, 'Toronto', 'Guelph'),
+               Parcel(3, 9, 'Guelph', 'London'),
+               Parcel(4, 1, 'Toronto', 'London')]
+    table = ParcelTable(parcels)
+    assert len(table) == 3
+    assert table.cities == ['Toronto', 'Guelph', 'London']
+    assert [(p.id, p.volume, p.source, p.destination) for p in table] == \
+        [(p.id, p.volume, p.source, p.destination) for p in parcels]
+
+
+def test_fleet_distance_kept_up_to_date() -> None:
+    """Test that the fleet's running totals agree with a full recount as
+    parcels are packed, trucks are unloaded, routes are replaced and the
+    distance map changes."""
+    rng = random.Random(148)
+    cities = ['Toronto', 'Guelph', 'London', 'Hamilton', 'Ottawa']
+    dmap = DistanceMap()
+    for city1 in cities:
+        for city2 in cities:
+            if city1 < city2:
+                dmap.add_distance(city1, city2, rng.randint(1, 50),
+                                  rng.randint(1, 50))
+    f = Fleet()
+    trucks = [Truck(i, rng.randint(20, 80), 'Toronto') for i in range(10)]
+    for truck in trucks:
+        f.add_truck(truck)
+
+    def check() -> None:
+        """Check the fleet against a recount over its trucks."""
+        expected = sum(dmap.route_length(dmap.city_ids(t.route + t.route[:1]))
+                       for t in trucks if len(t.route) > 1)
+        assert f.total_distance_travelled(dmap) == expected
+        assert f.total_unused_space() == \
+            sum(t.capacity - t.volume for t in trucks)
+        assert f.num_nonempty_trucks() == sum(1 for t in trucks if t.parcels)
+
+    check()
+    for i in range(300):
+        truck = rng.choice(trucks)
+        truck.pack(Parcel(i, rng.randint(1, 10), 'Toronto',
+                          rng.choice(cities)))
+        if i % 37 == 0:
+            truck.unload()
+        if i % 53 == 0 and len(truck.route) > 2:
+            truck.set_route(truck.route[:1] + truck.route[:0:-1])
+        if i % 71 == 0:
+            version = dmap.version()
+            dmap.add_distance('Toronto', rng.choice(cities[1:]),
+                              rng.randint(1, 50))
+            assert dmap.version() > version
+        check()
+
+
+if __name__ == '__main__':
+    pytest.main(['domain_test.py'])
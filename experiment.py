@@ -1,8 +1,24 @@
-from typing import List, Dict, Union
+from array import array
+from typing import Any, Callable, ContextManager, Iterator, List, Dict, \
+    Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from copy import deepcopy
+from time import perf_counter
 import json
-from scheduler import RandomScheduler, GreedyScheduler, Scheduler
-from domain import Parcel, Truck, Fleet
-from distance_map import DistanceMap
+import sys
+try:
+    import resource
+except ImportError:  # resource is only available on Unix
+    resource = None
+from scheduler import RandomScheduler, GreedyScheduler, \
+    BinPackingScheduler, ImprovementScheduler, Scheduler
+from domain import Parcel, ParcelTable, Truck, Fleet
+from distance_map import DistanceMap, LazyDistanceMap
+from input_cache import Column, InputCache
+from ingest import parse_distances, parse_parcel_table, parse_trucks
+from instrument import Recorder
+from routing import optimize_routes
 
 
 class SchedulingExperiment:
@@ -23,11 +39,19 @@ class SchedulingExperiment:
     scheduler:
       The scheduler to use in this experiment.
     parcels:
-      The parcels to schedule in this experiment.
+      The parcels to schedule in this experiment.  If the configuration sets
+      'parcel_table' to True, this is a compact ParcelTable rather than a
+      list of Parcel objects.  If the experiment streams its parcels, this is
+      empty, as the parcels are read while they are scheduled.
     fleet:
       The trucks that parcels are scheduled to in this experiment.
     dmap:
-      The distances between cities in this experiment.
+      The distances between cities in this experiment.  If the configuration
+      sets 'dense_map' to True, these are stored in a dense matrix.  If it
+      sets 'complete_map' to True, distances missing from the map file are
+      filled in with shortest path distances.  If it sets 'lazy_map' to
+      True, this is a LazyDistanceMap, which finds those distances when
+      they are looked up.
 
     === Private Attributes ===
     _stats:
@@ -38,6 +62,27 @@ class SchedulingExperiment:
       A list of parcels. <_unscheduled>'s value is undefined until <self>.run
       is called, at which point it contains the list of parcels that could
       not be scheduled in the experiment.
+    _parcel_file:
+      The path of the file the parcels are read from.
+    _batch_size:
+      The number of parcels read at a time when the parcels are streamed, or
+      0 if they are all read before scheduling starts.
+    _optimize_routes:
+      True if the trucks' routes are optimised after scheduling.
+    _route_time_budget:
+      The most time, in seconds, spent optimising each truck's route.
+    _route_workers:
+      The number of processes the routes are optimised across.
+    _config:
+      A copy of the configuration of this experiment.
+    _random_starts:
+      The number of random schedules made, keeping the best, or 1 if the
+      scheduler is not random.
+    _batch_latencies:
+      The time, in seconds, that add_parcels took to schedule each batch.
+    _recorder:
+      Records the time spent in each phase of this experiment and the calls
+      made to hot paths, or None if the experiment is not instrumented.
 
     === Representation Invariants ===
     - <fleet> contains at least one truck
@@ -47,30 +92,123 @@ class SchedulingExperiment:
     """
     verbose: bool
     scheduler: Scheduler
-    parcels: List[Parcel]
+    parcels: Union[List[Parcel], ParcelTable]
     fleet: Fleet
     dmap: DistanceMap
     _stats: Dict[str, Union[int, float]]
     _unscheduled: List[Parcel]
-
-    def __init__(self, config: Dict[str, Union[str, bool]]) -> None:
+    _parcel_file: str
+    _batch_size: int
+    _optimize_routes: bool
+    _route_time_budget: float
+    _route_workers: int
+    _config: Dict[str, Union[str, bool]]
+    _random_starts: int
+    _batch_latencies: List[float]
+    _recorder: Optional[Recorder]
+
+    def __init__(self, config: Dict[str, Union[str, bool]],
+                 inputs: Optional[Tuple[Union[List[Parcel], ParcelTable],
+                                        Fleet, DistanceMap]] = None) -> None:
         """Initialize a new experiment with the configuration specified in
         <config>.
 
+        If <inputs> is given, it holds the parcels, fleet and distance map
+        to use, already read by read_inputs, and only a streamed parcel
+        file is read.  The trucks in the fleet are packed when the experiment
+        runs, so a fleet must not be shared between experiments.
+
+        Besides the values specified in Assignment 1, config['algorithm']
+        may be 'best-fit' or 'first-fit', to pack the parcels with a
+        BinPackingScheduler.
+
+        Besides the keys specified in Assignment 1, <config> may contain:
+        - 'parcel_table': if True, read the parcels into a ParcelTable.
+        - 'dense_map': if True, store the distances in a dense matrix.
+        - 'complete_map': if True, fill in missing distances with shortest
+          path distances.
+        - 'lazy_map': if True, read the map into a LazyDistanceMap, which
+          stores only the roads and finds the shortest path distances from
+          a city when they are first looked up, for maps too large to
+          complete.
+        - 'lazy_map_bytes': the most memory, in bytes, that a
+          LazyDistanceMap may use to cache the distances it has found.
+        - 'cache_dir': a directory in which to cache the parsed input files,
+          so that later experiments on the same files skip parsing them.
+        - 'cache_max_bytes': the most space the cache may use, in bytes.
+        - 'bulk_parse': if True, parse the input files in bulk from memory
+          maps, rather than line by line.  The inputs read are the same.
+        - 'stream': if True, read the parcels in batches while scheduling
+          them, rather than all at once beforehand, so that only a bounded
+          number of unpacked parcels is held in memory.
+        - 'batch_size': the number of parcels in each batch of a stream.
+        - 'lookahead': the number of parcels the greedy scheduler holds in
+          its window while scheduling a stream.
+        - 'truck_index': if True, the greedy scheduler finds each parcel's
+          truck through an index of the trucks by available space and by
+          the city their routes end at, rather than a scan of every truck.
+        - 'random_seed': the seed of the random scheduler's choices, so that
+          its schedule can be reproduced.
+        - 'random_starts': the number of random schedules to make, from the
+          seeds 'random_seed' (or 0) onwards, keeping the best.
+        - 'random_workers': the number of processes to make them across.
+        - 'random_objective': the statistic, or list of statistics, by which
+          the best random schedule is chosen.  Each is minimised, unless its
+          name starts with '-', in which case it is maximised.  The default
+          is ['unscheduled', 'avg_distance'].
+        - 'improve': if True, improve the schedule by moving parcels between
+          trucks after scheduling, with an ImprovementScheduler configured
+          by the keys 'improve_iterations', 'improve_time_budget',
+          'improve_temperature' and 'improve_seed'.
+        - 'optimize_routes': if True, reorder the stops of each truck's
+          route after scheduling, to shorten it.
+        - 'route_time_budget': the most time, in seconds, to spend
+          optimising each route.
+        - 'route_workers': the number of processes to optimise the routes
+          across.
+        - 'instrument': if True, record the wall and CPU time of each phase
+          of the experiment, and count the calls made to hot paths, as
+          returned by metrics.
+        - 'trace_file': a file to write those metrics to each time the
+          experiment runs, which also turns them on.
+        - 'trace_format': 'jsonl' (the default) to write the metrics as JSON
+          lines, or 'chrome' to write them as Chrome trace events.
+
         Precondition: <config> contains keys and values as specified
         in Assignment 1.
         """
         self.verbose = config['verbose']
-        # TODO: Use <config> to determine what sort of scheduler we need.
-        # TODO: Then make one of that sort and save it in self.scheduler.
-
-        self.parcels = read_parcels(config['parcel_file'])
-        self.fleet = read_trucks(config['truck_file'],
-                                 config['depot_location'])
-        self.dmap = read_distance_map(config['map_file'])
+        self._config = dict(config)
+        self._random_starts = 1
+        if config['algorithm'] == 'random':
+            self.scheduler = RandomScheduler(config.get('random_seed'))
+            self._random_starts = max(int(config.get('random_starts', 1)), 1)
+        elif config['algorithm'] in ('best-fit', 'first-fit'):
+            self.scheduler = BinPackingScheduler(config)
+        else:
+            self.scheduler = GreedyScheduler(config)
+
+        self._recorder = None
+        if config.get('instrument', False) or config.get('trace_file'):
+            self._recorder = Recorder()
+        self._parcel_file = config['parcel_file']
+        self._optimize_routes = bool(config.get('optimize_routes', False))
+        self._route_time_budget = float(config.get('route_time_budget', 0.1))
+        self._route_workers = int(config.get('route_workers', 1))
+        self._batch_size = 0
+        if config.get('stream', False):
+            self._batch_size = int(config.get('batch_size', 10000))
+        if inputs is None:
+            with self._phase('read'):
+                inputs = read_inputs(config)
+        self.parcels, self.fleet, self.dmap = inputs
+        if config.get('improve', False):
+            self.scheduler = ImprovementScheduler(self.scheduler, self.dmap,
+                                                  config)
 
         self._stats = {}
         self._unscheduled = []
+        self._batch_latencies = []
 
     def run(self, report: bool = False) -> Dict[str, Union[int, float]]:
         """Run the experiment and return statistics on the outcome.
@@ -83,15 +221,174 @@ class SchedulingExperiment:
 
         If <self.verbose> is True, print step-by-step details
         regarding the scheduling algorithm as it runs.
+
+        If the routes are optimised, 'avg_distance' is the average distance
+        travelled after optimisation, and the statistics also include
+        'avg_distance_before', the average distance before it.
+
+        If the parcels are streamed, the statistics also include 'peak_rss',
+        the peak resident memory of this process in kilobytes, or -1 if it
+        cannot be measured on this platform.
+
+        If several random schedules are made, the trucks are packed by the
+        best one, and the statistics are its statistics, together with
+        'seed', the seed it was made from, and 'starts', a list of the
+        statistics of the schedule made from each seed, including its 'seed'.
         """
-        # TODO: Ask the scheduler to schedule the parcels onto trucks.
-        # TODO: Save the unscheduled parcels in self._unscheduled.
+        if self._random_starts > 1:
+            with self._phase('schedule'):
+                self._run_random_starts()
+        else:
+            with self._phase('schedule'):
+                if self._batch_size:
+                    batches = iter_parcel_batches(self._parcel_file,
+                                                  self._batch_size)
+                    self._unscheduled = self.scheduler.schedule_stream(
+                        batches, self.fleet.trucks, self.verbose)
+                else:
+                    self._unscheduled = self.scheduler.schedule(
+                        self.parcels, self.fleet.trucks, self.verbose)
+
+            before = None
+            if self._optimize_routes:
+                with self._phase('optimize_routes'):
+                    before = self.fleet.average_distance_travelled(self.dmap)
+                    optimize_routes(self.fleet.trucks, self.dmap,
+                                    self._route_time_budget,
+                                    self._route_workers)
+
+            with self._phase('compute_stats'):
+                self._compute_stats()
+            if before is not None:
+                self._stats['avg_distance_before'] = before
+            if self._batch_size:
+                self._stats['peak_rss'] = peak_rss()
+        if report:
+            with self._phase('report'):
+                self._print_report()
+        self._write_trace()
+        return self._stats
 
-        self._compute_stats()
+    def metrics(self) -> Dict[str, Any]:
+        """Return the instrumentation metrics of this experiment so far, as
+        returned by Recorder.metrics: the wall and CPU time of each phase,
+        and the counts of calls made to hot paths.  Return an empty dict if
+        the experiment is not instrumented.
+
+        The phases are 'read', if the experiment read its own inputs,
+        'schedule', 'optimize_routes', if the routes are optimised,
+        'compute_stats', 'report', if a report was printed, and
+        'add_parcels', for each batch added by add_parcels.
+        """
+        if self._recorder is None:
+            return {}
+        return self._recorder.metrics()
+
+    def _phase(self, name: str) -> ContextManager[None]:
+        """Return a context that records the code run in it as the phase
+        <name> of this experiment, if it is instrumented, and does nothing
+        otherwise.
+        """
+        if self._recorder is None:
+            return nullcontext()
+        return self._recorder.phase(name)
+
+    def _write_trace(self) -> None:
+        """Write the instrumentation metrics of this experiment to its
+        'trace_file', if it has one.
+        """
+        if self._recorder is not None and self._config.get('trace_file'):
+            self._recorder.write(self._config['trace_file'],
+                                 self._config.get('trace_format', 'jsonl'))
+
+    def add_parcels(self, batch: List[Parcel],
+                    report: bool = False) -> Dict[str, Union[int, float]]:
+        """Schedule the newly arrived parcels in <batch> onto the trucks,
+        leaving the parcels already packed where they are, and return the
+        statistics of the experiment so far.
+
+        This may be called before or after run, and any number of times.  The
+        statistics are read from the totals that the fleet keeps up to date as
+        parcels are packed, instead of being computed again from scratch.
+        Besides the keys returned by run, they include 'batch_latency', the
+        time in seconds from the call until the parcels in <batch> were
+        assigned and the statistics updated, 'max_batch_latency', the longest
+        such time over all batches, and 'batches', the number of batches
+        added.
+
+        If <report> is True, print a report on the statistics.
+        """
+        with self._phase('add_parcels'):
+            self._add_batch(batch)
         if report:
-            self._print_report()
+            with self._phase('report'):
+                self._print_report()
+        self._write_trace()
         return self._stats
 
+    def _add_batch(self, batch: List[Parcel]) -> None:
+        """Schedule the parcels in <batch> and update <_stats>, as described
+        in add_parcels.
+        """
+        start = perf_counter()
+        unscheduled = self.scheduler.schedule(batch, self.fleet.trucks,
+                                              self.verbose)
+        self._unscheduled.extend(unscheduled)
+        if isinstance(self.parcels, ParcelTable):
+            for parcel in batch:
+                self.parcels.append(parcel.id, parcel.volume, parcel.source,
+                                    parcel.destination)
+        else:
+            self.parcels.extend(batch)
+
+        self._compute_stats()
+        latency = perf_counter() - start
+        self._batch_latencies.append(latency)
+        self._stats['batch_latency'] = latency
+        self._stats['max_batch_latency'] = max(self._batch_latencies)
+        self._stats['batches'] = len(self._batch_latencies)
+
+    def _run_random_starts(self) -> None:
+        """Make <_random_starts> random schedules from consecutive seeds,
+        pack the trucks by the best one, and store its statistics in
+        <_stats>, as described in run.
+
+        The schedule from each seed is made on a copy of the trucks, across
+        the number of processes configured by 'random_workers'.
+        """
+        first = int(self._config.get('random_seed') or 0)
+        seeds = list(range(first, first + self._random_starts))
+        inputs = (self.parcels, self.fleet, self.dmap)
+        workers = int(self._config.get('random_workers', 1))
+        if workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_set_start_inputs,
+                                     initargs=(self._config, inputs)) \
+                    as executor:
+                starts = list(executor.map(_run_random_start, seeds))
+        else:
+            _set_start_inputs(self._config, inputs)
+            try:
+                starts = [_run_random_start(seed) for seed in seeds]
+            finally:
+                _set_start_inputs({}, None)
+
+        objective = self._config.get('random_objective',
+                                     ['unscheduled', 'avg_distance'])
+        if isinstance(objective, str):
+            objective = [objective]
+        best = min(starts, key=lambda stats: [
+            -stats[name[1:]] if name.startswith('-') else stats[name]
+            for name in objective])
+
+        # Schedules are reproducible from their seeds, so the best one is made
+        # again on the trucks themselves.
+        expt = SchedulingExperiment(_start_config(self._config, best['seed']),
+                                    inputs)
+        self._stats = expt.run()
+        self._unscheduled = expt._unscheduled
+        self._stats['seed'] = best['seed']
+        self._stats['starts'] = starts
+
     def _compute_stats(self) -> None:
         """Compute the statistics for this experiment, and store in
         <self>.stats. Keys and values are as specified in Step 6 of
@@ -99,14 +396,14 @@ class SchedulingExperiment:
 
         Precondition: _run has already been called.
         """
-        # TODO: Replace the 0 values below with the correct statistics.
+        num_trucks = self.fleet.num_trucks()
         self._stats = {
-            'fleet': 0,
-            'unused_trucks': 0,
-            'avg_distance': 0,
-            'avg_fullness': 0,
-            'unused_space': 0,
-            'unscheduled': 0
+            'fleet': num_trucks,
+            'unused_trucks': num_trucks - self.fleet.num_nonempty_trucks(),
+            'avg_distance': self.fleet.average_distance_travelled(self.dmap),
+            'avg_fullness': self.fleet.average_fullness(),
+            'unused_space': self.fleet.total_unused_space(),
+            'unscheduled': len(self._unscheduled)
         }
 
     def _print_report(self) -> None:
@@ -118,20 +415,102 @@ class SchedulingExperiment:
 
         Precondition: _compute_stats has already been called.
         """
-        # TODO: Implement this method!
-        pass
+        for stat, value in self._stats.items():
+            print(f'{stat:<15}{value}')
 
 
 # ----- Helper functions -----
 
+# The configuration and parsed inputs that random schedules are made from in
+# a worker process, given to each worker once, when it starts.
+_start_inputs: Tuple[Dict[str, Union[str, bool]], Any] = ({}, None)
 
-def read_parcels(parcel_file: str) -> List[Parcel]:
+
+def _set_start_inputs(config: Dict[str, Union[str, bool]],
+                      inputs: Any) -> None:
+    """Make <config> and <inputs> the configuration and parsed inputs that
+    random schedules are made from in this process.
+    """
+    global _start_inputs
+    _start_inputs = (config, inputs)
+
+
+def _start_config(config: Dict[str, Union[str, bool]],
+                  seed: int) -> Dict[str, Union[str, bool]]:
+    """Return a copy of <config> that makes a single random schedule from
+    the seed <seed>.
+    """
+    config = dict(config)
+    config['random_seed'] = seed
+    config['random_starts'] = 1
+    # The schedules are timed as part of the experiment that makes them.
+    config['instrument'] = False
+    config.pop('trace_file', None)
+    return config
+
+
+def _run_random_start(seed: int) -> Dict[str, Union[int, float]]:
+    """Make a random schedule from the seed <seed> on a copy of the trucks
+    of this process's inputs, and return its statistics, including 'seed'.
+    """
+    config, (parcels, fleet, dmap) = _start_inputs
+    config = _start_config(config, seed)
+    config['verbose'] = False
+    stats = SchedulingExperiment(config, (parcels, deepcopy(fleet),
+                                          dmap)).run()
+    stats['seed'] = seed
+    return stats
+
+
+def read_inputs(config: Dict[str, Union[str, bool]]) \
+        -> Tuple[Union[List[Parcel], ParcelTable], Fleet, DistanceMap]:
+    """Read the parcels, fleet and distance map of the experiment configured
+    by <config>, as SchedulingExperiment.__init__ does, and return them.
+
+    If <config> streams its parcels, the parcels returned are an empty list,
+    since they are read while they are scheduled.
+
+    Precondition: <config> contains keys and values as specified in
+    SchedulingExperiment.__init__.
+    """
+    cache = None
+    if config.get('cache_dir'):
+        cache = InputCache(config['cache_dir'],
+                           config.get('cache_max_bytes', 2 ** 30))
+    bulk = config.get('bulk_parse', False)
+    if config.get('stream', False):
+        parcels = []
+    elif config.get('parcel_table', False):
+        parcels = read_parcel_table(config['parcel_file'], cache, bulk)
+    else:
+        parcels = read_parcels(config['parcel_file'], cache, bulk)
+    fleet = read_trucks(config['truck_file'], config['depot_location'], cache,
+                        bulk)
+    lazy_bytes = None
+    if config.get('lazy_map', False):
+        lazy_bytes = int(config.get('lazy_map_bytes', 1 << 28))
+    dmap = read_distance_map(config['map_file'],
+                             config.get('dense_map', False), cache, bulk,
+                             lazy_bytes)
+    if config.get('complete_map', False):
+        dmap.complete_shortest_paths()
+    return parcels, fleet, dmap
+
+
+def read_parcels(parcel_file: str, cache: Optional[InputCache] = None,
+                 bulk: bool = False) -> List[Parcel]:
     """Read parcel data from <parcel_file> and return.
 
+    If <cache> is given, reuse the data it holds for <parcel_file>, if any,
+    instead of parsing the file, and otherwise add the parsed data to it.
+    If <bulk> is True, parse the file with ingest.parse_parcel_table.
+
     Precondition: <parcel_file> is the path to a file containing parcel data in
                   the form specified in Assignment 1.
     """
-    # TODO: Initialize any variable(s) as needed.
+    if cache is not None or bulk:
+        return list(read_parcel_table(parcel_file, cache, bulk))
+    parcels = []
     # read and add the parcels to the list.
     with open(parcel_file, 'r') as file:
         for line in file:
@@ -140,18 +519,172 @@ def read_parcels(parcel_file: str) -> List[Parcel]:
             source = tokens[1].strip()
             destination = tokens[2].strip()
             volume = int(tokens[3].strip())
-            # TODO: Do something with pid, source, destination and volume.
-    # TODO: Return something.
+            parcels.append(Parcel(pid, volume, source, destination))
+    return parcels
+
+
+def iter_parcel_batches(parcel_file: str,
+                        batch_size: int) -> Iterator[List[Parcel]]:
+    """Read parcel data from <parcel_file> and yield it in lists of
+    <batch_size> parcels, in the order they appear in the file.  The last
+    list may be shorter.  Only one batch is held in memory at a time.
+
+    Precondition: <parcel_file> is the path to a file containing parcel data in
+                  the form specified in Assignment 1.
+                  batch_size >= 1
+    """
+    batch = []
+    with open(parcel_file, 'r') as file:
+        for line in file:
+            tokens = line.strip().split(',')
+            batch.append(Parcel(int(tokens[0].strip()), int(tokens[3].strip()),
+                                tokens[1].strip(), tokens[2].strip()))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def peak_rss() -> int:
+    """Return the peak resident memory of this process so far, in
+    kilobytes, or -1 if it cannot be measured on this platform.
+    """
+    if resource is None:
+        return -1
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, where Linux reports kilobytes.
+    if sys.platform == 'darwin':
+        return peak // 1024
+    return peak
+
+
+def read_parcel_table(parcel_file: str, cache: Optional[InputCache] = None,
+                      bulk: bool = False) -> ParcelTable:
+    """Read parcel data from <parcel_file> and return it as a ParcelTable.
+
+    If <cache> is given, reuse the data it holds for <parcel_file>, if any,
+    instead of parsing the file, and otherwise add the parsed data to it.
+    If <bulk> is True, parse the file with ingest.parse_parcel_table.
+
+    Precondition: <parcel_file> is the path to a file containing parcel data in
+                  the form specified in Assignment 1.
+    """
+    parse = parse_parcel_table if bulk else _parse_parcel_table
+    return _cached(parcel_file, 'parcels', parse, cache)
 
 
-def read_distance_map(distance_map_file: str) -> DistanceMap:
+def read_distance_map(distance_map_file: str, dense: bool = False,
+                      cache: Optional[InputCache] = None,
+                      bulk: bool = False,
+                      lazy_bytes: Optional[int] = None) -> DistanceMap:
     """Read distance data from <distance_map_file> and return a DistanceMap
-    that records it.
+    that records it.  If <dense> is True, the DistanceMap stores the
+    distances in a dense matrix indexed by city id.  If <lazy_bytes> is
+    given, return a LazyDistanceMap that caches at most <lazy_bytes> bytes
+    of shortest path distances instead.
+
+    If <cache> is given, reuse the data it holds for <distance_map_file>, if
+    any, instead of parsing the file, and otherwise add the parsed data to it.
+    If <bulk> is True, parse the file with ingest.parse_distances.
 
     Precondition: <distance_map_file> is the path to a file containing distance
                   data in the form specified in Assignment 1.
     """
-    # TODO: Initialize any variable(s) as needed.
+    parse = parse_distances if bulk else _parse_distances
+    cities, firsts, seconds, distances1, distances2 = _cached(
+        distance_map_file, 'map', parse, cache)
+    if lazy_bytes is not None:
+        dmap = LazyDistanceMap(lazy_bytes)
+    else:
+        dmap = DistanceMap(dense)
+    for i in range(len(firsts)):
+        dmap.add_distance(cities[firsts[i]], cities[seconds[i]],
+                          distances1[i], distances2[i])
+    return dmap
+
+
+def read_trucks(truck_file: str, depot_location: str,
+                cache: Optional[InputCache] = None,
+                bulk: bool = False) -> Fleet:
+    """Read truck data from <truck_file> and return a Fleet containing these
+    trucks, with each truck starting at the <depot_location>.
+
+    If <cache> is given, reuse the data it holds for <truck_file>, if any,
+    instead of parsing the file, and otherwise add the parsed data to it.
+    If <bulk> is True, parse the file with ingest.parse_trucks.
+
+    Precondition: <truck_file> is a path to a file containing truck data in the
+                  form specified in Assignment 1.
+    """
+    ids, capacities = _cached(truck_file, 'trucks',
+                              parse_trucks if bulk else _parse_trucks, cache)
+    fleet = Fleet()
+    for tid, capacity in zip(ids, capacities):
+        fleet.add_truck(Truck(tid, capacity, depot_location))
+    return fleet
+
+
+def _cached(path: str, kind: str, parse: Callable[[str], Any],
+            cache: Optional[InputCache]) -> Any:
+    """Return <parse>(<path>), taking it from <cache> as data of kind <kind>
+    if it is there, and adding it to <cache> if it is not.  If <cache> is
+    None, just parse the file.
+    """
+    if cache is None:
+        return parse(path)
+    columns = cache.load(path, kind)
+    if columns is None:
+        data = parse(path)
+        cache.store(path, kind, _to_columns(data))
+        return data
+    return _from_columns(kind, columns)
+
+
+def _to_columns(data: Any) -> List[Column]:
+    """Return the columns of the parsed data <data>, for caching.
+    """
+    if isinstance(data, ParcelTable):
+        return [data.ids, data.volumes, data.sources, data.destinations,
+                data.cities]
+    return list(data)
+
+
+def _from_columns(kind: str, columns: List[Column]) -> Any:
+    """Return the parsed data of kind <kind> whose columns are <columns>,
+    as returned by _to_columns.
+    """
+    if kind != 'parcels':
+        return tuple(columns)
+    table = ParcelTable()
+    for city in columns[4]:
+        table.city_code(city)
+    table.ids, table.volumes, table.sources, table.destinations = columns[:4]
+    return table
+
+
+def _parse_parcel_table(parcel_file: str) -> ParcelTable:
+    """Parse the parcel data in <parcel_file> into a ParcelTable.
+    """
+    table = ParcelTable()
+    with open(parcel_file, 'r') as file:
+        for line in file:
+            tokens = line.strip().split(',')
+            table.append(int(tokens[0].strip()), int(tokens[3].strip()),
+                         tokens[1].strip(), tokens[2].strip())
+    return table
+
+
+def _parse_distances(distance_map_file: str) -> Tuple[List[str], array,
+                                                      array, array, array]:
+    """Parse the distance data in <distance_map_file> into a list of city
+    names and four columns: the index in that list of the first and the
+    second city of each row, and the distance from the first city to the
+    second and back.
+    """
+    cities = []
+    codes = {}
+    columns = (array('i'), array('i'), array('q'), array('q'))
     with open(distance_map_file, 'r') as file:
         for line in file:
             tokens = line.strip().split(',')
@@ -160,25 +693,29 @@ def read_distance_map(distance_map_file: str) -> DistanceMap:
             distance1 = int(tokens[2].strip())
             distance2 = int(tokens[3].strip()) if len(tokens) == 4 \
                 else distance1
-            # TODO: Do something with c1, c2, distance1, and distance2
-    # TODO: Return something.
-
-
-def read_trucks(truck_file: str, depot_location: str) -> Fleet:
-    """Read truck data from <truck_file> and return a Fleet containing these
-    trucks, with each truck starting at the <depot_location>.
-
-    Precondition: <truck_file> is a path to a file containing truck data in the
-                  form specified in Assignment 1.
+            for city in (c1, c2):
+                if city not in codes:
+                    codes[city] = len(cities)
+                    cities.append(city)
+            columns[0].append(codes[c1])
+            columns[1].append(codes[c2])
+            columns[2].append(distance1)
+            columns[3].append(distance2)
+    return (cities,) + columns
+
+
+def _parse_trucks(truck_file: str) -> Tuple[array, array]:
+    """Parse the truck data in <truck_file> into a column of truck ids and a
+    column of capacities.
     """
-    # TODO: Initialize any variable(s) as needed.
+    ids = array('q')
+    capacities = array('q')
     with open(truck_file, 'r') as file:
         for line in file:
             tokens = line.strip().split(',')
-            tid = int(tokens[0])
-            capacity = int(tokens[1])
-            # TODO: Do something with tid, capacity, and depot_location.
-    # TODO: Return something.
+            ids.append(int(tokens[0]))
+            capacities.append(int(tokens[1]))
+    return ids, capacities
 
 
 def simple_check(config_file: str) -> None:
@@ -200,11 +737,17 @@ def simple_check(config_file: str) -> None:
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'allowed-io': ['read_parcels', 'read_distance_map', 'read_trucks',
+        'allowed-io': ['read_parcels', 'iter_parcel_batches',
+                       '_parse_parcel_table',
+                       '_parse_distances', '_parse_trucks',
                        '_print_report', 'simple_check'],
         'allowed-import-modules': ['doctest', 'python_ta', 'typing',
-                                   'json', 'scheduler', 'domain',
-                                   'distance_map'],
+                                   'array', 'json', 'resource', 'sys',
+                                   'scheduler', 'domain',
+                                   'distance_map', 'input_cache', 'copy',
+                                   'concurrent.futures',
+                                   'routing', 'ingest', 'instrument',
+                                   'contextlib'],
         'disable': ['E1136'],
         'max-attributes': 15,
     })
@@ -0,0 +1,167 @@
+import pytest
+from domain import Parcel
+from experiment import SchedulingExperiment, read_inputs
+
+
+def test_greedy_stats(config: dict) -> None:
+    """Test the statistics of a small greedy experiment."""
+    stats = SchedulingExperiment(config).run()
+    assert stats['fleet'] == 3
+    assert stats['unused_trucks'] == 0
+    assert stats['unused_space'] == 0
+    assert stats['unscheduled'] == 1
+    assert stats['avg_fullness'] == pytest.approx(100.0)
+
+
+def test_parcel_table_gives_same_stats(config: dict) -> None:
+    """Test that reading the parcels into a ParcelTable does not change the
+    outcome of the experiment."""
+    expected = SchedulingExperiment(config).run()
+    config['parcel_table'] = True
+    assert SchedulingExperiment(config).run() == expected
+
+
+def test_dense_map_gives_same_stats(config: dict) -> None:
+    """Test that a dense distance map does not change the outcome of the
+    experiment."""
+    expected = SchedulingExperiment(config).run()
+    config['dense_map'] = True
+    assert SchedulingExperiment(config).run() == expected
+
+
+def test_cached_inputs_give_same_stats(config: dict, tmp_path) -> None:
+    """Test that experiments reading through the input cache, cold and then
+    warm, match one that parses the files directly."""
+    expected = SchedulingExperiment(config).run()
+    config['cache_dir'] = str(tmp_path / 'cache')
+    assert SchedulingExperiment(config).run() == expected
+    assert len(list((tmp_path / 'cache').glob('*.columns'))) == 3
+    config['dense_map'] = True
+    assert SchedulingExperiment(config).run() == expected
+
+
+def test_parsed_inputs_give_same_stats(config: dict) -> None:
+    """Test that an experiment on inputs read beforehand matches one that
+    reads its own files, and does not read them again."""
+    expected = SchedulingExperiment(config).run()
+    inputs = read_inputs(config)
+    for key in ['parcel_file', 'truck_file', 'map_file']:
+        config[key] = 'missing.txt'
+    assert SchedulingExperiment(config, inputs).run() == expected
+
+
+def test_best_fit_algorithm_gives_greedy_stats(config: dict) -> None:
+    """Test that the best-fit algorithm matches the greedy configuration it
+    is equivalent to."""
+    expected = SchedulingExperiment(config).run()
+    config['algorithm'] = 'best-fit'
+    assert SchedulingExperiment(config).run() == expected
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_optimized_routes_are_no_longer(config: dict, workers: int) -> None:
+    """Test that optimising the routes reports the distance before and
+    after, never makes a route longer, and does not move any parcel."""
+    config['parcel_priority'] = 'destination'
+    expected = SchedulingExperiment(config).run()
+    config['optimize_routes'] = True
+    config['route_workers'] = workers
+    expt = SchedulingExperiment(config)
+    stats = expt.run()
+    assert stats.pop('avg_distance_before') == expected['avg_distance']
+    assert stats['avg_distance'] <= expected['avg_distance']
+    assert stats.pop('avg_distance') >= 0
+    expected.pop('avg_distance')
+    assert stats == expected
+    for truck in expt.fleet.trucks:
+        assert set(truck.route) == {'Toronto'} | {parcel.destination
+                                                  for parcel in truck.parcels}
+
+
+def test_random_seed_is_reproducible(config: dict) -> None:
+    """Test that random schedules made from the same seed are the same."""
+    config['algorithm'] = 'random'
+    config['random_seed'] = 7
+    allocations = []
+    for _ in range(2):
+        expt = SchedulingExperiment(config)
+        expt.run()
+        allocations.append(expt.fleet.parcel_allocations())
+    assert allocations[0] == allocations[1]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_random_starts_keep_best(config: dict, workers: int) -> None:
+    """Test that the best of several random schedules is kept, and that the
+    statistics of each are reported."""
+    config['algorithm'] = 'random'
+    config['random_starts'] = 6
+    config['random_seed'] = 10
+    config['random_workers'] = workers
+    config['random_objective'] = ['unscheduled', '-avg_fullness']
+    stats = SchedulingExperiment(config).run()
+    starts = stats.pop('starts')
+    assert [start['seed'] for start in starts] == list(range(10, 16))
+    best = min(starts, key=lambda s: (s['unscheduled'], -s['avg_fullness']))
+    assert stats == best
+    config['random_workers'] = 1
+    assert SchedulingExperiment(config).run()['starts'] == starts
+
+
+@pytest.mark.parametrize('run_first', [False, True])
+def test_add_parcels_matches_full_stats(config: dict, run_first: bool) -> None:
+    """Test that the running statistics kept as batches of parcels arrive
+    match statistics computed from scratch."""
+    expt = SchedulingExperiment(config)
+    if run_first:
+        expt.run()
+    else:
+        expt.parcels = []
+    arrivals = [[Parcel(10 + i, 3 + i, 'Toronto', city)
+                 for i, city in enumerate(['London', 'Guelph'])],
+                [], [Parcel(20, 1, 'Toronto', 'Hamilton')],
+                [Parcel(21, 50, 'Toronto', 'London')]]
+    for i, batch in enumerate(arrivals):
+        stats = expt.add_parcels(batch)
+        assert stats.pop('batches') == i + 1
+        assert 0 <= stats.pop('batch_latency') <= stats.pop(
+            'max_batch_latency')
+        expt._compute_stats()
+        assert stats == pytest.approx(expt._stats)
+    assert stats['unscheduled'] == (5 if run_first else 1)
+
+
+@pytest.mark.parametrize('priority', ['volume', 'destination'])
+@pytest.mark.parametrize('order', ['non-decreasing', 'non-increasing'])
+def test_stream_with_full_lookahead_matches(config: dict, priority: str,
+                                            order: str) -> None:
+    """Test that streaming the parcels in small batches, with a window that
+    holds them all, gives the same outcome as reading them all at once."""
+    config['parcel_priority'] = priority
+    config['parcel_order'] = order
+    expected = SchedulingExperiment(config).run()
+    config.update({'stream': True, 'batch_size': 2, 'lookahead': 6})
+    stats = SchedulingExperiment(config).run()
+    assert stats.pop('peak_rss') != 0
+    assert stats == expected
+
+
+def test_stream_with_short_lookahead(config: dict) -> None:
+    """Test a stream whose window is smaller than the number of parcels."""
+    config.update({'stream': True, 'batch_size': 4, 'lookahead': 1})
+    stats = SchedulingExperiment(config).run()
+    # Only the 30 is left over, where seeing every parcel packs all but 10.
+    assert stats['unscheduled'] == 1
+    assert stats['fleet'] == 3
+
+
+def test_random_stream_packs_every_parcel_that_fits(config: dict) -> None:
+    """Test that the random scheduler can schedule a stream."""
+    config.update({'algorithm': 'random', 'stream': True, 'batch_size': 4})
+    stats = SchedulingExperiment(config).run()
+    assert 0 <= stats['unscheduled'] <= 6
+    assert 'peak_rss' in stats
+
+
+if __name__ == '__main__':
+    pytest.main(['experiment_test.py'])
@@ -0,0 +1,213 @@
+"""Assignment 1 - Compare all algorithms on a single problem (No tasks)
+
+===== Module Description =====
+
+This module reads from a json file (whose name is hard-coded in the
+compare_algorithms block) to determine the parcel, truck and map files to use.
+It then constructs all nine possible algorithm configurations, and runs each
+on this same data.  Results are printed to a csv file called 'results.csv'.
+
+More input sets, each given by its own json file, can be compared in the same
+sweep, and the experiments can be spread across a pool of worker processes.
+Each input set is read once, and the parsed data is handed to every worker
+rather than read again by each experiment.  The rows of the results are
+always written in the same order, whichever experiment finishes first.
+
+You have no tasks associated with this module.  It is provided to you so that
+you can compare the performance of the algorithms and notice any patterns or
+conclusions you might draw.  You may also find that reviewing the comparison
+reveals bugs in your code.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from typing import Any, TextIO, Dict, List, Optional, Tuple, Union
+import json
+import os
+from experiment import SchedulingExperiment, read_inputs
+
+# List of possible configurations for the scheduling algorithm.
+ALGORITHM_CONFIGURATIONS = [
+    # --- Random
+    {'algorithm': 'random',
+     'parcel_priority': 'NA',
+     'parcel_order': 'NA',
+     'truck_order': 'NA'},
+    # --- Greedy by volume, with 4 sub-configurations
+    {'algorithm': 'greedy',
+     'parcel_priority': 'volume',
+     'parcel_order': 'non-decreasing',
+     'truck_order': 'non-decreasing'},
+    {'algorithm': 'greedy',
+     'parcel_priority': 'volume',
+     'parcel_order': 'non-decreasing',
+     'truck_order': 'non-increasing'},
+    {'algorithm': 'greedy',
+     'parcel_priority': 'volume',
+     'parcel_order': 'non-increasing',
+     'truck_order': 'non-decreasing'},
+    {'algorithm': 'greedy',
+     'parcel_priority': 'volume',
+     'parcel_order': 'non-increasing',
+     'truck_order': 'non-increasing'},
+    # --- Greedy by destination, with 4 sub-configurations
+    {'algorithm': 'greedy',
+     'parcel_priority': 'destination',
+     'parcel_order': 'non-decreasing',
+     'truck_order': 'non-decreasing'},
+    {'algorithm': 'greedy',
+     'parcel_priority': 'destination',
+     'parcel_order': 'non-decreasing',
+     'truck_order': 'non-increasing'},
+    {'algorithm': 'greedy',
+     'parcel_priority': 'destination',
+     'parcel_order': 'non-increasing',
+     'truck_order': 'non-decreasing'},
+    {'algorithm': 'greedy',
+     'parcel_priority': 'destination',
+     'parcel_order': 'non-increasing',
+     'truck_order': 'non-increasing'}
+]
+
+# The parsed inputs of every input set in a sweep, as returned by read_inputs.
+# Each worker process is given its own copy once, when it starts.
+_inputs: List[Tuple[Any, Any, Any]] = []
+
+
+def print_table_title(file: TextIO, input_column: bool = False) -> None:
+    """Print the title row of a results table in csv format to <file>.
+
+    If <input_column> is True, the row starts with a column naming the input
+    set each experiment was run on.
+    """
+    if input_column:
+        file.write('Input,')
+    file.write('Algorithm,Parcel Priority,Parcel Order  ,Truck Order   ,'
+               + 'Unused Trucks,Unused Space,Avg dist,Avg fullness,'
+               + 'Unsched Parcels\n')
+
+
+def print_table_row(config: Dict[str, Union[str, bool]],
+                    stats: Dict[str, Union[int, float]], file: TextIO,
+                    input_name: Optional[str] = None) -> None:
+    """Print one row of a results table, in csv format.
+
+    <config> is the configuration that was used.
+    <stats> is the stats that resulted.
+    <file> is the file to write to.
+    <input_name>, if given, names the input set the experiment was run on.
+    """
+    if input_name is not None:
+        file.write(f'{input_name},')
+    file.write(f'{config["algorithm"]:<9},'
+               f'{config["parcel_priority"]:<15},'
+               f'{config["parcel_order"]:<14},'
+               f'{config["truck_order"]:<14},'
+               f'{stats["unused_trucks"]:<13},'
+               f'{stats["unused_space"]:<12},'
+               f'{stats["avg_distance"]:<8.2f},'
+               f'{stats["avg_fullness"]:<12.2f},'
+               f'{stats["unscheduled"]}\n')
+
+
+def compare_algorithms(config_file: str,
+                       more_config_files: Optional[List[str]] = None,
+                       workers: int = 1,
+                       results_file: str = 'data/results.csv') -> None:
+    """Compare all algorithms on a single problem.
+
+    Run the random algorithm and every configuration of the greedy
+    algorithm on the scheduling problem defined in <config_file>, and on
+    each problem defined in <more_config_files>, and write a table of the
+    results to <results_file>, creating its directory if it does not exist.
+    If there is more than one problem, each row starts with the name of the
+    json file that defined its problem.
+
+    The experiments are run across <workers> processes, or in this process
+    if <workers> is 1.  The rows are in the same order either way: by
+    problem, then in the order of ALGORITHM_CONFIGURATIONS.
+
+    Precondition: <config_file> and each of <more_config_files> is a path to
+    a json file with keys and values as in the dictionary format defined in
+    Assignment 1.
+    """
+    config_files = [config_file] + list(more_config_files or [])
+    basic_configs = []
+    for name in config_files:
+        with open(name, 'r') as file:
+            basic_configs.append(json.load(file))
+
+    # We will use the keys 'parcel_file', 'fleet_file' and 'map_file' from
+    # each dict in <basic_configs>.
+    # If it has any other keys, we will ignore them.  Instead of taking the
+    # algorithm configuration from a file, we try all possible configurations.
+    inputs = [read_inputs(config) for config in basic_configs]
+    tasks = []
+    for i, basic_config in enumerate(basic_configs):
+        for item in ALGORITHM_CONFIGURATIONS:
+            # Start with the basic configuration <config>, and add the
+            # algorithm details from this item in our list of configurations.
+            config = basic_config.copy()
+            config.update(item)
+            tasks.append((i, config))
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_set_inputs,
+                                 initargs=(inputs,)) as executor:
+            # map yields the results in the order of <tasks>, whichever
+            # worker finishes first.
+            results = list(executor.map(_run_experiment, tasks))
+    else:
+        _set_inputs(inputs)
+        try:
+            results = [_run_experiment(task) for task in tasks]
+        finally:
+            _set_inputs([])
+
+    input_column = len(config_files) > 1
+    directory = os.path.dirname(results_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(results_file, 'w') as file:
+        print_table_title(file, input_column)
+        for (i, config), stats in zip(tasks, results):
+            print_table_row(config, stats, file,
+                            config_files[i] if input_column else None)
+
+
+def _set_inputs(inputs: List[Tuple[Any, Any, Any]]) -> None:
+    """Make <inputs> the parsed inputs that experiments in this process are
+    run on.
+    """
+    global _inputs
+    _inputs = inputs
+
+
+def _run_experiment(task: Tuple[int, Dict[str, Union[str, bool]]]) \
+        -> Dict[str, Union[int, float]]:
+    """Run an experiment configured by the second item of <task> on the input
+    set whose index is the first item of <task>, and return its statistics.
+
+    The trucks are copied, so that the same input set can be used again.
+    """
+    i, config = task
+    parcels, fleet, dmap = _inputs[i]
+    expt = SchedulingExperiment(config, (parcels, deepcopy(fleet), dmap))
+    return expt.run(report=False)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['compare_algorithms'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'json', 'experiment', 'concurrent.futures',
+                                   'copy', 'os'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
+    # ------------------------------------------------------------------------
+    # The following code can be used to explore how the different scheduling
+    # algorithms compare on one example configuration.  It creates a report
+    # in file 'data/results.csv'.
+    # ------------------------------------------------------------------------
+    compare_algorithms('data/demo.json')
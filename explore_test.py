@@ -0,0 +1,60 @@
+import json
+import pytest
+from explore import compare_algorithms
+
+
+def _write_config(config: dict, path) -> str:
+    """Write <config> to a json file at <path> and return its name."""
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def _greedy_rows(path) -> list:
+    """Return the rows of the results table at <path>, without the rows of
+    the random algorithm, whose results vary between runs."""
+    lines = path.read_text().splitlines()
+    return [line for line in lines if 'random' not in line]
+
+
+def test_single_input(config: dict, tmp_path) -> None:
+    """Test that a sweep over one input set writes a title row and one row
+    per algorithm configuration."""
+    results = tmp_path / 'results.csv'
+    compare_algorithms(_write_config(config, tmp_path / 'a.json'),
+                       results_file=str(results))
+    lines = results.read_text().splitlines()
+    assert len(lines) == 10
+    assert lines[0].startswith('Algorithm,')
+    assert lines[1].startswith('random')
+
+
+def test_results_directory_created(config: dict, tmp_path) -> None:
+    """Test that the directory of the results file is created if it does
+    not exist."""
+    results = tmp_path / 'out' / 'results.csv'
+    compare_algorithms(_write_config(config, tmp_path / 'a.json'),
+                       results_file=str(results))
+    assert len(results.read_text().splitlines()) == 10
+
+
+def test_parallel_matches_sequential(config: dict, tmp_path) -> None:
+    """Test that a parallel sweep over several input sets writes the same
+    rows, in the same order, as a sequential one."""
+    first = _write_config(config, tmp_path / 'a.json')
+    config['depot_location'] = 'Hamilton'
+    second = _write_config(config, tmp_path / 'b.json')
+    sequential = tmp_path / 'sequential.csv'
+    parallel = tmp_path / 'parallel.csv'
+    compare_algorithms(first, [second], results_file=str(sequential))
+    compare_algorithms(first, [second], workers=3,
+                       results_file=str(parallel))
+    rows = _greedy_rows(sequential)
+    assert len(rows) == 17
+    assert rows[0].startswith('Input,')
+    names = [row.split(',')[0] for row in rows[1:]]
+    assert names == [first] * 8 + [second] * 8
+    assert _greedy_rows(parallel) == rows
+
+
+if __name__ == '__main__':
+    pytest.main(['explore_test.py'])
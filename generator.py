@@ -0,0 +1,219 @@
+"""Assignment 1 - Parcel and Truck data generator (No tasks)
+
+===== Module Description =====
+
+This module generates random parcel, truck and map data and writes each to a
+file.  Arguments control the amount of data, the number of cities, the
+distribution of volumes and the density of the map, so that data sets from a
+few rows to tens of millions of rows can be made to measure how each part of
+the program scales.  Rows are written to disk as they are generated, so only
+a bounded amount of data is held in memory whatever the size.  The same seed
+always gives the same files.
+
+You have no tasks associated with this module.  It is provided to you to assist
+in testing.  However, your best test cases will likely be very small ones that
+you hand-craft to force important conditions to arise.
+"""
+import json
+import os
+from random import Random
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# The cities of the small demo data, used first whenever cities are named.
+_CITIES = ['Belleville', 'Guelph', 'Hamilton', 'Toronto', 'London', 'Ottawa']
+
+# The number of rows generated before they are written out together.
+_CHUNK = 10000
+
+
+def generate(parcel_filename: str = 'data/demo-parcel-data.txt',
+             truck_filename: str = 'data/demo-truck-data.txt') -> None:
+    """Generate random truck and parcel data, and save to the files
+    <parcel_filename> and <truck_filename> respectively. File format is as
+    defined in Assignment 1.
+    """
+    write_parcels(parcel_filename, 15, _CITIES, 'Toronto', (5, 25))
+    write_trucks(truck_filename, 5, (20, 50))
+
+
+def city_names(num_cities: int) -> List[str]:
+    """Return the names of <num_cities> cities: the cities of the demo data
+    first, then 'City6', 'City7' and so on.
+
+    >>> city_names(3)
+    ['Belleville', 'Guelph', 'Hamilton']
+    >>> city_names(8)[-2:]
+    ['City6', 'City7']
+    """
+    return (_CITIES[:num_cities]
+            + [f'City{i}' for i in range(len(_CITIES), num_cities)])
+
+
+def volume_sampler(rng: Random, volumes: Tuple[int, int],
+                   distribution: str = 'uniform') -> Callable[[], int]:
+    """Return a function that returns a random volume from <volumes>, a
+    range (low, high) including both ends, each time it is called, using
+    <rng>.
+
+    <distribution> is 'uniform', for volumes equally likely across the
+    range, 'normal', for volumes clustered around the middle of the range,
+    or 'skewed', for mostly small volumes with a few large ones.
+
+    >>> sample = volume_sampler(Random(148), (5, 25), 'skewed')
+    >>> all(5 <= sample() <= 25 for _ in range(1000))
+    True
+    """
+    low, high = volumes
+    if distribution == 'uniform':
+        return lambda: rng.randint(low, high)
+    if distribution == 'normal':
+        middle, spread = (low + high) / 2, (high - low) / 6
+        return lambda: min(max(round(rng.gauss(middle, spread)), low), high)
+    if distribution == 'skewed':
+        scale = (high - low) / 5
+        return lambda: min(low + int(rng.expovariate(1) * scale), high)
+    raise ValueError(f'unknown volume distribution {distribution!r}')
+
+
+def write_parcels(filename: str, num_parcels: int, cities: List[str],
+                  depot: str, volumes: Tuple[int, int] = (5, 25),
+                  distribution: str = 'uniform',
+                  seed: Optional[int] = None) -> None:
+    """Write <num_parcels> random parcels to <filename>, in the format
+    defined in Assignment 1, with ids from 0 in a random order.
+
+    Each parcel goes between two different cities in <cities>, one of which
+    is <depot>.  Its volume is drawn from <volumes> with <distribution>, as
+    for volume_sampler.  The random choices are made from <seed>.
+
+    Precondition: <depot> is in <cities>, and <cities> has at least two
+    cities.
+    """
+    rng = Random(seed)
+    volume = volume_sampler(rng, volumes, distribution)
+    others = [city for city in cities if city != depot]
+    with open(filename, 'w') as file:
+        for start in range(0, num_parcels, _CHUNK):
+            ids = list(range(start, min(start + _CHUNK, num_parcels)))
+            rng.shuffle(ids)
+            lines = []
+            for id_ in ids:
+                source, destination = depot, rng.choice(others)
+                if rng.random() < 0.5:
+                    source, destination = destination, source
+                lines.append(f'{id_}, {source}, {destination}, '
+                             f'{volume()}\n')
+            file.writelines(lines)
+
+
+def write_trucks(filename: str, num_trucks: int,
+                 volumes: Tuple[int, int] = (20, 50),
+                 distribution: str = 'uniform',
+                 seed: Optional[int] = None) -> None:
+    """Write <num_trucks> random trucks to <filename>, in the format defined
+    in Assignment 1, with ids from 0.
+
+    Each truck's capacity is drawn from <volumes> with <distribution>, as
+    for volume_sampler.  The random choices are made from <seed>.
+    """
+    rng = Random(seed)
+    capacity = volume_sampler(rng, volumes, distribution)
+    with open(filename, 'w') as file:
+        for start in range(0, num_trucks, _CHUNK):
+            file.writelines(f'{id_}, {capacity()}\n' for id_ in
+                            range(start, min(start + _CHUNK, num_trucks)))
+
+
+def write_map(filename: str, cities: List[str], density: float = 1.0,
+              distances: Tuple[int, int] = (1, 100), asymmetry: float = 0.0,
+              seed: Optional[int] = None) -> int:
+    """Write a random map of the roads between <cities> to <filename>, in
+    the format defined in Assignment 1, and return the number of roads.
+
+    About <density> of all pairs of cities are joined by a road, and every
+    city is joined to the next in <cities>, so that every pair has a path.
+    Each distance is drawn uniformly from <distances>, and about <asymmetry>
+    of the roads have a different distance back.  The random choices are
+    made from <seed>.  Only the roads from one city are held in memory at a
+    time.
+
+    Precondition: 0 <= density <= 1 and 0 <= asymmetry <= 1
+    """
+    rng = Random(seed)
+    low, high = distances
+    n = len(cities)
+    roads = 0
+    with open(filename, 'w') as file:
+        for i in range(n - 1):
+            # City i is joined to city i + 1, and to enough later cities
+            # that about <density> of its pairs with them have a road.
+            extra = round(density * (n - i - 1)) - 1
+            later = [i + 1]
+            if extra > 0:
+                later.extend(rng.sample(range(i + 2, n), extra))
+            lines = []
+            for j in later:
+                line = f'{cities[i]}, {cities[j]}, {rng.randint(low, high)}'
+                if rng.random() < asymmetry:
+                    line += f', {rng.randint(low, high)}'
+                lines.append(line + '\n')
+            file.writelines(lines)
+            roads += len(lines)
+    return roads
+
+
+def generate_data(directory: str, num_parcels: int, num_trucks: int,
+                  num_cities: int = 6, density: float = 1.0,
+                  parcel_volumes: Tuple[int, int] = (5, 25),
+                  truck_volumes: Tuple[int, int] = (20, 50),
+                  distribution: str = 'uniform',
+                  seed: Optional[int] = 148) -> Dict[str, Union[str, bool]]:
+    """Write a parcel, truck and map file for a random problem to
+    <directory>, together with a configuration file 'config.json' that runs
+    a greedy experiment on them, and return that configuration.
+
+    The problem has <num_parcels> parcels and <num_trucks> trucks, whose
+    volumes and capacities are drawn from <parcel_volumes> and
+    <truck_volumes> with <distribution>, and a map of <num_cities> cities
+    with the road density <density>.  The depot is the first city.  The
+    random choices are made from <seed>.
+
+    Precondition: num_cities >= 2
+    """
+    os.makedirs(directory, exist_ok=True)
+    cities = city_names(num_cities)
+    config = {'depot_location': cities[0],
+              'parcel_file': os.path.join(directory, 'parcels.txt'),
+              'truck_file': os.path.join(directory, 'trucks.txt'),
+              'map_file': os.path.join(directory, 'map.txt'),
+              'algorithm': 'greedy',
+              'parcel_priority': 'destination',
+              'parcel_order': 'non-decreasing',
+              'truck_order': 'non-increasing',
+              'verbose': False}
+    rng = Random(seed)
+    write_parcels(config['parcel_file'], num_parcels, cities, cities[0],
+                  parcel_volumes, distribution, rng.randrange(2 ** 32))
+    write_trucks(config['truck_file'], num_trucks, truck_volumes,
+                 distribution, rng.randrange(2 ** 32))
+    write_map(config['map_file'], cities, density,
+              seed=rng.randrange(2 ** 32))
+    with open(os.path.join(directory, 'config.json'), 'w') as file:
+        json.dump(config, file, indent=4)
+    return config
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['write_parcels', 'write_trucks', 'write_map',
+                       'generate_data'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing', 'json',
+                                   'os', 'random'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
+    generate()
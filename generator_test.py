@@ -0,0 +1,62 @@
+import pytest
+from experiment import SchedulingExperiment, read_distance_map, \
+    read_parcels, read_trucks
+from generator import city_names, generate_data, write_map, write_parcels
+
+
+def test_generated_data_runs(tmp_path) -> None:
+    """Test that generated data has the requested sizes, unique ids, and
+    can be scheduled by an experiment."""
+    config = generate_data(str(tmp_path), 25000, 300, num_cities=40,
+                           density=0.2, distribution='normal')
+    parcels = read_parcels(config['parcel_file'])
+    fleet = read_trucks(config['truck_file'], config['depot_location'])
+    assert sorted(parcel.id for parcel in parcels) == list(range(25000))
+    assert all(5 <= parcel.volume <= 25 for parcel in parcels)
+    assert all(config['depot_location'] in (parcel.source,
+                                            parcel.destination)
+               for parcel in parcels)
+    assert fleet.num_trucks() == 300
+    stats = SchedulingExperiment(config).run()
+    assert stats['fleet'] == 300
+    assert (tmp_path / 'config.json').exists()
+
+
+def test_same_seed_same_files(tmp_path) -> None:
+    """Test that the same seed gives the same files, and another seed does
+    not."""
+    for name, seed in [('a', 1), ('b', 1), ('c', 2)]:
+        generate_data(str(tmp_path / name), 500, 10, num_cities=12,
+                      density=0.5, seed=seed)
+    for file in ['parcels.txt', 'trucks.txt', 'map.txt']:
+        a = (tmp_path / 'a' / file).read_text()
+        assert a == (tmp_path / 'b' / file).read_text()
+        assert a != (tmp_path / 'c' / file).read_text()
+
+
+@pytest.mark.parametrize('density', [0.0, 0.1, 0.5, 1.0])
+def test_map_density_and_paths(tmp_path, density: float) -> None:
+    """Test that a map has about the requested density of roads, and a path
+    between every pair of cities."""
+    cities = city_names(60)
+    path = str(tmp_path / 'map.txt')
+    roads = write_map(path, cities, density, asymmetry=0.5, seed=148)
+    pairs = 60 * 59 // 2
+    assert roads == len(open(path).readlines())
+    low, high = density * pairs * 0.9, density * pairs * 1.1
+    assert max(59, low) <= roads <= max(59, high)
+    dmap = read_distance_map(path)
+    dmap.complete_shortest_paths()
+    assert all(dmap.distance(a, b) >= 0 for a in cities for b in cities)
+
+
+def test_parcels_streamed_in_chunks(tmp_path) -> None:
+    """Test that ids stay unique when the parcels span several chunks."""
+    path = str(tmp_path / 'parcels.txt')
+    write_parcels(path, 23456, city_names(6), 'Toronto', seed=3)
+    ids = [int(line.split(',')[0]) for line in open(path)]
+    assert sorted(ids) == list(range(23456))
+
+
+if __name__ == '__main__':
+    pytest.main(['generator_test.py'])
@@ -0,0 +1,73 @@
+import pytest
+import ingest
+from experiment import SchedulingExperiment, _parse_distances, \
+    _parse_parcel_table, _parse_trucks
+from generator import city_names, write_map, write_parcels, write_trucks
+
+
+def _tables_equal(a, b) -> bool:
+    """Return True iff the ParcelTables <a> and <b> hold the same data."""
+    return (a.ids == b.ids and a.volumes == b.volumes
+            and a.sources == b.sources and a.destinations == b.destinations
+            and a.cities == b.cities
+            and [a.city_code(city) for city in a.cities]
+            == [b.city_code(city) for city in b.cities])
+
+
+@pytest.mark.parametrize('chunk_bytes', [1 << 24, 100])
+def test_generated_files_match(tmp_path, monkeypatch,
+                               chunk_bytes: int) -> None:
+    """Test that bulk parsing gives the same data as the line-by-line
+    parsers, in one chunk or in many."""
+    monkeypatch.setattr(ingest, '_CHUNK_BYTES', chunk_bytes)
+    cities = city_names(30)
+    parcels, trucks, dmap = (str(tmp_path / name) for name in
+                             ['parcels.txt', 'trucks.txt', 'map.txt'])
+    write_parcels(parcels, 3000, cities, cities[0], seed=1)
+    write_trucks(trucks, 200, seed=2)
+    write_map(dmap, cities, 0.3, asymmetry=0.4, seed=3)
+    assert _tables_equal(ingest.parse_parcel_table(parcels),
+                         _parse_parcel_table(parcels))
+    assert ingest.parse_trucks(trucks) == _parse_trucks(trucks)
+    assert ingest.parse_distances(dmap) == _parse_distances(dmap)
+
+
+def test_irregular_lines(tmp_path) -> None:
+    """Test that bulk parsing matches the line-by-line parsers on files with
+    Windows line endings, extra spaces, mixed map rows and no final
+    newline."""
+    parcels = tmp_path / 'parcels.txt'
+    parcels.write_bytes(b'3,  Toronto ,Guelph, 7\r\n1, Guelph, Toronto,2')
+    trucks = tmp_path / 'trucks.txt'
+    trucks.write_bytes(b' 4 , 10\r\n5,20\r\n')
+    dmap = tmp_path / 'map.txt'
+    dmap.write_bytes(b'Toronto, Guelph, 5\nGuelph,London, 6, 8\r\n'
+                     b'London, Toronto, 9\n')
+    assert _tables_equal(ingest.parse_parcel_table(str(parcels)),
+                         _parse_parcel_table(str(parcels)))
+    assert ingest.parse_trucks(str(trucks)) == _parse_trucks(str(trucks))
+    assert ingest.parse_distances(str(dmap)) == _parse_distances(str(dmap))
+    empty = tmp_path / 'empty.txt'
+    empty.write_bytes(b'')
+    assert len(ingest.parse_parcel_table(str(empty))) == 0
+
+
+def test_bulk_parse_experiment(config: dict) -> None:
+    """Test that an experiment gives the same statistics when its inputs
+    are parsed in bulk."""
+    expected = SchedulingExperiment(config).run()
+    config['bulk_parse'] = True
+    assert SchedulingExperiment(config).run() == expected
+
+
+def test_parse_rate(tmp_path) -> None:
+    """Test that the parse rate counts every row."""
+    path = str(tmp_path / 'trucks.txt')
+    write_trucks(path, 1234, seed=5)
+    rate = ingest.parse_rate(path, ingest.parse_trucks)
+    assert rate['rows'] == 1234
+    assert rate['rows_per_second'] > 0
+
+
+if __name__ == '__main__':
+    pytest.main(['ingest_test.py'])
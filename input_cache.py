@@ -0,0 +1,233 @@
+"""An on-disk cache of parsed input files.
+
+===== Module Description =====
+
+This module contains the class InputCache, which stores the parsed contents
+of parcel, truck and map files in a compact binary form, so that later runs
+on the same files can skip parsing the text.
+
+The parsed contents are stored as columns, each an array of numbers or a
+list of city names.  An entry is a line of JSON describing its columns,
+followed by the raw bytes of each array, as written by array.tofile, and the
+names in UTF-8.  Reading an entry back only reads arrays and strings, so a
+cache directory shared with others cannot be made to run code, and an entry
+that is damaged or of an older form is parsed again.
+
+Each entry is keyed by the SHA-256 digest of the file's contents.  The digest
+of each file is remembered together with its modification time and size, so
+that an unchanged file is not even re-read to be hashed.  When the entries
+take up more than a set number of bytes, the least recently used ones are
+deleted.
+"""
+import hashlib
+import json
+import os
+import sys
+from array import array
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Union
+
+# Change this whenever the form of the cached data changes, so that entries
+# written by older code are never read.
+_FORMAT = 2
+
+# The file name suffix of the cache entries.
+_SUFFIX = '.columns'
+
+# A column of parsed data: an array of numbers or a list of city names.
+Column = Union[array, List[str]]
+
+
+class InputCache:
+    """A cache of parsed input files, stored in a directory.
+
+    === Public Attributes ===
+    directory:
+      The directory the cache entries are stored in.
+    max_bytes:
+      The largest total size, in bytes, that the cache entries may have
+      before the least recently used ones are deleted.
+
+    === Private Attributes ===
+    _index:
+      Maps the absolute path of each file that has been hashed to a list of
+      its modification time in nanoseconds, its size, and its digest.
+
+    === Representation Invariants ===
+    - max_bytes >= 0
+    """
+    directory: str
+    max_bytes: int
+    _index: Dict[str, List[Any]]
+
+    def __init__(self, directory: str, max_bytes: int = 2 ** 30) -> None:
+        """Initialize a cache stored in <directory>, which holds at most
+        <max_bytes> bytes of entries.  Create <directory> if it does not
+        exist.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self._index_path(), 'r') as file:
+                self._index = json.load(file)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def load(self, path: str, kind: str) -> Optional[List[Column]]:
+        """Return the columns of kind <kind> cached for the file at <path>,
+        or None if there are none, or if the entry cannot be read.
+        """
+        entry = self._entry_path(path, kind)
+        try:
+            with open(entry, 'rb') as file:
+                columns = _read_columns(file)
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            return None
+        # Mark the entry as recently used, for eviction.
+        os.utime(entry)
+        return columns
+
+    def store(self, path: str, kind: str, columns: Sequence[Column]) -> None:
+        """Cache <columns> as the parsed data of kind <kind> for the file at
+        <path>, then delete the least recently used entries until the cache
+        fits in <max_bytes>.
+
+        Precondition: no city name in <columns> contains a newline.
+        """
+        entry = self._entry_path(path, kind)
+        temporary = f'{entry}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            _write_columns(file, columns)
+        os.replace(temporary, entry)
+        self._evict()
+
+    def _digest(self, path: str) -> str:
+        """Return the SHA-256 digest of the contents of the file at <path>,
+        re-reading the file only if it has changed since it was last hashed.
+        """
+        path = os.path.abspath(path)
+        status = os.stat(path)
+        known = self._index.get(path)
+        if known is not None and known[:2] == [status.st_mtime_ns,
+                                               status.st_size]:
+            return known[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        self._index[path] = [status.st_mtime_ns, status.st_size,
+                             digest.hexdigest()]
+        self._save_index()
+        return digest.hexdigest()
+
+    def _entry_path(self, path: str, kind: str) -> str:
+        """Return the path of the entry for the data of kind <kind> parsed
+        from the file at <path>.
+        """
+        return os.path.join(self.directory,
+                            f'{kind}-{_FORMAT}-{self._digest(path)}{_SUFFIX}')
+
+    def _index_path(self) -> str:
+        """Return the path of the file that <_index> is saved in.
+        """
+        return os.path.join(self.directory, 'index.json')
+
+    def _save_index(self) -> None:
+        """Save <_index> to its file.
+        """
+        temporary = f'{self._index_path()}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self._index, file)
+        os.replace(temporary, self._index_path())
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries until the total size of the
+        entries is at most <max_bytes>, and forget the digests of files that
+        no longer exist.
+        """
+        missing = [path for path in self._index if not os.path.exists(path)]
+        for path in missing:
+            del self._index[path]
+        if missing:
+            self._save_index()
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                status = os.stat(os.path.join(self.directory, name))
+                entries.append((status.st_mtime_ns, status.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+
+def _write_columns(file: BinaryIO, columns: Sequence[Column]) -> None:
+    """Write <columns> to the binary <file>: a line of JSON giving the byte
+    order and the type and size of each column, then the contents of each
+    column in turn.
+    """
+    described = []
+    contents = []
+    for column in columns:
+        if isinstance(column, array):
+            described.append([column.typecode, len(column)])
+            contents.append(column)
+        else:
+            names = '\n'.join(column).encode('utf-8')
+            described.append(['str', len(names), len(column)])
+            contents.append(names)
+    header = {'byteorder': sys.byteorder, 'columns': described}
+    file.write(json.dumps(header).encode('utf-8') + b'\n')
+    for content in contents:
+        if isinstance(content, array):
+            content.tofile(file)
+        else:
+            file.write(content)
+
+
+def _read_columns(file: BinaryIO) -> List[Column]:
+    """Return the columns written to the binary <file> by _write_columns.
+
+    Raise ValueError, or another exception caught by InputCache.load, if
+    the file does not hold columns written on a machine of the same byte
+    order.
+    """
+    header = json.loads(file.readline())
+    if header['byteorder'] != sys.byteorder:
+        raise ValueError('cache entry written with another byte order')
+    columns = []
+    for description in header['columns']:
+        if description[0] == 'str':
+            _, size, count = description
+            names = file.read(size).decode('utf-8').split('\n')
+            if count == 0:
+                names = []
+            if len(names) != count:
+                raise ValueError('truncated cache entry')
+            columns.append(names)
+        else:
+            typecode, count = description
+            column = array(typecode)
+            column.fromfile(file, count)
+            columns.append(column)
+    if file.read(1):
+        raise ValueError('cache entry has trailing data')
+    return columns
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['InputCache.__init__', 'InputCache.load',
+                       'InputCache.store', 'InputCache._digest',
+                       '_write_columns', '_read_columns'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'hashlib', 'json', 'os', 'sys', 'array'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
@@ -0,0 +1,99 @@
+import os
+from array import array
+import pytest
+from input_cache import InputCache
+
+
+def test_store_and_load(tmp_path) -> None:
+    """Test that stored data is loaded back for an unchanged file, and not
+    for a file whose contents have changed."""
+    path = tmp_path / 'data.txt'
+    path.write_text('1, 2\n')
+    cache = InputCache(str(tmp_path / 'cache'))
+    assert cache.load(str(path), 'trucks') is None
+    columns = [array('q', [1, 2]), ['Toronto', 'Guelph'], [],
+               array('i')]
+    cache.store(str(path), 'trucks', columns)
+    assert InputCache(str(tmp_path / 'cache')).load(str(path),
+                                                    'trucks') == columns
+    assert cache.load(str(path), 'parcels') is None
+    path.write_text('3, 4\n')
+    os.utime(path, ns=(1, 1))
+    assert cache.load(str(path), 'trucks') is None
+
+
+def test_same_contents_share_an_entry(tmp_path) -> None:
+    """Test that two files with the same contents share a cache entry."""
+    first = tmp_path / 'a.txt'
+    second = tmp_path / 'b.txt'
+    first.write_text('1, 2\n')
+    second.write_text('1, 2\n')
+    cache = InputCache(str(tmp_path / 'cache'))
+    cache.store(str(first), 'trucks', [['parsed']])
+    assert cache.load(str(second), 'trucks') == [['parsed']]
+
+
+def test_eviction_keeps_recent_entries(tmp_path) -> None:
+    """Test that the least recently used entries are evicted first."""
+    cache = InputCache(str(tmp_path / 'cache'), max_bytes=25000)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'{i}.txt'
+        path.write_text(str(i))
+        paths.append(str(path))
+        before = set(os.listdir(cache.directory))
+        cache.store(paths[-1], 'parcels', [array('b', bytes(10000))])
+        for name in set(os.listdir(cache.directory)) - before:
+            if name.endswith('.columns'):
+                # Give each entry a distinct, increasing last-use time.
+                os.utime(os.path.join(cache.directory, name),
+                         ns=(i * 10 ** 9, i * 10 ** 9))
+    assert cache.load(paths[0], 'parcels') is None
+    assert cache.load(paths[1], 'parcels') is not None
+    assert cache.load(paths[2], 'parcels') is not None
+
+
+def test_store_leaves_other_files(tmp_path) -> None:
+    """Test that storing an entry leaves files that are not cache entries in
+    the cache directory, and forgets the digests of deleted files."""
+    cache = InputCache(str(tmp_path / 'cache'), max_bytes=0)
+    other = os.path.join(cache.directory, 'my_model.pickle')
+    with open(other, 'wb') as file:
+        file.write(b'model')
+    gone = tmp_path / 'gone.txt'
+    gone.write_text('1')
+    kept = tmp_path / 'kept.txt'
+    kept.write_text('2')
+    cache.store(str(gone), 'trucks', [['a']])
+    gone.unlink()
+    cache.store(str(kept), 'trucks', [['b']])
+    assert os.path.exists(other)
+    assert list(InputCache(cache.directory)._index) == [str(kept)]
+
+
+@pytest.mark.parametrize('damage', [b'', b'not json\n', b'{}\n',
+                                    b'{"byteorder": "middle"}\n',
+                                    b'[1]\n', 'truncate', 'extend'])
+def test_damaged_entry_is_a_miss(tmp_path, damage) -> None:
+    """Test that an entry that cannot be read back as it was written is
+    treated as missing, so that the file is parsed again."""
+    path = tmp_path / 'data.txt'
+    path.write_text('1, 2\n')
+    cache = InputCache(str(tmp_path / 'cache'))
+    cache.store(str(path), 'trucks', [array('q', range(10)), ['a', 'b']])
+    entry = cache._entry_path(str(path), 'trucks')
+    with open(entry, 'rb') as file:
+        contents = file.read()
+    if damage == 'truncate':
+        contents = contents[:-5]
+    elif damage == 'extend':
+        contents += b'x'
+    else:
+        contents = damage
+    with open(entry, 'wb') as file:
+        file.write(contents)
+    assert cache.load(str(path), 'trucks') is None
+
+
+if __name__ == '__main__':
+    pytest.main(['input_cache_test.py'])
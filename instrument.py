@@ -0,0 +1,288 @@
+"""Instrumentation of experiments.
+
+===== Module Description =====
+
+This module contains the class Recorder, which records the wall and CPU time
+spent in each phase of an experiment, and counts the calls made to the hot
+paths of the program while a phase runs: parcels added to and removed from
+priority queues, attempts to pack a parcel onto a truck and how many of them
+failed, and distance lookups.
+
+The hot paths are not changed when no phase is being recorded.  The
+methods counted are replaced with counting versions when a phase starts and
+no other phase of any Recorder is running, and the originals are put back
+when the last running phase ends, so code run without instrumentation pays
+nothing for it.  Each call made while they are installed is counted by
+every Recorder with a phase running, so Recorders may overlap, in one thread
+or in several.  The counts are global while a phase runs, so they include
+the calls made by other code in the same process, and not those made in
+other processes.
+
+The recorded metrics can be saved as JSON lines, one line per phase followed
+by one line of counts, or as Chrome trace events, which can be viewed in
+chrome://tracing or Perfetto.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter, process_time
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+from container import AddressablePriorityQueue, BucketPriorityQueue, \
+    MeldablePriorityQueue, PriorityQueue
+from distance_map import DistanceMap, LazyDistanceMap
+from domain import Truck
+
+# Each method counted by a Recorder: the class that defines it, its name, and
+# the counter that each call adds to.
+_COUNTED = [
+    (PriorityQueue, 'add', 'queue_adds'),
+    (PriorityQueue, 'remove', 'queue_removes'),
+    (AddressablePriorityQueue, 'add', 'queue_adds'),
+    (AddressablePriorityQueue, 'remove', 'queue_removes'),
+    (BucketPriorityQueue, 'add', 'queue_adds'),
+    (BucketPriorityQueue, 'remove', 'queue_removes'),
+    (MeldablePriorityQueue, 'add', 'queue_adds'),
+    (MeldablePriorityQueue, 'remove', 'queue_removes'),
+    (DistanceMap, 'distance', 'distance_lookups'),
+    (DistanceMap, 'distance_by_id', 'distance_lookups'),
+    (DistanceMap, 'route_length', 'route_lengths'),
+    (LazyDistanceMap, 'distance', 'distance_lookups'),
+    (LazyDistanceMap, 'distance_by_id', 'distance_lookups'),
+    (LazyDistanceMap, 'route_length', 'route_lengths'),
+]
+
+# The Recorders with a phase running, which count each call to a counted
+# method.  It is replaced rather than changed, so that a call counted while
+# another thread starts or ends a phase sees a consistent tuple.
+_active: Tuple['Recorder', ...] = ()
+
+# The methods replaced by counting versions while <_active> is not empty, as
+# (class, name, method) tuples.
+_originals: List[Tuple[type, str, Callable]] = []
+
+# Held while <_active> and <_originals> are changed.
+_lock = threading.Lock()
+
+# The counters of the counted calls under way in each thread.
+_running = threading.local()
+
+
+class Recorder:
+    """Records the time spent in each phase of an experiment, and counts the
+    calls made to hot paths while a phase runs.
+
+    === Public Attributes ===
+    phases:
+      A list of the phases recorded, in the order they started.  Each is a
+      tuple of its name, its start time in seconds since the Recorder was
+      made, its wall time and its CPU time, in seconds.
+    counters:
+      Maps the name of each counter to its count: 'queue_adds',
+      'queue_removes', 'pack_attempts', 'pack_failures',
+      'distance_lookups', which counts calls to the distance and
+      distance_by_id methods of a DistanceMap or LazyDistanceMap, and
+      'route_lengths', which counts calls to their route_length methods.
+
+    === Private Attributes ===
+    _origin:
+      The value of perf_counter when this Recorder was made.
+    _depth:
+      The number of phases of this Recorder that are running.
+
+    === Representation Invariants ===
+    - _depth >= 0
+    - this Recorder is in <_active> iff _depth > 0
+    """
+    phases: List[Tuple[str, float, float, float]]
+    counters: Dict[str, int]
+    _origin: float
+    _depth: int
+
+    def __init__(self) -> None:
+        """Initialize a Recorder that has recorded nothing.
+
+        >>> Recorder().metrics()['counters']['pack_attempts']
+        0
+        """
+        self.phases = []
+        self.counters = {'queue_adds': 0, 'queue_removes': 0,
+                         'pack_attempts': 0, 'pack_failures': 0,
+                         'distance_lookups': 0, 'route_lengths': 0}
+        self._origin = perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Record the wall and CPU time of the code run inside this context
+        as the phase <name>, counting the calls it makes to hot paths.
+
+        Phases may be nested; each is recorded, and the calls are counted
+        once.
+
+        >>> r = Recorder()
+        >>> with r.phase('queue'):
+        ...     q = PriorityQueue()
+        ...     q.add(3)
+        ...     _ = q.remove()
+        >>> r.phases[0][0], r.counters['queue_adds']
+        ('queue', 1)
+        >>> PriorityQueue.add is q.add.__func__
+        True
+        """
+        if self._depth == 0:
+            _start(self)
+        self._depth += 1
+        wall, cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            self.phases.append((name, wall - self._origin,
+                                perf_counter() - wall, process_time() - cpu))
+            self._depth -= 1
+            if self._depth == 0:
+                _stop(self)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return the recorded metrics: 'phases', which maps the name of each
+        phase to its total 'wall' and 'cpu' time in seconds, and 'counters',
+        a copy of <counters>.
+        """
+        phases = {}
+        for name, _, wall, cpu in self.phases:
+            times = phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            times['wall'] += wall
+            times['cpu'] += cpu
+        return {'phases': phases, 'counters': dict(self.counters)}
+
+    def write(self, filename: str, trace_format: str = 'jsonl') -> None:
+        """Write the recorded metrics to <filename>, as JSON lines if
+        <trace_format> is 'jsonl', or as Chrome trace events if it is
+        'chrome'.
+        """
+        if trace_format == 'chrome':
+            events = self._trace_events()
+            with open(filename, 'w') as file:
+                json.dump({'traceEvents': events}, file)
+        elif trace_format == 'jsonl':
+            with open(filename, 'w') as file:
+                for name, start, wall, cpu in self.phases:
+                    file.write(json.dumps({'phase': name, 'start': start,
+                                           'wall': wall, 'cpu': cpu}) + '\n')
+                file.write(json.dumps({'counters': self.counters}) + '\n')
+        else:
+            raise ValueError(f'unknown trace format {trace_format!r}')
+
+    def _trace_events(self) -> List[Dict[str, Union[str, int, float, Dict]]]:
+        """Return the recorded metrics as Chrome trace events: a complete
+        event for each phase, and a counter event, at the end of the last
+        phase, for the counts.  Times are in microseconds.
+        """
+        pid = os.getpid()
+        events = [{'name': name, 'cat': 'phase', 'ph': 'X', 'pid': pid,
+                   'tid': 0, 'ts': start * 1e6, 'dur': wall * 1e6,
+                   'args': {'cpu_seconds': cpu}}
+                  for name, start, wall, cpu in self.phases]
+        end = max((start + wall for _, start, wall, _ in self.phases),
+                  default=0.0)
+        events.append({'name': 'counters', 'ph': 'C', 'pid': pid, 'tid': 0,
+                       'ts': end * 1e6, 'args': dict(self.counters)})
+        return events
+
+
+def _start(recorder: Recorder) -> None:
+    """Make <recorder> count the calls to the counted methods, replacing them
+    with counting versions if no other Recorder is counting them.
+    """
+    global _active
+    with _lock:
+        if not _active:
+            _install()
+        _active += (recorder,)
+
+
+def _stop(recorder: Recorder) -> None:
+    """Stop <recorder> counting the calls to the counted methods, putting the
+    original methods back if no other Recorder is counting them.
+    """
+    global _active
+    with _lock:
+        _active = tuple(other for other in _active if other is not recorder)
+        if not _active:
+            _uninstall()
+
+
+def _install() -> None:
+    """Replace each counted method with a version that counts its calls in
+    the counters of every Recorder in <_active>.
+    """
+    for cls, name, counter in _COUNTED:
+        method = cls.__dict__[name]
+        _originals.append((cls, name, method))
+        setattr(cls, name, _counting(method, counter))
+
+    pack = Truck.pack
+    _originals.append((Truck, 'pack', pack))
+
+    def counting_pack(truck: Truck, parcel: Any) -> bool:
+        """Pack <parcel> onto <truck>, counting the attempt, and the failure
+        if it does not fit."""
+        recorders = _active
+        for recorder in recorders:
+            recorder.counters['pack_attempts'] += 1
+        if pack(truck, parcel):
+            return True
+        for recorder in recorders:
+            recorder.counters['pack_failures'] += 1
+        return False
+
+    Truck.pack = counting_pack
+
+
+def _uninstall() -> None:
+    """Put back every method replaced by _install.
+    """
+    for cls, name, method in reversed(_originals):
+        setattr(cls, name, method)
+    _originals.clear()
+
+
+def _counting(method: Callable, counter: str) -> Callable:
+    """Return a version of <method> that adds one to the counter <counter> of
+    each Recorder in <_active> each time it is called.
+
+    A call made from within another call with the same counter in the same
+    thread, such as a BucketPriorityQueue removing from the heap it has
+    fallen back to, is not counted again.
+    """
+    def counted(*args: Any, **kwargs: Any) -> Any:
+        """Count this call and make it."""
+        running = getattr(_running, 'counters', None)
+        if running is None:
+            running = _running.counters = set()
+        if counter in running:
+            return method(*args, **kwargs)
+        for recorder in _active:
+            recorder.counters[counter] += 1
+        running.add(counter)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            running.discard(counter)
+    counted.__doc__ = method.__doc__
+    return counted
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['Recorder.write'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'contextlib', 'json', 'os', 'threading',
+                                   'time', 'container', 'distance_map',
+                                   'domain'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
@@ -0,0 +1,133 @@
+import json
+import pytest
+from container import BucketPriorityQueue, PriorityQueue
+from distance_map import DistanceMap, LazyDistanceMap
+from domain import Parcel, Truck
+from experiment import SchedulingExperiment
+from instrument import Recorder
+
+
+def test_counts_only_inside_phases() -> None:
+    """Test that calls are counted inside a phase, including nested ones,
+    and that the original methods are back once the phases end."""
+    originals = (PriorityQueue.add, Truck.pack, DistanceMap.distance)
+    r = Recorder()
+    truck = Truck(1, 10, 'Toronto')
+    dmap = DistanceMap()
+    with r.phase('outer'):
+        truck.pack(Parcel(1, 8, 'Toronto', 'Guelph'))
+        with r.phase('inner'):
+            truck.pack(Parcel(2, 8, 'Toronto', 'Guelph'))
+            dmap.distance('Toronto', 'Guelph')
+    truck.pack(Parcel(3, 1, 'Toronto', 'Guelph'))
+    assert (PriorityQueue.add, Truck.pack, DistanceMap.distance) == originals
+    assert r.counters['pack_attempts'] == 2
+    assert r.counters['pack_failures'] == 1
+    assert r.counters['distance_lookups'] == 1
+    assert [phase[0] for phase in r.phases] == ['inner', 'outer']
+    assert r.phases[1][2] >= r.phases[0][2]
+
+
+def test_overlapping_recorders() -> None:
+    """Test that recorders whose phases overlap without nesting each count
+    the calls made during their own phases, and that the original methods
+    are back once both end."""
+    original = Truck.pack
+    first, second = Recorder(), Recorder()
+    truck = Truck(1, 10, 'Toronto')
+    first_phase = first.phase('first')
+    first_phase.__enter__()
+    truck.pack(Parcel(1, 1, 'Toronto', 'Guelph'))
+    with second.phase('second'):
+        truck.pack(Parcel(2, 1, 'Toronto', 'Guelph'))
+        first_phase.__exit__(None, None, None)
+        truck.pack(Parcel(3, 1, 'Toronto', 'Guelph'))
+    truck.pack(Parcel(4, 1, 'Toronto', 'Guelph'))
+    assert Truck.pack is original
+    assert first.counters['pack_attempts'] == 2
+    assert second.counters['pack_attempts'] == 2
+
+
+def test_fallen_back_queue_counted_once() -> None:
+    """Test that a BucketPriorityQueue that has fallen back to a heap counts
+    each add and remove once."""
+    r = Recorder()
+    with r.phase('queue'):
+        pq = BucketPriorityQueue(str.lower, ['b', 'a'])
+        pq.add('c')
+        pq.remove()
+    assert r.counters['queue_adds'] == 1
+    assert r.counters['queue_removes'] == 1
+
+
+def test_methods_restored_after_error() -> None:
+    """Test that the original methods are put back when a phase raises."""
+    original = Truck.pack
+    r = Recorder()
+    with pytest.raises(ValueError):
+        with r.phase('failing'):
+            raise ValueError
+    assert Truck.pack is original
+    assert r.metrics()['phases']['failing']['wall'] >= 0
+
+
+def test_experiment_metrics(config: dict, tmp_path) -> None:
+    """Test that an instrumented experiment reports its phases and counts,
+    writes them as Chrome trace events, and gets the same statistics."""
+    expected = SchedulingExperiment(config).run()
+    assert SchedulingExperiment(config).metrics() == {}
+    config['trace_file'] = str(tmp_path / 'trace.json')
+    config['trace_format'] = 'chrome'
+    expt = SchedulingExperiment(config)
+    assert expt.run() == expected
+    metrics = expt.metrics()
+    assert list(metrics['phases']) == ['read', 'schedule', 'compute_stats']
+    assert metrics['counters']['pack_attempts'] > 0
+    assert metrics['counters']['queue_removes'] > 0
+    with open(config['trace_file']) as file:
+        events = json.load(file)['traceEvents']
+    assert [event['name'] for event in events] == \
+        ['read', 'schedule', 'compute_stats', 'counters']
+
+
+def test_lazy_map_counted(config: dict) -> None:
+    """Test that the distance lookups and route lengths of a LazyDistanceMap
+    are counted, and that an experiment counts the same route lengths on one
+    as on a DistanceMap."""
+    r = Recorder()
+    dmap = LazyDistanceMap()
+    dmap.add_distance('Toronto', 'Guelph', 5)
+    with r.phase('lookups'):
+        dmap.distance('Toronto', 'Guelph')
+        dmap.distance_by_id(0, 1)
+        dmap.route_length([0, 1, 0])
+    assert r.counters['distance_lookups'] == 2
+    assert r.counters['route_lengths'] == 1
+
+    config['instrument'] = True
+    expt = SchedulingExperiment(config)
+    expt.run()
+    expected = expt.metrics()['counters']
+    config['lazy_map'] = True
+    expt = SchedulingExperiment(config)
+    expt.run()
+    counters = expt.metrics()['counters']
+    assert counters['route_lengths'] == expected['route_lengths'] > 0
+
+
+def test_json_lines(config: dict, tmp_path) -> None:
+    """Test that the metrics of every batch added are written as JSON
+    lines."""
+    config['trace_file'] = str(tmp_path / 'trace.jsonl')
+    expt = SchedulingExperiment(config)
+    expt.add_parcels([Parcel(100, 1, 'Toronto', 'Hamilton')])
+    expt.add_parcels([Parcel(101, 1, 'Toronto', 'Hamilton')])
+    with open(config['trace_file']) as file:
+        lines = [json.loads(line) for line in file]
+    assert [line.get('phase') for line in lines] == \
+        ['read', 'add_parcels', 'add_parcels', None]
+    assert lines[-1]['counters']['pack_attempts'] >= 2
+
+
+if __name__ == '__main__':
+    pytest.main(['instrument_test.py'])
@@ -0,0 +1,223 @@
+"""Route optimisation.
+
+===== Module Description =====
+
+This module reorders the stops of each truck's route after the parcels have
+been scheduled, so that the trucks travel less.  A route is first rebuilt as
+a nearest-neighbour tour of its stops, then improved by local search with
+2-opt moves, which reverse a stretch of the route, and Or-opt moves, which
+move a run of one to three stops elsewhere in the route.  The search stops
+when no move shortens the route or when the route's time budget runs out.
+
+Distances may differ in each direction, and every move is evaluated by the
+exact change it makes to the length of the route.  A route is only replaced
+if the new route is shorter.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import List, Optional, Tuple
+from distance_map import DistanceMap
+from domain import Truck
+
+# The distance map that routes are optimised against in a worker process,
+# given to each worker once, when it starts.
+_dmap: Optional[DistanceMap] = None
+
+
+def optimize_route(route: List[str], dmap: DistanceMap,
+                   time_budget: float = 0.1) -> List[str]:
+    """Return a route that visits the same cities as <route>, starting at
+    the same depot, and is no longer than <route> according to <dmap>,
+    spending about <time_budget> seconds at most searching for it.
+
+    Each city is visited once.  If <dmap> does not record the distance
+    between some pair of the cities, return a copy of <route>; completing
+    the map with shortest path distances first avoids this.
+
+    Precondition: <route> is not empty, and every city in it is in <dmap>.
+
+    >>> m = DistanceMap()
+    >>> for city1, city2, distance in [('A', 'B', 1), ('A', 'C', 2),
+    ...                                ('A', 'D', 2), ('B', 'C', 2),
+    ...                                ('B', 'D', 2), ('C', 'D', 1)]:
+    ...     m.add_distance(city1, city2, distance)
+    >>> optimize_route(['A', 'C', 'B', 'D'], m)
+    ['A', 'B', 'C', 'D']
+    """
+    depot = route[0]
+    stops = list(dict.fromkeys(city for city in route[1:] if city != depot))
+    cities = [depot] + stops
+    ids = dmap.city_ids(cities)
+    dist = [[0 if id1 == id2 else dmap.distance_by_id(id1, id2)
+             for id2 in ids] for id1 in ids]
+    if any(-1 in row for row in dist):
+        return list(route)
+    # Legs from a city to itself, such as a return to the depot in the
+    # middle of a route, have length 0 even if the map does not record it.
+    position = {city: i for i, city in enumerate(cities)}
+    visits = [position[city] for city in route] + [0]
+    original = sum(dist[a][b] for a, b in zip(visits, visits[1:]))
+
+    deadline = perf_counter() + time_budget
+    tour = _nearest_neighbour(dist)
+    while perf_counter() < deadline:
+        improved = _two_opt(dist, tour, deadline)
+        improved = _or_opt(dist, tour, deadline) or improved
+        if not improved:
+            break
+    if _tour_length(dist, tour) >= original:
+        return list(route)
+    return [cities[i] for i in tour]
+
+
+def optimize_routes(trucks: List[Truck], dmap: DistanceMap,
+                    time_budget: float = 0.1, workers: int = 1) -> None:
+    """Replace the route of each truck in <trucks> with a route no longer
+    than it according to <dmap>, spending about <time_budget> seconds at
+    most on each truck.
+
+    The routes are optimised across <workers> processes, or in this process
+    if <workers> is 1.
+
+    Precondition: every city on the route of a truck in <trucks> is in
+    <dmap>.
+    """
+    tasks = [(truck.route, time_budget) for truck in trucks
+             if len(truck.route) > 2]
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_set_map,
+                                 initargs=(dmap,)) as executor:
+            chunksize = max(len(tasks) // (4 * workers), 1)
+            routes = list(executor.map(_optimize_task, tasks,
+                                       chunksize=chunksize))
+    else:
+        routes = [optimize_route(route, dmap, budget)
+                  for route, budget in tasks]
+    routes.reverse()
+    for truck in trucks:
+        if len(truck.route) > 2:
+            truck.set_route(routes.pop())
+
+
+def _set_map(dmap: DistanceMap) -> None:
+    """Make <dmap> the distance map that routes are optimised against in
+    this process.
+    """
+    global _dmap
+    _dmap = dmap
+
+
+def _optimize_task(task: Tuple[List[str], float]) -> List[str]:
+    """Return the optimised route for <task>, a route and its time budget,
+    against the distance map of this process.
+    """
+    route, time_budget = task
+    return optimize_route(route, _dmap, time_budget)
+
+
+def _tour_length(dist: List[List[int]], tour: List[int]) -> int:
+    """Return the length of <tour>, including the return to its start,
+    where <dist>[i][j] is the distance from stop i to stop j.
+    """
+    return sum(dist[tour[i - 1]][tour[i]] for i in range(len(tour)))
+
+
+def _nearest_neighbour(dist: List[List[int]]) -> List[int]:
+    """Return a tour of every stop in <dist>, starting at stop 0, that goes
+    next to the nearest stop not yet visited each time.  Ties go to the
+    lower stop.
+
+    >>> _nearest_neighbour([[0, 5, 1], [5, 0, 2], [1, 2, 0]])
+    [0, 2, 1]
+    """
+    unvisited = set(range(1, len(dist)))
+    tour = [0]
+    while unvisited:
+        row = dist[tour[-1]]
+        nearest = min(unvisited, key=lambda stop: (row[stop], stop))
+        unvisited.remove(nearest)
+        tour.append(nearest)
+    return tour
+
+
+def _two_opt(dist: List[List[int]], tour: List[int], deadline: float) -> bool:
+    """Shorten <tour> by reversing stretches of it until no reversal helps
+    or <deadline> passes, and return True iff <tour> was changed.
+
+    The first stop of <tour> stays first.
+    """
+    n = len(tour)
+    changed = False
+    improved = True
+    while improved and perf_counter() < deadline:
+        improved = False
+        for i in range(n - 2):
+            a, b = tour[i], tour[i + 1]
+            # The change in length from reversing the edges inside the
+            # stretch tour[i + 1:j + 1], which is only non-zero when the
+            # distances differ in each direction.
+            inside = 0
+            for j in range(i + 2, n):
+                c, e = tour[j], tour[(j + 1) % n]
+                inside += dist[c][tour[j - 1]] - dist[tour[j - 1]][c]
+                delta = (dist[a][c] + dist[b][e] - dist[a][b] - dist[c][e]
+                         + inside)
+                if delta < 0:
+                    tour[i + 1:j + 1] = tour[j:i:-1]
+                    changed = improved = True
+                    break
+            if improved:
+                break
+    return changed
+
+
+def _or_opt(dist: List[List[int]], tour: List[int], deadline: float) -> bool:
+    """Shorten <tour> by moving runs of one to three consecutive stops to
+    another place in it until no such move helps or <deadline> passes, and
+    return True iff <tour> was changed.
+
+    The first stop of <tour> stays first.
+    """
+    n = len(tour)
+    changed = False
+    improved = True
+    while improved and perf_counter() < deadline:
+        improved = False
+        for length in range(1, min(3, n - 2) + 1):
+            for i in range(1, n - length + 1):
+                first, last = tour[i], tour[i + length - 1]
+                before, after = tour[i - 1], tour[(i + length) % n]
+                saved = (dist[before][first] + dist[last][after]
+                         - dist[before][after])
+                rest = tour[:i] + tour[i + length:]
+                best, best_at = 0, -1
+                for k in range(len(rest)):
+                    x, y = rest[k], rest[(k + 1) % len(rest)]
+                    if x == before:
+                        continue
+                    gain = saved - (dist[x][first] + dist[last][y]
+                                    - dist[x][y])
+                    if gain > best:
+                        best, best_at = gain, k
+                if best_at >= 0:
+                    tour[:] = (rest[:best_at + 1] + tour[i:i + length]
+                               + rest[best_at + 1:])
+                    changed = improved = True
+                    break
+            if improved:
+                break
+    return changed
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing', 'time',
+                                   'concurrent.futures', 'distance_map',
+                                   'domain'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
@@ -0,0 +1,81 @@
+import itertools
+import random
+import pytest
+from distance_map import DistanceMap
+from domain import Parcel, Truck
+from routing import optimize_route, optimize_routes
+
+
+def _length(dmap: DistanceMap, route: list) -> int:
+    """Return the length of <route> in <dmap>, including the return to its
+    start."""
+    return dmap.route_length(dmap.city_ids(route + route[:1]))
+
+
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_never_longer_and_same_stops(symmetric: bool) -> None:
+    """Test that optimised routes visit the same stops from the same depot,
+    are never longer, and are usually as short as the best route."""
+    rng = random.Random(148)
+    optimal = 0
+    for _ in range(100):
+        cities = [f'City{i}' for i in range(rng.randint(2, 7))]
+        dmap = DistanceMap()
+        for city1, city2 in itertools.combinations(cities, 2):
+            dmap.add_distance(city1, city2, rng.randint(1, 50),
+                              None if symmetric else rng.randint(1, 50))
+        route = cities[:1] + rng.sample(cities[1:], len(cities) - 1)
+        result = optimize_route(route, dmap)
+        assert result[0] == route[0]
+        assert sorted(result) == sorted(route)
+        assert _length(dmap, result) <= _length(dmap, route)
+        best = min(_length(dmap, cities[:1] + list(stops))
+                   for stops in itertools.permutations(cities[1:]))
+        optimal += _length(dmap, result) == best
+    assert optimal >= 80
+
+
+def test_missing_distance_leaves_route() -> None:
+    """Test that a route is left as it is if a distance between two of its
+    stops is not in the map."""
+    dmap = DistanceMap()
+    dmap.add_distance('York', 'London', 5)
+    dmap.add_distance('London', 'Guelph', 5)
+    dmap.add_distance('Guelph', 'York', 5)
+    dmap.add_distance('York', 'Hamilton', 1)
+    route = ['York', 'London', 'Guelph', 'Hamilton']
+    assert optimize_route(route, dmap) == route
+
+
+def test_return_to_depot_counts_as_zero() -> None:
+    """Test that a route that ends back at its depot is measured with the
+    leg from the depot to itself as 0, even though the map does not record
+    it, so that a shorter route is found."""
+    dmap = DistanceMap()
+    for city1, city2, distance in [('T', 'A', 5), ('T', 'B', 5),
+                                   ('A', 'B', 9)]:
+        dmap.add_distance(city1, city2, distance)
+    route = optimize_route(['T', 'A', 'T', 'B', 'T'], dmap)
+    assert route in (['T', 'A', 'B'], ['T', 'B', 'A'])
+
+
+def test_optimize_routes_sets_truck_routes() -> None:
+    """Test that the routes of trucks with at least two stops are replaced
+    by shorter ones."""
+    dmap = DistanceMap()
+    for city1, city2, distance in [('York', 'A', 1), ('York', 'B', 10),
+                                   ('York', 'C', 10), ('A', 'B', 10),
+                                   ('A', 'C', 1), ('B', 'C', 1)]:
+        dmap.add_distance(city1, city2, distance)
+    trucks = [Truck(1, 10, 'York'), Truck(2, 10, 'York')]
+    for i, city in enumerate(['B', 'A', 'C']):
+        trucks[0].pack(Parcel(i, 1, 'York', city))
+    trucks[1].pack(Parcel(3, 1, 'York', 'B'))
+    optimize_routes(trucks, dmap)
+    assert trucks[0].route in [['York', 'A', 'C', 'B'],
+                               ['York', 'B', 'C', 'A']]
+    assert trucks[1].route == ['York', 'B']
+
+
+if __name__ == '__main__':
+    pytest.main(['routing_test.py'])
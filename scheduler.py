@@ -0,0 +1,1017 @@
+"""Scheduling algorithms.
+
+===== Module Description =====
+
+This module contains the abstract Scheduler class, as well as the two
+subclasses RandomScheduler and GreedyScheduler, which implement the two
+scheduling algorithms described in the handout, BinPackingScheduler,
+which packs parcels by best fit or first fit, and ImprovementScheduler,
+which improves the schedule made by another scheduler by local search.
+"""
+from math import exp
+from time import perf_counter
+from typing import Any, Iterable, List, Dict, Optional, Sequence, Tuple, \
+    Union
+from random import Random, shuffle, choice
+from container import BucketPriorityQueue, CapacityIndex, FirstFitIndex
+from distance_map import DistanceMap
+from domain import Parcel, ParcelTable, Truck
+
+
+class Scheduler:
+    """A scheduler, capable of deciding what parcels go onto which trucks, and
+    what route each truck will take.
+
+    This is an abstract class.  Only child classes should be instantiated.
+    """
+
+    def schedule(self, parcels: Union[List[Parcel], ParcelTable],
+                 trucks: List[Truck], verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks>, that is, decide
+        which parcels will go on which trucks, as well as the route each truck
+        will take.
+
+        <parcels> may be a list of Parcel objects or a ParcelTable.
+
+        Mutate the Truck objects in <trucks> so that they store information
+        about which parcel objects they will deliver and what route they will
+        take.  Do *not* mutate the list <parcels>, or any of the parcel objects
+        in that list.
+
+        Return a list containing the parcels that did not get scheduled onto any
+        truck, due to lack of capacity.
+
+        If <verbose> is True, print step-by-step details regarding
+        the scheduling algorithm as it runs.  This is *only* for debugging
+        purposes for your benefit, so the content and format of this
+        information is your choice; we will not test your code with <verbose>
+        set to True.
+        """
+        raise NotImplementedError
+
+    def schedule_stream(self, batches: Iterable[List[Parcel]],
+                        trucks: List[Truck],
+                        verbose: bool = False) -> List[Parcel]:
+        """Schedule the parcels in <batches> onto the given <trucks>, reading
+        one batch at a time, and return the parcels that did not get scheduled
+        onto any truck.
+
+        Only a bounded number of parcels that have not yet been packed are
+        held at once, so that the parcels can come from a stream that does not
+        fit in memory.  By default, each batch is scheduled on its own, after
+        the batches before it.
+
+        See Scheduler.schedule for the meaning of <verbose>.
+        """
+        unscheduled = []
+        for batch in batches:
+            unscheduled.extend(self.schedule(batch, trucks, verbose))
+        return unscheduled
+
+
+class RandomScheduler(Scheduler):
+    """A scheduler that packs the parcels in a random order, putting each one
+    on a randomly chosen truck that has enough space for it.
+
+    === Private Attributes ===
+    _random:
+      The source of random numbers, seeded so that schedules can be
+      reproduced, or None to use the random module's shared generator.
+    """
+    _random: Optional[Random]
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        """Initialize a RandomScheduler whose random choices are made from
+        the seed <seed>, or from the random module's shared generator if
+        <seed> is None.
+
+        >>> parcels = [Parcel(i, 1, 'York', 'London') for i in range(10)]
+        >>> schedules = []
+        >>> for _ in range(2):
+        ...     trucks = [Truck(t, 5, 'York') for t in range(3)]
+        ...     _ = RandomScheduler(148).schedule(parcels, trucks)
+        ...     schedules.append([len(t.parcels) for t in trucks])
+        >>> schedules[0] == schedules[1]
+        True
+        """
+        self._random = None if seed is None else Random(seed)
+
+    def schedule(self, parcels: Union[List[Parcel], ParcelTable],
+                 trucks: List[Truck], verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks> at random, and
+        return the parcels that did not fit on any truck.
+
+        See Scheduler.schedule for the full specification.
+        """
+        rng = self._random
+        order = list(range(len(parcels)))
+        if rng is None:
+            shuffle(order)
+        else:
+            rng.shuffle(order)
+        unscheduled = []
+        for i in order:
+            parcel = parcels[i]
+            candidates = [truck for truck in trucks
+                          if truck.available_space() >= parcel.volume]
+            if not candidates:
+                unscheduled.append(parcel)
+                if verbose:
+                    print(f'Parcel {parcel.id} does not fit on any truck')
+                continue
+            if rng is None:
+                truck = choice(candidates)
+            else:
+                truck = rng.choice(candidates)
+            truck.pack(parcel)
+            if verbose:
+                print(f'Parcel {parcel.id} packed onto truck {truck.id}')
+        return unscheduled
+
+
+class _TruckIndex:
+    """An index of a list of trucks by their available space, both all
+    together and grouped by the city each truck's route currently ends at.
+
+    Trucks are identified by their position in the list.
+
+    === Public Attributes ===
+    trucks:
+      The trucks in this index.
+
+    === Private Attributes ===
+    _spaces:
+      The available space of each truck, as of the last time it was indexed.
+    _ends:
+      The city each truck's route ended at, as of the last time it was
+      indexed.
+    _all:
+      An index of every truck by its available space.
+    _by_end:
+      Maps each city to an index of the trucks whose routes end there.
+    _limit:
+      The largest capacity of any truck.
+
+    === Representation Invariants ===
+    - no index in <_by_end> is empty.
+    """
+    trucks: List[Truck]
+    _spaces: List[int]
+    _ends: List[str]
+    _all: CapacityIndex
+    _by_end: Dict[str, CapacityIndex]
+    _limit: int
+
+    def __init__(self, trucks: List[Truck]) -> None:
+        """Initialize an index of <trucks>.
+        """
+        self.trucks = trucks
+        self._spaces = [truck.available_space() for truck in trucks]
+        self._ends = [truck.route[-1] for truck in trucks]
+        self._limit = max((truck.capacity for truck in trucks), default=0)
+        self._all = CapacityIndex(self._limit)
+        self._by_end = {}
+        for slot, space in enumerate(self._spaces):
+            self._all.add(slot, space)
+            self._end_index(self._ends[slot]).add(slot, space)
+
+    def find(self, volume: int, destination: Optional[str],
+             smallest: bool) -> Optional[int]:
+        """Return the position of the truck with the least available space
+        that <volume> fits in if <smallest> is True, or else the truck with
+        the most available space if <volume> fits in it.  Among trucks that
+        tie, return the earliest.
+
+        If <destination> is given, prefer the trucks whose routes end at
+        <destination>, if <volume> fits on any of them.
+
+        Return None if <volume> does not fit on any truck.
+
+        >>> trucks = [Truck(1, 20, 'York'), Truck(2, 30, 'York')]
+        >>> _ = trucks[0].pack(Parcel(1, 5, 'York', 'London'))
+        >>> index = _TruckIndex(trucks)
+        >>> index.find(10, 'London', False)
+        0
+        >>> index.find(10, 'Toronto', False)
+        1
+        >>> index.find(20, 'London', True)
+        1
+        """
+        if destination is not None and destination in self._by_end:
+            slot = self._find_in(self._by_end[destination], volume, smallest)
+            if slot is not None:
+                return slot
+        return self._find_in(self._all, volume, smallest)
+
+    def update(self, slot: int) -> None:
+        """Re-index the truck at position <slot>, whose available space or
+        route has changed.
+        """
+        truck = self.trucks[slot]
+        space = self._spaces[slot]
+        end = self._ends[slot]
+        self._all.discard(slot, space)
+        self._by_end[end].discard(slot, space)
+        if not self._by_end[end]:
+            del self._by_end[end]
+        space = self._spaces[slot] = truck.available_space()
+        end = self._ends[slot] = truck.route[-1]
+        self._all.add(slot, space)
+        self._end_index(end).add(slot, space)
+
+    def _end_index(self, city: str) -> CapacityIndex:
+        """Return the index of trucks whose routes end at <city>, making it
+        if there is none.
+        """
+        index = self._by_end.get(city)
+        if index is None:
+            index = self._by_end[city] = CapacityIndex(self._limit)
+        return index
+
+    def _find_in(self, index: CapacityIndex, volume: int,
+                 smallest: bool) -> Optional[int]:
+        """Return the position of the truck in <index> with the least
+        available space that <volume> fits in if <smallest> is True, or else
+        the one with the most available space if <volume> fits in it, or None.
+        """
+        if smallest:
+            return index.smallest_fitting(volume)
+        slot = index.largest()
+        if slot is None or self._spaces[slot] < volume:
+            return None
+        return slot
+
+
+class GreedyScheduler(Scheduler):
+    """A scheduler that packs the parcels one at a time, in priority order,
+    each onto the best truck for it at that moment.
+
+    Parcels are ordered by volume or by destination, in non-decreasing or
+    non-increasing order.  Parcels that tie are packed in the order given.
+    Each parcel goes on the truck with the least (for 'non-decreasing') or
+    most (for 'non-increasing') available space among the trucks it fits on.
+    When ordering by destination, trucks whose route already ends at the
+    parcel's destination are preferred.  Trucks that tie are chosen in the
+    order given.
+
+    Parcels are ordered through a BucketPriorityQueue of parcel indices with
+    a precomputed sort key.  Volumes and destination ranks are small
+    integers, so each parcel is queued and dequeued in constant time, rather
+    than compared against others in a heap.  When the parcels are given as a
+    ParcelTable, the keys are read straight from its columns.  When
+    scheduling a stream by destination, the keys are not integers, and the
+    queue falls back to a heap.
+
+    When scheduling a stream of parcels, the scheduler only looks ahead a
+    bounded number of parcels: it holds a window of that many parcels and
+    packs the one of highest priority each time another parcel arrives.
+
+    If configured to use a truck index, the scheduler finds each parcel's
+    truck through a _TruckIndex, which orders the trucks by available space,
+    both all together and grouped by the city each truck's route ends at.
+    Finding a truck and re-indexing it once a parcel is packed then take
+    O(log C + log n) amortised time, where C is the largest truck capacity
+    and n is the number of trucks, even when many trucks have the same
+    available space, instead of a scan of every truck and its route.  The
+    parcels go on the same trucks either way.
+
+    === Private Attributes ===
+    _parcel_priority:
+      The parcel attribute parcels are ordered by.
+    _parcel_order:
+      The order parcels are packed in.
+    _truck_order:
+      The order that trucks are preferred in, by available space.
+    _lookahead:
+      The number of parcels held in the window when scheduling a stream.
+    _reversed_keys:
+      Maps each destination seen while scheduling a stream in
+      non-increasing destination order to its sort key.
+    _truck_index:
+      True if trucks are found through a _TruckIndex rather than a scan.
+
+    === Representation Invariants ===
+    - _parcel_priority is 'volume' or 'destination'
+    - _parcel_order and _truck_order are each 'non-decreasing' or
+      'non-increasing'
+    - _lookahead >= 1
+    """
+    _parcel_priority: str
+    _parcel_order: str
+    _truck_order: str
+    _lookahead: int
+    _reversed_keys: Dict[str, Tuple[int, ...]]
+    _truck_index: bool
+
+    def __init__(self, config: Dict[str, Union[str, bool]]) -> None:
+        """Initialize a GreedyScheduler configured by the 'parcel_priority',
+        'parcel_order' and 'truck_order' keys of <config>, and by its optional
+        'lookahead' key, the size of the window used on streams, and
+        'truck_index' key, which is True to find trucks through an index.
+
+        Precondition: <config> contains keys and values as specified in
+        Assignment 1.
+        """
+        self._parcel_priority = config['parcel_priority']
+        self._parcel_order = config['parcel_order']
+        self._truck_order = config['truck_order']
+        self._lookahead = max(int(config.get('lookahead', 10000)), 1)
+        self._reversed_keys = {}
+        self._truck_index = bool(config.get('truck_index', False))
+
+    def _parcel_keys(self, parcels: Union[List[Parcel], ParcelTable]) \
+            -> Sequence[int]:
+        """Return the sort key of each parcel in <parcels>, in order, such
+        that parcels with smaller keys are packed first.
+
+        >>> config = {'parcel_priority': 'destination',
+        ...           'parcel_order': 'non-increasing',
+        ...           'truck_order': 'non-increasing'}
+        >>> parcels = [Parcel(1, 5, 'York', 'London'),
+        ...            Parcel(2, 5, 'York', 'Toronto'),
+        ...            Parcel(3, 5, 'York', 'London')]
+        >>> GreedyScheduler(config)._parcel_keys(parcels)
+        [0, -1, 0]
+        """
+        increasing = self._parcel_order == 'non-decreasing'
+        if self._parcel_priority == 'volume':
+            if isinstance(parcels, ParcelTable):
+                volumes = parcels.volumes
+            else:
+                volumes = [parcel.volume for parcel in parcels]
+            if increasing:
+                return volumes
+            return [-volume for volume in volumes]
+        # Destinations are ranked alphabetically so that they can be compared
+        # as integers, and negated for non-increasing order.
+        if isinstance(parcels, ParcelTable):
+            cities = parcels.cities
+            codes = parcels.destinations
+        else:
+            cities = list({parcel.destination: None for parcel in parcels})
+            code_of = {city: code for code, city in enumerate(cities)}
+            codes = [code_of[parcel.destination] for parcel in parcels]
+        sign = 1 if increasing else -1
+        rank = [0] * len(cities)
+        for i, code in enumerate(sorted(range(len(cities)),
+                                        key=cities.__getitem__)):
+            rank[code] = sign * i
+        return [rank[code] for code in codes]
+
+    def _stream_key(self, parcel: Parcel) -> Any:
+        """Return the sort key of <parcel> when scheduling a stream, where
+        not all destinations are known in advance.
+
+        >>> config = {'parcel_priority': 'destination',
+        ...           'parcel_order': 'non-increasing',
+        ...           'truck_order': 'non-increasing'}
+        >>> scheduler = GreedyScheduler(config)
+        >>> keys = [scheduler._stream_key(Parcel(1, 5, 'York', city))
+        ...         for city in ['Lon', 'London', 'Toronto']]
+        >>> sorted(range(3), key=keys.__getitem__)
+        [2, 1, 0]
+        """
+        if self._parcel_priority == 'volume':
+            if self._parcel_order == 'non-decreasing':
+                return parcel.volume
+            return -parcel.volume
+        if self._parcel_order == 'non-decreasing':
+            return parcel.destination
+        # Negated code points order names in reverse, and the final 1 puts
+        # a name after every longer name that starts with it.
+        key = self._reversed_keys.get(parcel.destination)
+        if key is None:
+            key = tuple(-ord(char) for char in parcel.destination) + (1,)
+            self._reversed_keys[parcel.destination] = key
+        return key
+
+    def _choose_truck(self, parcel: Parcel,
+                      trucks: List[Truck]) -> Optional[Truck]:
+        """Return the truck in <trucks> that <parcel> should be packed onto,
+        or None if it does not fit on any of them.
+        """
+        candidates = [truck for truck in trucks
+                      if truck.available_space() >= parcel.volume]
+        if self._parcel_priority == 'destination':
+            same_destination = [truck for truck in candidates
+                                if truck.route[-1] == parcel.destination]
+            if same_destination:
+                candidates = same_destination
+        if not candidates:
+            return None
+        if self._truck_order == 'non-decreasing':
+            return min(candidates, key=Truck.available_space)
+        return max(candidates, key=Truck.available_space)
+
+    def schedule(self, parcels: Union[List[Parcel], ParcelTable],
+                 trucks: List[Truck], verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks> greedily, and
+        return the parcels that did not fit on any truck, in the order they
+        were considered.
+
+        See Scheduler.schedule for the full specification.
+        """
+        keys = self._parcel_keys(parcels)
+        queue = BucketPriorityQueue(keys.__getitem__, range(len(parcels)))
+        index = _TruckIndex(trucks) if self._truck_index else None
+        unscheduled = []
+        while not queue.is_empty():
+            self._place(parcels[queue.remove()], trucks, unscheduled, verbose,
+                        index)
+        return unscheduled
+
+    def schedule_stream(self, batches: Iterable[List[Parcel]],
+                        trucks: List[Truck],
+                        verbose: bool = False) -> List[Parcel]:
+        """Schedule the parcels in <batches> onto the given <trucks> greedily,
+        looking ahead at most <_lookahead> parcels, and return the parcels
+        that did not fit on any truck, in the order they were considered.
+
+        If the stream holds no more than <_lookahead> parcels, the result is
+        the same as that of scheduling them all at once.
+
+        See Scheduler.schedule_stream for the full specification.
+        """
+        queue = BucketPriorityQueue(self._stream_key)
+        index = _TruckIndex(trucks) if self._truck_index else None
+        unscheduled = []
+        for batch in batches:
+            for parcel in batch:
+                queue.add(parcel)
+                if len(queue) > self._lookahead:
+                    self._place(queue.remove(), trucks, unscheduled, verbose,
+                                index)
+        while not queue.is_empty():
+            self._place(queue.remove(), trucks, unscheduled, verbose, index)
+        return unscheduled
+
+    def _place(self, parcel: Parcel, trucks: List[Truck],
+               unscheduled: List[Parcel], verbose: bool,
+               index: Optional[_TruckIndex] = None) -> None:
+        """Pack <parcel> onto the best truck for it in <trucks>, or append it
+        to <unscheduled> if it does not fit on any of them.
+
+        If <index> is given, it indexes <trucks>, and is used to find the
+        truck and kept up to date.
+        """
+        if index is None:
+            truck = self._choose_truck(parcel, trucks)
+        else:
+            destination = None
+            if self._parcel_priority == 'destination':
+                destination = parcel.destination
+            slot = index.find(parcel.volume, destination,
+                              self._truck_order == 'non-decreasing')
+            truck = None if slot is None else trucks[slot]
+        if truck is None:
+            unscheduled.append(parcel)
+            if verbose:
+                print(f'Parcel {parcel.id} does not fit on any truck')
+            return
+        truck.pack(parcel)
+        if index is not None:
+            index.update(slot)
+        if verbose:
+            print(f'Parcel {parcel.id} packed onto truck {truck.id}')
+
+
+class BinPackingScheduler(Scheduler):
+    """A scheduler that packs the parcels in non-increasing volume order, each
+    onto the best-fitting or first-fitting truck for it.
+
+    With the 'best-fit' algorithm, each parcel goes on the truck with the
+    least available space among the trucks it fits on, as GreedyScheduler
+    does when it orders parcels by non-increasing volume and trucks by
+    non-decreasing available space.  With the 'first-fit' algorithm, each
+    parcel goes on the first truck in the list that it fits on.  Either way,
+    parcels with the same volume are packed in the order given, and trucks
+    that tie are chosen in the order given.
+
+    Trucks are found through an index of their available space, so that each
+    parcel takes O(log C + log n) amortised time to place for best fit,
+    where C is the largest truck capacity and n is the number of trucks, and
+    O(log n) time for first fit, rather than a scan of every truck.
+
+    === Private Attributes ===
+    _first_fit:
+      True if each parcel goes on the first truck it fits on, and False if it
+      goes on the truck with the least space it fits in.
+    """
+    _first_fit: bool
+
+    def __init__(self, config: Dict[str, Union[str, bool]]) -> None:
+        """Initialize a BinPackingScheduler for the 'best-fit' or 'first-fit'
+        algorithm named by the 'algorithm' key of <config>.
+
+        Precondition: config['algorithm'] is 'best-fit' or 'first-fit'.
+        """
+        self._first_fit = config['algorithm'] == 'first-fit'
+
+    def schedule(self, parcels: Union[List[Parcel], ParcelTable],
+                 trucks: List[Truck], verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks> by best fit or
+        first fit, and return the parcels that did not fit on any truck, in
+        the order they were considered.
+
+        See Scheduler.schedule for the full specification.
+        """
+        if isinstance(parcels, ParcelTable):
+            volumes = parcels.volumes
+        else:
+            volumes = [parcel.volume for parcel in parcels]
+        # Sorting is stable, even in reverse, so parcels with the same volume
+        # keep their order.
+        order = sorted(range(len(parcels)), key=volumes.__getitem__,
+                       reverse=True)
+        spaces = [truck.available_space() for truck in trucks]
+        if self._first_fit:
+            index = FirstFitIndex(spaces)
+            find = index.first_fitting
+        else:
+            index = CapacityIndex(max(spaces, default=0))
+            for slot, space in enumerate(spaces):
+                index.add(slot, space)
+            find = index.smallest_fitting
+        unscheduled = []
+        for i in order:
+            parcel = parcels[i]
+            slot = find(parcel.volume)
+            if slot is None:
+                unscheduled.append(parcel)
+                if verbose:
+                    print(f'Parcel {parcel.id} does not fit on any truck')
+                continue
+            truck = trucks[slot]
+            truck.pack(parcel)
+            space = truck.available_space()
+            if self._first_fit:
+                index.update(slot, space)
+            else:
+                index.discard(slot, spaces[slot])
+                index.add(slot, space)
+            spaces[slot] = space
+            if verbose:
+                print(f'Parcel {parcel.id} packed onto truck {truck.id}')
+        return unscheduled
+
+
+class ImprovementScheduler(Scheduler):
+    """A scheduler that improves on the schedule made by another scheduler,
+    by moving parcels between trucks.
+
+    After the other scheduler has run, the parcels are rearranged by local
+    search.  Each step tries one move:
+    - insert: pack an unscheduled parcel onto a truck with room for it.
+    - make room: move a parcel to another truck, so that an unscheduled
+      parcel fits where it was, and pack the unscheduled parcel there.
+    - relocate: move a parcel to another truck.
+    - swap: exchange two parcels on different trucks.
+
+    Insert and make room moves reduce the number of unscheduled parcels, and
+    are always made.  Relocate and swap moves are made if they do not
+    increase the average distance travelled by the non-empty trucks, or, if
+    a starting temperature is configured, with the probability given by
+    simulated annealing.  The temperature falls linearly to zero over the
+    iterations, and the best schedule found is kept.
+
+    Here, each truck's route visits each of its destinations once, in the
+    order they were first added, and a parcel moved onto a truck adds its
+    destination to the end of the route if it is not already on it.  Each
+    move is evaluated from the change it makes to the space and route length
+    of the two trucks involved, in O(route length) time.
+
+    === Private Attributes ===
+    _base:
+      The scheduler whose schedule is improved.
+    _dmap:
+      The distances that route lengths are computed from.
+    _iterations:
+      The largest number of moves tried.
+    _time_budget:
+      The most time, in seconds, spent trying moves.
+    _temperature:
+      The starting temperature of simulated annealing, or 0 to only make
+      moves that do not make the schedule worse.
+    _random:
+      The source of random numbers used to choose moves.
+
+    === Representation Invariants ===
+    - _iterations >= 0
+    - _temperature >= 0
+    """
+    _base: Scheduler
+    _dmap: DistanceMap
+    _iterations: int
+    _time_budget: float
+    _temperature: float
+    _random: Random
+
+    def __init__(self, base: Scheduler, dmap: DistanceMap,
+                 config: Dict[str, Union[str, bool]]) -> None:
+        """Initialize an ImprovementScheduler that improves the schedules
+        made by <base>, with route lengths computed from <dmap>.
+
+        It is configured by the optional 'improve_iterations',
+        'improve_time_budget', 'improve_temperature' and 'improve_seed' keys
+        of <config>.
+        """
+        self._base = base
+        self._dmap = dmap
+        self._iterations = max(int(config.get('improve_iterations', 100000)),
+                               0)
+        self._time_budget = float(config.get('improve_time_budget', 1.0))
+        self._temperature = max(float(config.get('improve_temperature', 0)),
+                                0.0)
+        self._random = Random(config.get('improve_seed'))
+
+    def schedule(self, parcels: Union[List[Parcel], ParcelTable],
+                 trucks: List[Truck], verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks> with the base
+        scheduler, improve the schedule, and return the parcels that did not
+        fit on any truck.
+
+        Every parcel on <trucks>, including any packed before this call, may
+        be moved.
+
+        Precondition: the distance map of this scheduler records the distance
+        between every two cities that the trucks may visit.
+
+        See Scheduler.schedule for the full specification.
+        """
+        unscheduled = self._base.schedule(parcels, trucks, verbose)
+        return self._improve(trucks, unscheduled, verbose)
+
+    def schedule_stream(self, batches: Iterable[List[Parcel]],
+                        trucks: List[Truck],
+                        verbose: bool = False) -> List[Parcel]:
+        """Schedule the parcels in <batches> onto the given <trucks> with the
+        base scheduler, improve the schedule once the stream ends, and return
+        the parcels that did not fit on any truck.
+
+        See Scheduler.schedule_stream for the full specification.
+        """
+        unscheduled = self._base.schedule_stream(batches, trucks, verbose)
+        return self._improve(trucks, unscheduled, verbose)
+
+    def _improve(self, trucks: List[Truck], unscheduled: List[Parcel],
+                 verbose: bool) -> List[Parcel]:
+        """Improve the schedule of the parcels on <trucks> and the parcels in
+        <unscheduled> by local search, update <trucks> to match, and return
+        the parcels that are still unscheduled, in their order in
+        <unscheduled>.
+        """
+        search = _LocalSearch(trucks, unscheduled, self._dmap)
+        start = search.objective()
+        best = start
+        snapshot = search.snapshot()
+        deadline = perf_counter() + self._time_budget
+        rng = self._random
+        for i in range(self._iterations):
+            if not i & 255 and perf_counter() >= deadline:
+                break
+            temperature = self._temperature * (1 - i / self._iterations)
+            if search.waiting and rng.random() < 0.5:
+                search.try_insert(rng)
+            elif rng.random() < 0.5:
+                search.try_relocate(rng, temperature)
+            else:
+                search.try_swap(rng, temperature)
+            if self._temperature and search.objective() < best:
+                best = search.objective()
+                snapshot = search.snapshot()
+        if search.objective() > best:
+            search.restore(snapshot)
+        if verbose:
+            print(f'Improved (unscheduled, average distance) from {start} '
+                  f'to {search.objective()}')
+        return search.write_back()
+
+
+class _LocalSearch:
+    """The state of a local search over the parcels on a list of trucks and a
+    list of unscheduled parcels, in which parcels are identified by index.
+
+    === Public Attributes ===
+    waiting:
+      The unscheduled parcels, in no particular order.
+
+    === Private Attributes ===
+    _trucks:
+      The trucks being packed.
+    _dmap:
+      The distances that route lengths are computed from.
+    _parcels:
+      Every parcel, those on trucks first, then those unscheduled in order.
+    _volumes:
+      The volume of each parcel.
+    _destinations:
+      The id of the destination city of each parcel.
+    _depots:
+      The id of the depot of each truck.
+    _truck_of:
+      The index of the truck each parcel is on, or -1 if it is unscheduled.
+    _loads:
+      The parcels on each truck, in no particular order.
+    _positions:
+      The index of each scheduled parcel in its truck's list in <_loads>.
+    _spaces:
+      The available space of each truck.
+    _stops:
+      The ids of the cities each truck's route visits after its depot.
+    _counts:
+      Maps the id of each city on each truck's route to the number of the
+      truck's parcels going there.
+    _lengths:
+      The length of each truck's route, including the return to its depot.
+    _total:
+      The total length of every truck's route.
+    _nonempty:
+      The number of trucks with at least one parcel.
+    """
+    waiting: List[int]
+    _trucks: List[Truck]
+    _dmap: DistanceMap
+    _parcels: List[Parcel]
+    _volumes: List[int]
+    _destinations: List[int]
+    _depots: List[int]
+    _truck_of: List[int]
+    _loads: List[List[int]]
+    _positions: List[int]
+    _spaces: List[int]
+    _stops: List[List[int]]
+    _counts: List[Dict[int, int]]
+    _lengths: List[int]
+    _total: int
+    _nonempty: int
+
+    def __init__(self, trucks: List[Truck], unscheduled: List[Parcel],
+                 dmap: DistanceMap) -> None:
+        """Initialize a search starting from the parcels packed on <trucks>
+        and the parcels in <unscheduled>.
+        """
+        self._trucks = trucks
+        self._dmap = dmap
+        self._parcels = [parcel for truck in trucks
+                         for parcel in truck.parcels] + list(unscheduled)
+        self._volumes = [parcel.volume for parcel in self._parcels]
+        self._destinations = dmap.city_ids(parcel.destination
+                                           for parcel in self._parcels)
+        self._depots = dmap.city_ids(truck.route[0] for truck in trucks)
+        assignment = []
+        stops = []
+        for t, truck in enumerate(trucks):
+            assignment.extend([t] * len(truck.parcels))
+            route = dmap.city_ids(truck.route[1:])
+            stops.append(list(dict.fromkeys(route)))
+        assignment.extend([-1] * len(unscheduled))
+        self.restore((assignment, stops))
+
+    def objective(self) -> Tuple[int, float]:
+        """Return the number of unscheduled parcels and the average route
+        length of the non-empty trucks, which are to be minimised in that
+        order.
+        """
+        if not self._nonempty:
+            return len(self.waiting), 0.0
+        return len(self.waiting), self._total / self._nonempty
+
+    def snapshot(self) -> Tuple[List[int], List[List[int]]]:
+        """Return the truck of each parcel and the route of each truck, from
+        which restore can rebuild the current state.
+        """
+        return self._truck_of[:], [stops[:] for stops in self._stops]
+
+    def restore(self, snapshot: Tuple[List[int], List[List[int]]]) -> None:
+        """Rebuild the state from <snapshot>, as returned by snapshot.
+        """
+        assignment, stops = snapshot
+        self._truck_of = assignment[:]
+        self._stops = [route[:] for route in stops]
+        self._loads = [[] for _ in self._trucks]
+        self._positions = [-1] * len(self._parcels)
+        self._spaces = [truck.capacity for truck in self._trucks]
+        self._counts = [{} for _ in self._trucks]
+        self.waiting = []
+        for p, t in enumerate(assignment):
+            if t < 0:
+                self.waiting.append(p)
+                continue
+            self._positions[p] = len(self._loads[t])
+            self._loads[t].append(p)
+            self._spaces[t] -= self._volumes[p]
+            counts = self._counts[t]
+            counts[self._destinations[p]] = \
+                counts.get(self._destinations[p], 0) + 1
+        self._lengths = []
+        for t, route in enumerate(self._stops):
+            depot = self._depots[t]
+            cities = [depot] + route + [depot] if route else []
+            self._lengths.append(sum(map(self._leg, cities[:-1],
+                                         cities[1:])))
+        self._total = sum(self._lengths)
+        self._nonempty = sum(1 for load in self._loads if load)
+
+    def try_insert(self, rng: Random) -> None:
+        """Try to pack a random unscheduled parcel onto a random truck,
+        moving a random parcel from that truck to another random truck to
+        make room if needed.
+        """
+        if not self._trucks:
+            return
+        i = rng.randrange(len(self.waiting))
+        u = self.waiting[i]
+        t = rng.randrange(len(self._trucks))
+        volume = self._volumes[u]
+        if self._spaces[t] < volume:
+            if not self._loads[t]:
+                return
+            p = rng.choice(self._loads[t])
+            other = rng.randrange(len(self._trucks))
+            if other == t or self._spaces[t] + self._volumes[p] < volume \
+                    or self._spaces[other] < self._volumes[p]:
+                return
+            self._take(p)
+            self._put(p, other)
+        self.waiting[i] = self.waiting[-1]
+        self.waiting.pop()
+        self._put(u, t)
+
+    def try_relocate(self, rng: Random, temperature: float) -> None:
+        """Try to move a random parcel to a random other truck, and make the
+        move if it is accepted at <temperature>.
+        """
+        p = rng.randrange(len(self._parcels)) if self._parcels else -1
+        if p < 0 or self._truck_of[p] < 0:
+            return
+        a = self._truck_of[p]
+        b = rng.randrange(len(self._trucks))
+        if a == b or self._spaces[b] < self._volumes[p]:
+            return
+        city = self._destinations[p]
+        removed, _ = self._removal(a, city)
+        added = self._addition(b, city, self._last(b))
+        nonempty = self._nonempty - (len(self._loads[a]) == 1) \
+            + (not self._loads[b])
+        if self._accept(self._total + removed + added, nonempty, rng,
+                        temperature):
+            self._take(p)
+            self._put(p, b)
+
+    def try_swap(self, rng: Random, temperature: float) -> None:
+        """Try to exchange two random parcels on different trucks, and make
+        the move if it is accepted at <temperature>.
+        """
+        if not self._parcels:
+            return
+        p = rng.randrange(len(self._parcels))
+        q = rng.randrange(len(self._parcels))
+        a, b = self._truck_of[p], self._truck_of[q]
+        city_p, city_q = self._destinations[p], self._destinations[q]
+        if a < 0 or b < 0 or a == b or city_p == city_q:
+            return
+        difference = self._volumes[p] - self._volumes[q]
+        if self._spaces[a] + difference < 0 or self._spaces[b] < difference:
+            return
+        removed_a, last_a = self._removal(a, city_p)
+        removed_b, last_b = self._removal(b, city_q)
+        change = (removed_a + self._addition(a, city_q, last_a)
+                  + removed_b + self._addition(b, city_p, last_b))
+        if self._accept(self._total + change, self._nonempty, rng,
+                        temperature):
+            self._take(p)
+            self._take(q)
+            self._put(p, b)
+            self._put(q, a)
+
+    def write_back(self) -> List[Parcel]:
+        """Repack every truck whose parcels or route have changed to match
+        the current state, and return the unscheduled parcels, in their
+        original order.
+        """
+        names = self._dmap.city_name
+        for t, truck in enumerate(self._trucks):
+            parcels = [self._parcels[p] for p in sorted(self._loads[t])]
+            route = [truck.route[0]] + [names(city) for city in self._stops[t]]
+            if route == truck.route and len(parcels) == len(truck.parcels) \
+                    and all(parcel is packed for parcel, packed
+                            in zip(parcels, truck.parcels)):
+                continue
+            truck.unload()
+            for parcel in parcels:
+                truck.pack(parcel)
+            truck.set_route(route)
+        return [self._parcels[p] for p in sorted(self.waiting)]
+
+    def _leg(self, city1: int, city2: int) -> int:
+        """Return the distance from the city with id <city1> to the city with
+        id <city2>.
+        """
+        if city1 == city2:
+            return 0
+        return self._dmap.distance_by_id(city1, city2)
+
+    def _last(self, t: int) -> int:
+        """Return the id of the last city on the route of truck <t>.
+        """
+        return self._stops[t][-1] if self._stops[t] else self._depots[t]
+
+    def _removal(self, t: int, city: int) -> Tuple[int, int]:
+        """Return the change in the route length of truck <t> from taking off
+        one of its parcels going to <city>, and the id of the last city on
+        its route afterwards.
+        """
+        stops = self._stops[t]
+        if self._counts[t][city] > 1:
+            return 0, stops[-1]
+        depot = self._depots[t]
+        i = stops.index(city)
+        before = stops[i - 1] if i else depot
+        after = stops[i + 1] if i + 1 < len(stops) else depot
+        last = stops[-1] if i + 1 < len(stops) else before
+        return (self._leg(before, after) - self._leg(before, city)
+                - self._leg(city, after)), last
+
+    def _addition(self, t: int, city: int, last: int) -> int:
+        """Return the change in the route length of truck <t>, whose route
+        ends at the city with id <last>, from packing a parcel going to
+        <city>.
+        """
+        if city in self._counts[t]:
+            return 0
+        depot = self._depots[t]
+        return (self._leg(last, city) + self._leg(city, depot)
+                - self._leg(last, depot))
+
+    def _accept(self, total: int, nonempty: int, rng: Random,
+                temperature: float) -> bool:
+        """Return True if a move that changes the total route length to
+        <total> and the number of non-empty trucks to <nonempty> should be
+        made at <temperature>.
+        """
+        current = self.objective()[1]
+        new = total / nonempty if nonempty else 0.0
+        if new <= current:
+            return True
+        return temperature > 0 and \
+            rng.random() < exp((current - new) / temperature)
+
+    def _take(self, p: int) -> None:
+        """Take parcel <p> off its truck.
+        """
+        t = self._truck_of[p]
+        city = self._destinations[p]
+        change, _ = self._removal(t, city)
+        load = self._loads[t]
+        moved = load.pop()
+        if moved != p:
+            load[self._positions[p]] = moved
+            self._positions[moved] = self._positions[p]
+        self._truck_of[p] = -1
+        self._spaces[t] += self._volumes[p]
+        counts = self._counts[t]
+        counts[city] -= 1
+        if not counts[city]:
+            del counts[city]
+            self._stops[t].remove(city)
+        self._lengths[t] += change
+        self._total += change
+        if not load:
+            self._nonempty -= 1
+
+    def _put(self, p: int, t: int) -> None:
+        """Pack parcel <p>, which is on no truck, onto truck <t>.
+        """
+        city = self._destinations[p]
+        change = self._addition(t, city, self._last(t))
+        load = self._loads[t]
+        if not load:
+            self._nonempty += 1
+        self._positions[p] = len(load)
+        load.append(p)
+        self._truck_of[p] = t
+        self._spaces[t] -= self._volumes[p]
+        counts = self._counts[t]
+        if city not in counts:
+            counts[city] = 0
+            self._stops[t].append(city)
+        counts[city] += 1
+        self._lengths[t] += change
+        self._total += change
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['RandomScheduler.schedule', 'GreedyScheduler._place',
+                       'BinPackingScheduler.schedule',
+                       'ImprovementScheduler._improve'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'random', 'math', 'time',
+                                   'container', 'distance_map', 'domain'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
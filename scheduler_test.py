@@ -0,0 +1,239 @@
+import random
+import pytest
+from distance_map import DistanceMap
+from domain import Parcel, ParcelTable, Truck
+from scheduler import BinPackingScheduler, GreedyScheduler, \
+    ImprovementScheduler, RandomScheduler
+
+
+def _config(priority: str, parcel_order: str, truck_order: str) -> dict:
+    """Return a greedy scheduler configuration with the given options."""
+    return {'depot_location': 'York',
+            'parcel_file': '',
+            'truck_file': '',
+            'map_file': '',
+            'algorithm': 'greedy',
+            'parcel_priority': priority,
+            'parcel_order': parcel_order,
+            'truck_order': truck_order,
+            'verbose': False}
+
+
+def test_greedy_volume_non_increasing() -> None:
+    """Test that the largest parcels are packed first, onto the emptiest
+    trucks, with ties going to the earlier truck."""
+    parcels = [Parcel(1, 5, 'York', 'London'),
+               Parcel(2, 20, 'York', 'Toronto'),
+               Parcel(3, 10, 'York', 'Hamilton')]
+    t1 = Truck(1, 20, 'York')
+    t2 = Truck(2, 30, 'York')
+    scheduler = GreedyScheduler(_config('volume', 'non-increasing',
+                                        'non-increasing'))
+    assert scheduler.schedule(parcels, [t1, t2]) == []
+    assert [p.id for p in t2.parcels] == [2]
+    assert [p.id for p in t1.parcels] == [3, 1]
+
+
+def test_greedy_equal_volumes_keep_input_order() -> None:
+    """Test that parcels with equal priority are packed in input order."""
+    parcels = [Parcel(i, 5, 'York', 'London') for i in range(4)]
+    t = Truck(1, 15, 'York')
+    scheduler = GreedyScheduler(_config('volume', 'non-decreasing',
+                                        'non-decreasing'))
+    assert scheduler.schedule(parcels, [t]) == [parcels[3]]
+    assert [p.id for p in t.parcels] == [0, 1, 2]
+
+
+def test_greedy_does_not_mutate_parcels() -> None:
+    """Test that schedule leaves its list of parcels unchanged."""
+    parcels = [Parcel(2, 5, 'York', 'London'), Parcel(1, 9, 'York', 'Guelph')]
+    original = parcels.copy()
+    scheduler = GreedyScheduler(_config('destination', 'non-decreasing',
+                                        'non-increasing'))
+    scheduler.schedule(parcels, [Truck(1, 20, 'York')])
+    assert parcels == original
+
+
+def test_random_packs_what_fits() -> None:
+    """Test that the random scheduler packs every parcel that fits."""
+    parcels = [Parcel(i, 5, 'York', 'London') for i in range(5)]
+    trucks = [Truck(1, 10, 'York'), Truck(2, 10, 'York')]
+    unscheduled = RandomScheduler().schedule(parcels, trucks)
+    assert len(unscheduled) == 1
+    assert sum(t.volume for t in trucks) == 20
+
+
+@pytest.mark.parametrize('priority', ['volume', 'destination'])
+@pytest.mark.parametrize('order', ['non-decreasing', 'non-increasing'])
+def test_greedy_parcel_table_matches_list(priority: str, order: str) -> None:
+    """Test that scheduling a ParcelTable packs the same parcels onto the
+    same trucks as scheduling the equivalent list of parcels."""
+    cities = ['London', 'Guelph', 'Toronto', 'Hamilton']
+    parcels = [Parcel(i, 3 + (i * 7) % 11, 'York', cities[i % 4])
+               for i in range(30)]
+    config = _config(priority, order, 'non-increasing')
+    allocations = []
+    for given in [parcels, ParcelTable(parcels)]:
+        trucks = [Truck(t, 40, 'York') for t in range(4)]
+        unscheduled = GreedyScheduler(config).schedule(given, trucks)
+        allocations.append(([[p.id for p in t.parcels] for t in trucks],
+                            [p.id for p in unscheduled]))
+    assert allocations[0] == allocations[1]
+
+
+@pytest.mark.parametrize('priority', ['volume', 'destination'])
+@pytest.mark.parametrize('order', ['non-decreasing', 'non-increasing'])
+@pytest.mark.parametrize('truck_order', ['non-decreasing', 'non-increasing'])
+def test_greedy_truck_index_matches_scan(priority: str, order: str,
+                                         truck_order: str) -> None:
+    """Test that finding trucks through the truck index packs the same
+    parcels onto the same trucks as scanning the trucks, whether the parcels
+    are scheduled at once or streamed."""
+    cities = ['London', 'Guelph', 'Toronto', 'Hamilton', 'Ottawa']
+    parcels = [Parcel(i, 2 + (i * 7) % 11, 'York', cities[(i * i) % 5])
+               for i in range(80)]
+    allocations = []
+    for truck_index in [False, True]:
+        config = _config(priority, order, truck_order)
+        config['truck_index'] = truck_index
+        config['lookahead'] = 7
+        for stream in [False, True]:
+            trucks = [Truck(t, 20 + 9 * (t % 4), 'York') for t in range(12)]
+            scheduler = GreedyScheduler(config)
+            if stream:
+                batches = [parcels[i:i + 10] for i in range(0, 80, 10)]
+                unscheduled = scheduler.schedule_stream(batches, trucks)
+            else:
+                unscheduled = scheduler.schedule(parcels, trucks)
+            allocations.append(([[p.id for p in t.parcels] for t in trucks],
+                                [p.id for p in unscheduled]))
+    assert allocations[0] == allocations[2]
+    assert allocations[1] == allocations[3]
+
+
+def test_improvement_schedules_more_parcels() -> None:
+    """Test that the improvement scheduler moves a parcel to another truck to
+    make room for a parcel that the greedy scheduler could not fit."""
+    dmap = DistanceMap()
+    dmap.add_distance('York', 'London', 5)
+    parcels = [Parcel(i, volume, 'York', 'London')
+               for i, volume in enumerate([4, 5, 5, 6])]
+    trucks = [Truck(1, 10, 'York'), Truck(2, 10, 'York')]
+    greedy = GreedyScheduler(_config('volume', 'non-decreasing',
+                                     'non-increasing'))
+    assert greedy.schedule(parcels, [Truck(1, 10, 'York'),
+                                     Truck(2, 10, 'York')]) == [parcels[3]]
+    config = {'improve_iterations': 1000, 'improve_seed': 148}
+    scheduler = ImprovementScheduler(greedy, dmap, config)
+    assert scheduler.schedule(parcels, trucks) == []
+    assert sorted(p.id for t in trucks for p in t.parcels) == [0, 1, 2, 3]
+    assert all(t.available_space() == 0 for t in trucks)
+
+
+@pytest.mark.parametrize('temperature', [0, 10])
+def test_improvement_shortens_routes(temperature: float) -> None:
+    """Test that the improvement scheduler never makes the average route
+    longer, and keeps every truck's load and route consistent."""
+    cities = ['London', 'Guelph', 'Toronto', 'Hamilton', 'Ottawa']
+    dmap = DistanceMap()
+    for i, city1 in enumerate(['York'] + cities):
+        for j, city2 in enumerate(cities[i:], i + 1):
+            dmap.add_distance(city1, city2, 3 + (i * 7 + j * 5) % 17)
+    parcels = [Parcel(i, 1 + (i * 7) % 9, 'York', cities[(i * i) % 5])
+               for i in range(60)]
+    base = RandomScheduler()
+    random.seed(148)
+    trucks = [Truck(t, 40, 'York') for t in range(8)]
+    base.schedule(parcels, trucks)
+    before = sum(t.route_length(dmap) for t in trucks if t.parcels)
+    random.seed(148)
+    trucks = [Truck(t, 40, 'York') for t in range(8)]
+    config = {'improve_iterations': 5000, 'improve_seed': 148,
+              'improve_temperature': temperature}
+    unscheduled = ImprovementScheduler(base, dmap, config).schedule(parcels,
+                                                                    trucks)
+    after = sum(t.route_length(dmap) for t in trucks if t.parcels)
+    assert after < before
+    assert len(unscheduled) + sum(len(t.parcels) for t in trucks) == 60
+    for truck in trucks:
+        assert truck.volume == sum(p.volume for p in truck.parcels) <= 40
+        assert set(truck.route[1:]) == {p.destination for p in truck.parcels}
+
+
+def _objective(trucks: list, unscheduled: list, dmap: DistanceMap) -> tuple:
+    """Return the number of <unscheduled> parcels and the average route
+    length of the non-empty trucks in <trucks>."""
+    lengths = [t.route_length(dmap) for t in trucks if t.parcels]
+    return len(unscheduled), sum(lengths) / max(len(lengths), 1)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_improvement_hot_never_worse(seed: int) -> None:
+    """Test that the improvement scheduler never returns a schedule worse
+    than the base scheduler's, even when it is too hot to settle in the
+    iterations it has."""
+    cities = ['London', 'Guelph', 'Toronto', 'Hamilton', 'Ottawa']
+    dmap = DistanceMap()
+    for i, city1 in enumerate(['York'] + cities):
+        for j, city2 in enumerate(cities[i:], i + 1):
+            dmap.add_distance(city1, city2, 3 + (i * 7 + j * 5) % 17)
+    parcels = [Parcel(i, 1 + (i * 7) % 9, 'York', cities[(i * i) % 5])
+               for i in range(30)]
+    base = GreedyScheduler(_config('destination', 'non-decreasing',
+                                   'non-increasing'))
+    trucks = [Truck(t, 40, 'York') for t in range(6)]
+    before = _objective(trucks, base.schedule(parcels, trucks), dmap)
+    trucks = [Truck(t, 40, 'York') for t in range(6)]
+    config = {'improve_iterations': 20, 'improve_seed': seed,
+              'improve_temperature': 1000}
+    unscheduled = ImprovementScheduler(base, dmap, config).schedule(parcels,
+                                                                    trucks)
+    after = _objective(trucks, unscheduled, dmap)
+    assert after[0] < before[0] or (after[0] == before[0]
+                                    and after[1] <= before[1] + 1e-9)
+
+
+def _allocations(scheduler, parcels: list, capacities: list) -> tuple:
+    """Schedule <parcels> with <scheduler> onto new trucks with the given
+    <capacities>, and return the ids of the parcels on each truck and of the
+    unscheduled parcels."""
+    trucks = [Truck(t, capacity, 'York')
+              for t, capacity in enumerate(capacities)]
+    unscheduled = scheduler.schedule(parcels, trucks)
+    return ([[p.id for p in t.parcels] for t in trucks],
+            [p.id for p in unscheduled])
+
+
+def test_best_fit_matches_greedy() -> None:
+    """Test that best fit packs parcels exactly as the greedy scheduler does
+    by non-increasing volume onto the fullest truck that fits."""
+    parcels = [Parcel(i, 1 + (i * 7) % 13, 'York', 'London')
+               for i in range(60)]
+    capacities = [25, 40, 25, 10, 33, 40, 18]
+    greedy = GreedyScheduler(_config('volume', 'non-increasing',
+                                     'non-decreasing'))
+    config = _config('volume', 'non-increasing', 'non-decreasing')
+    config['algorithm'] = 'best-fit'
+    expected = _allocations(greedy, parcels, capacities)
+    assert _allocations(BinPackingScheduler(config), parcels,
+                        capacities) == expected
+    assert _allocations(BinPackingScheduler(config), ParcelTable(parcels),
+                        capacities) == expected
+
+
+def test_first_fit_decreasing() -> None:
+    """Test that first fit packs the largest parcels first, each onto the
+    first truck it fits on."""
+    parcels = [Parcel(1, 5, 'York', 'London'),
+               Parcel(2, 20, 'York', 'Toronto'),
+               Parcel(3, 10, 'York', 'Hamilton'),
+               Parcel(4, 10, 'York', 'Guelph'),
+               Parcel(5, 50, 'York', 'Guelph')]
+    config = _config('volume', 'non-increasing', 'non-decreasing')
+    config['algorithm'] = 'first-fit'
+    assert _allocations(BinPackingScheduler(config), parcels,
+                        [15, 30, 10]) == ([[3, 1], [2, 4], []], [5])
+
+
+if __name__ == '__main__':
+    pytest.main(['scheduler_test.py'])
@@ -0,0 +1,355 @@
+"""A scheduling service.
+
+===== Module Description =====
+
+This module contains the class SchedulingService, which runs scheduling
+experiments as jobs sent to it as lines of JSON, and sends back the
+statistics of each experiment as a line of JSON once it finishes.  Jobs are
+read from a local socket or from standard input, and may be sent before the
+earlier ones have finished.
+
+Scheduling is CPU-bound, so each job runs in a pool of worker processes,
+while the event loop goes on reading requests and writing responses.  Each
+worker keeps the parcels, fleet and distance map it has parsed for recent
+jobs, so that later jobs on the same input files skip reading them.  The
+service counts the jobs waiting for a worker and times each job, and reports
+these metrics on request.
+
+Each request is a JSON object.  A request with 'op' set to 'metrics' is
+answered with the service's metrics.  Any other request is a job: its
+'config' is an experiment configuration, as for SchedulingExperiment, and
+the response holds the job's 'stats' and its 'latency' in seconds.  If a
+request has an 'id', the response has the same 'id', so that responses can
+be matched to requests whichever job finishes first.  A request that cannot
+be run is answered with an 'error' instead.
+
+Run this module as a script to serve jobs on standard input and output, or
+on a local socket if a port number is given as an argument.
+"""
+import asyncio
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from copy import deepcopy
+from multiprocessing import get_context
+from time import perf_counter
+from typing import Any, Deque, Dict, List, Tuple, Union
+from experiment import SchedulingExperiment, read_inputs
+
+# The parsed inputs of recent jobs in this process, keyed by _input_key, with
+# the most recently used last.
+_loaded: Dict[Tuple[Any, ...], Tuple[Any, Any, Any]] = {}
+# The most input sets kept in _loaded.
+_max_loaded = 8
+
+
+class SchedulingService:
+    """A service that runs scheduling jobs concurrently.
+
+    === Public Attributes ===
+    workers:
+      The number of jobs run at once.
+
+    === Private Attributes ===
+    _executor:
+      The pool that jobs are run in: a pool of <workers> processes, or a
+      single thread if <workers> is 1.
+    _slots:
+      Held by each job while it runs, so that at most <workers> jobs are
+      sent to <_executor> at once.
+    _queued:
+      The number of jobs waiting for a worker.
+    _running:
+      The number of jobs being run.
+    _max_queued:
+      The most jobs that have waited for a worker at once.
+    _completed:
+      The number of jobs that finished.
+    _failed:
+      The number of requests that could not be run.
+    _latencies:
+      The time, in seconds, from the arrival of each recent job until its
+      statistics were ready.
+    _waits:
+      The time, in seconds, that each recent job waited for a worker.
+
+    === Representation Invariants ===
+    - workers >= 1
+    - 0 <= _running <= workers
+    """
+    workers: int
+    _executor: Executor
+    _slots: asyncio.Semaphore
+    _queued: int
+    _running: int
+    _max_queued: int
+    _completed: int
+    _failed: int
+    _latencies: Deque[float]
+    _waits: Deque[float]
+
+    def __init__(self, workers: int = 1, max_inputs: int = 8,
+                 history: int = 1000) -> None:
+        """Initialize a service that runs <workers> jobs at once, keeps the
+        parsed inputs of up to <max_inputs> input sets in each worker, and
+        reports metrics on the last <history> jobs.
+
+        Precondition: workers >= 1, max_inputs >= 1 and history >= 1
+        """
+        self.workers = workers
+        if workers > 1:
+            # Forked workers would inherit the sockets of open connections,
+            # which would then not close until the workers exit.
+            self._executor = ProcessPoolExecutor(
+                workers, get_context('spawn'), initializer=_set_max_loaded,
+                initargs=(max_inputs,))
+        else:
+            _set_max_loaded(max_inputs)
+            self._executor = ThreadPoolExecutor(1)
+        self._slots = asyncio.Semaphore(workers)
+        self._queued = 0
+        self._running = 0
+        self._max_queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._latencies = deque(maxlen=history)
+        self._waits = deque(maxlen=history)
+
+    async def run_job(self, config: Dict[str, Union[str, bool]]) \
+            -> Dict[str, Union[int, float]]:
+        """Run the experiment configured by <config> in a worker, and return
+        its statistics once it finishes.
+
+        The experiment never prints its progress, whatever config['verbose']
+        is, so that it cannot interfere with the responses.
+
+        Precondition: <config> contains keys and values as specified in
+        SchedulingExperiment.__init__.
+        """
+        start = perf_counter()
+        self._queued += 1
+        self._max_queued = max(self._max_queued, self._queued)
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+        self._running += 1
+        self._waits.append(perf_counter() - start)
+        try:
+            loop = asyncio.get_running_loop()
+            stats = await loop.run_in_executor(self._executor, _run_job,
+                                               config)
+        finally:
+            self._running -= 1
+            self._slots.release()
+        self._latencies.append(perf_counter() - start)
+        self._completed += 1
+        return stats
+
+    async def handle(self, line: str) -> Dict[str, Any]:
+        """Answer the request in <line>, a JSON object, and return the
+        response.
+        """
+        start = perf_counter()
+        response = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request must be a JSON object')
+            if 'id' in request:
+                response['id'] = request['id']
+            if request.get('op') == 'metrics':
+                response['metrics'] = self.metrics()
+            else:
+                response['stats'] = await self.run_job(request['config'])
+                response['latency'] = perf_counter() - start
+        except Exception as error:
+            # A bad request must not stop the service, so it is answered
+            # with the error instead.
+            self._failed += 1
+            response['error'] = f'{type(error).__name__}: {error}'
+        return response
+
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        """Return the metrics of this service: 'completed', the number of
+        jobs that finished, 'failed', the number of requests that could not
+        be run, 'queue_depth', the number of jobs waiting for a worker,
+        'max_queue_depth', the most that have waited at once, 'running', the
+        number of jobs being run, and the mean, median, 95th percentile and
+        largest latency and the mean wait for a worker, in seconds, of recent
+        jobs.
+        """
+        latencies = sorted(self._latencies)
+        return {
+            'completed': self._completed,
+            'failed': self._failed,
+            'queue_depth': self._queued,
+            'max_queue_depth': self._max_queued,
+            'running': self._running,
+            'latency_mean': _mean(latencies),
+            'latency_p50': _percentile(latencies, 50),
+            'latency_p95': _percentile(latencies, 95),
+            'latency_max': latencies[-1] if latencies else 0.0,
+            'wait_mean': _mean(self._waits)
+        }
+
+    async def serve_stream(self, reader: asyncio.StreamReader,
+                           writer: Union[asyncio.StreamWriter, Any]) -> None:
+        """Answer each line read from <reader> as a request, writing each
+        response as a line to <writer> as soon as it is ready, until
+        <reader> reaches its end and every request has been answered.
+        """
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 0) \
+            -> asyncio.AbstractServer:
+        """Start serving jobs on a socket at <host> and <port>, and return
+        the server.  If <port> is 0, a free port is chosen.
+        """
+        async def connected(reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+            """Serve the jobs of one connection, then close it."""
+            try:
+                await self.serve_stream(reader, writer)
+            finally:
+                writer.close()
+        return await asyncio.start_server(connected, host, port)
+
+    async def serve_stdio(self) -> None:
+        """Serve jobs read from standard input, writing the responses to
+        standard output, until standard input ends.
+        """
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        await self.serve_stream(reader, _StdoutWriter())
+
+    def close(self) -> None:
+        """Shut down the workers of this service, once their jobs finish.
+        """
+        self._executor.shutdown()
+
+    async def _answer(self, line: bytes,
+                      writer: Union[asyncio.StreamWriter, Any]) -> None:
+        """Answer the request in <line> and write the response to <writer>.
+        """
+        response = await self.handle(line.decode())
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+
+class _StdoutWriter:
+    """Writes responses to standard output, as an asyncio.StreamWriter
+    would.
+    """
+
+    def write(self, data: bytes) -> None:
+        """Write <data> to standard output."""
+        sys.stdout.buffer.write(data)
+
+    async def drain(self) -> None:
+        """Flush standard output."""
+        sys.stdout.buffer.flush()
+
+
+def _set_max_loaded(max_inputs: int) -> None:
+    """Keep the parsed inputs of up to <max_inputs> input sets in this
+    process.
+    """
+    global _max_loaded
+    _max_loaded = max_inputs
+
+
+def _input_key(config: Dict[str, Union[str, bool]]) -> Tuple[Any, ...]:
+    """Return a key that is the same for two configurations exactly when
+    read_inputs would read the same inputs for them.  The key includes the
+    modification time of each input file, so that a changed file is read
+    again.
+    """
+    paths = [config['truck_file'], config['map_file']]
+    if not config.get('stream', False):
+        paths.append(config['parcel_file'])
+    options = tuple(bool(config.get(option, False))
+                    for option in ['stream', 'parcel_table', 'dense_map',
+                                   'complete_map', 'lazy_map'])
+    if options[-1]:
+        options += (config.get('lazy_map_bytes'),)
+    return ((config['depot_location'],) + options
+            + tuple((path, os.stat(path).st_mtime_ns) for path in paths))
+
+
+def _run_job(config: Dict[str, Union[str, bool]]) \
+        -> Dict[str, Union[int, float]]:
+    """Run the experiment configured by <config> on a copy of the trucks of
+    its inputs, reading the inputs only if they are not already loaded in
+    this process, and return its statistics.
+    """
+    config = dict(config)
+    config['verbose'] = False
+    key = _input_key(config)
+    inputs = _loaded.pop(key, None)
+    if inputs is None:
+        inputs = read_inputs(config)
+        while _loaded and len(_loaded) >= _max_loaded:
+            del _loaded[next(iter(_loaded))]
+    _loaded[key] = inputs
+    parcels, fleet, dmap = inputs
+    return SchedulingExperiment(config, (parcels, deepcopy(fleet),
+                                         dmap)).run()
+
+
+def _mean(values: Union[List[float], Deque[float]]) -> float:
+    """Return the mean of <values>, or 0.0 if there are none.
+    """
+    return sum(values) / len(values) if values else 0.0
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Return the smallest of <values> that is at least <percent> percent of
+    them, or 0.0 if there are none.
+
+    Precondition: <values> is sorted in non-decreasing order.
+
+    >>> _percentile([1.0, 2.0, 3.0, 4.0], 50)
+    2.0
+    >>> _percentile([1.0, 2.0, 3.0, 4.0], 95)
+    4.0
+    """
+    if not values:
+        return 0.0
+    rank = -(-len(values) * percent // 100)
+    return values[max(int(rank), 1) - 1]
+
+
+async def main(args: List[str]) -> None:
+    """Serve jobs on the local socket whose port is the first of <args>,
+    or on standard input and output if <args> is empty.
+    """
+    service = SchedulingService(os.cpu_count() or 1)
+    try:
+        if args:
+            server = await service.serve(port=int(args[0]))
+            async with server:
+                await server.serve_forever()
+        else:
+            await service.serve_stdio()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,139 @@
+import asyncio
+import doctest
+import json
+import pytest
+import service
+from experiment import SchedulingExperiment
+from service import SchedulingService
+
+
+def _run_lines(lines: list, workers: int = 1) -> tuple:
+    """Answer each of <lines> concurrently with a new service, and return
+    the responses, in the order of <lines>, and the service's metrics."""
+    async def answer() -> tuple:
+        """Answer the lines and return the responses and metrics."""
+        svc = SchedulingService(workers)
+        try:
+            responses = await asyncio.gather(*[svc.handle(line)
+                                               for line in lines])
+            return responses, svc.metrics()
+        finally:
+            svc.close()
+    return asyncio.run(answer())
+
+
+def test_job_matches_experiment(config: dict) -> None:
+    """Test that a job gives the same statistics as running the experiment
+    directly, and that the response carries the request's id."""
+    expected = SchedulingExperiment(dict(config)).run()
+    responses, _ = _run_lines([json.dumps({'id': 7, 'config': config})])
+    assert responses[0]['id'] == 7
+    assert responses[0]['stats'] == expected
+    assert responses[0]['latency'] >= 0
+
+
+def test_concurrent_jobs_metrics(config: dict) -> None:
+    """Test that jobs sent together queue for the worker, and that the
+    metrics count them."""
+    lines = [json.dumps({'id': i, 'config': config}) for i in range(4)]
+    responses, metrics = _run_lines(lines)
+    assert [response['id'] for response in responses] == [0, 1, 2, 3]
+    assert all(response['stats'] == responses[0]['stats']
+               for response in responses)
+    assert metrics['completed'] == 4
+    assert metrics['failed'] == 0
+    assert metrics['max_queue_depth'] == 3
+    assert metrics['queue_depth'] == 0 and metrics['running'] == 0
+    assert 0 < metrics['latency_p50'] <= metrics['latency_max']
+
+
+def test_inputs_read_once(config: dict, monkeypatch) -> None:
+    """Test that the inputs of a job are kept loaded for later jobs on the
+    same files, and read again once a file changes."""
+    reads = []
+    read_inputs = service.read_inputs
+
+    def counting_read(job_config: dict) -> tuple:
+        """Record the read and read the inputs."""
+        reads.append(job_config['map_file'])
+        return read_inputs(job_config)
+
+    monkeypatch.setattr(service, '_loaded', {})
+    monkeypatch.setattr(service, 'read_inputs', counting_read)
+    first = service._run_job(config)
+    assert service._run_job(config) == first
+    assert len(reads) == 1
+    with open(config['truck_file'], 'a') as file:
+        file.write('4,10\n')
+    assert service._run_job(config)['fleet'] == first['fleet'] + 1
+    assert len(reads) == 2
+
+
+def test_bad_requests(config: dict) -> None:
+    """Test that requests that cannot be run are answered with an error,
+    without stopping the other jobs."""
+    missing = dict(config, map_file=config['map_file'] + '.missing')
+    lines = ['not json', json.dumps([1]), json.dumps({'id': 'x'}),
+             json.dumps({'id': 'y', 'config': missing}),
+             json.dumps({'id': 'z', 'config': config}),
+             json.dumps({'op': 'metrics'})]
+    responses, metrics = _run_lines(lines)
+    assert all('error' in response for response in responses[:4])
+    assert responses[2]['id'] == 'x'
+    assert 'stats' in responses[4]
+    assert 'metrics' in responses[5]
+    assert metrics['failed'] == 4 and metrics['completed'] == 1
+
+
+def test_socket_parallel_workers(config: dict) -> None:
+    """Test that jobs sent over a socket to a pool of worker processes are
+    all answered."""
+    expected = SchedulingExperiment(dict(config)).run()
+
+    async def exchange() -> list:
+        """Send three jobs over one connection and read the responses."""
+        svc = SchedulingService(2)
+        server = await svc.serve()
+        try:
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            for i in range(3):
+                writer.write(json.dumps({'id': i, 'config': config}).encode()
+                             + b'\n')
+            writer.write_eof()
+            responses = [json.loads(line) async for line in reader]
+            writer.close()
+            return responses
+        finally:
+            server.close()
+            await server.wait_closed()
+            svc.close()
+
+    responses = asyncio.run(exchange())
+    assert sorted(response['id'] for response in responses) == [0, 1, 2]
+    assert all(response['stats'] == expected for response in responses)
+
+
+if __name__ == '__main__':
+    pytest.main(['service_test.py'])
+
+
+def test_doctests() -> None:
+    """Test the examples in the docstrings of the service module, which is
+    run as a server rather than checked when run as a script."""
+    assert doctest.testmod(service).failed == 0
+
+
+def test_python_ta() -> None:
+    """Check the service module with python_ta, if it is installed."""
+    python_ta = pytest.importorskip('python_ta')
+    python_ta.check_all('service.py', config={
+        'allowed-io': ['_StdoutWriter.write', '_StdoutWriter.drain'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'asyncio', 'json', 'os', 'sys',
+                                   'collections', 'concurrent.futures',
+                                   'copy', 'multiprocessing', 'time',
+                                   'experiment'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })